@@ -0,0 +1,102 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Memory-aware admission control of concurrent experiments.
+
+Experiments running at the same time in a node (e.g., UMAP fits of large
+merged datasets) may exceed its memory, and be killed by the system. The
+`AdmissionController` starts a new experiment only while the projected
+memory usage (the memory used before the experiments started plus the peak
+memory estimated for each running experiment, see
+`resources.estimate_resources`) plus the estimate of the new experiment stays
+under a budget. As the estimates may be wrong, the memory actually used in
+the node is also watched: while it is above the projected usage, it is used
+instead, pausing admissions until experiments finish.
+"""
+
+# Python imports
+import logging
+from typing import Any, Dict
+
+# Third-party imports
+import psutil
+
+
+def used_memory() -> int:
+    """Memory used in the node, in bytes (the memory that is not available
+    to start new processes without swapping)."""
+    memory = psutil.virtual_memory()
+    return int(memory.total - memory.available)
+
+
+class AdmissionController:
+    """Admit experiments while their projected memory usage fits a budget.
+
+    An experiment is always admitted when no other experiment is running, so
+    experiments larger than the budget still run (alone).
+
+    Parameters
+    ----------
+    budget : int
+        The memory budget, in bytes.
+    live : bool, optional
+        Watch the memory used in the node (only meaningful when the
+        experiments run in this node), by default True. If False, only the
+        estimates of the running experiments are accounted.
+    """
+
+    def __init__(self, budget: int, live: bool = True):
+        self.budget = budget
+        self.live = live
+        self.running: Dict[Any, int] = dict()
+        # Memory used before any experiment (e.g., the shared datasets)
+        self.baseline = used_memory() if live else 0
+        self._paused = False
+
+    def projected_usage(self) -> int:
+        """The projected memory usage of the running experiments (or the
+        memory used in the node, if larger)."""
+        usage = self.baseline + sum(self.running.values())
+        if self.live:
+            usage = max(usage, used_memory())
+        return usage
+
+    def can_admit(self, estimate: int) -> bool:
+        """Whether an experiment with the estimated peak memory (in bytes)
+        may start now."""
+        if not self.running:
+            return True
+        usage = self.projected_usage()
+        admitted = usage + estimate <= self.budget
+        if not admitted and not self._paused:
+            logging.info(
+                f"Admissions paused: {usage / 1024**2:.0f} MB in use (projected) "
+                f"+ {estimate / 1024**2:.0f} MB exceeds the budget of "
+                f"{self.budget / 1024**2:.0f} MB ({len(self.running)} running)"
+            )
+        self._paused = not admitted
+        return admitted
+
+    def admit(self, key: Any, estimate: int):
+        """Account an experiment as running."""
+        self.running[key] = estimate
+
+    def release(self, key: Any):
+        """Account an experiment as finished."""
+        self.running.pop(key, None)
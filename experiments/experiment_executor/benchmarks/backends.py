@@ -0,0 +1,173 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Compare the throughput of the execution backends of the executor in one
+node: sequential (no options), the local process pool (`--workers`) and Ray
+(`--ray`, with a local Ray runtime). Each benchmark configuration
+(`benchmarks/configs`) is copied `--copies` times, and `execute.py` is run
+with each backend, in a new process, on the synthetic dataset (see
+`benchmarks/synthetic.py`). The wall time includes the startup of the
+backend (e.g., the Ray runtime), and the throughput is the number of
+experiments per minute.
+
+Example:
+    python -m benchmarks.backends --copies 4 --workers 4
+    python -m benchmarks.backends --backends pool ray --workers 2 8
+"""
+
+# Python imports
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+# Third-party imports
+import yaml
+
+from benchmarks.run import benchmarks_dir, dataset_name, prepare_dataset
+from benchmarks.synthetic import default_features
+
+executor_dir = benchmarks_dir.parent
+
+backends = ["single", "pool", "ray"]
+
+
+def backend_options(backend: str, workers: int) -> List[str]:
+    """Command line options of `execute.py` that select a backend."""
+    if backend == "single":
+        return []
+    if backend == "pool":
+        return ["--workers", str(workers)]
+    return ["--ray"]
+
+
+def run_backend(
+    configs_dir: Path,
+    data_dir: Path,
+    backend: str,
+    workers: int,
+    extra_options: List[str] = (),
+) -> float:
+    """Run all the configurations of a directory with a backend, in a new
+    process, and return the wall time (in seconds)."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        locations_file = Path(work_dir) / "dataset_locations.yaml"
+        with locations_file.open("w") as f:
+            yaml.dump({dataset_name: str(data_dir)}, f)
+        command = [
+            sys.executable,
+            "execute.py",
+            str(configs_dir),
+            "-o",
+            str(Path(work_dir) / "results"),
+            "-d",
+            "/",
+            "-l",
+            str(locations_file),
+        ]
+        command += backend_options(backend, workers) + list(extra_options)
+        start = time.perf_counter()
+        process = subprocess.run(command, cwd=executor_dir, capture_output=True)
+        elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        print(process.stderr.decode()[-2000:])
+        raise RuntimeError(f"Backend {backend} failed")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="Backends benchmark",
+        description="Compare the throughput of the execution backends in one node",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--configs-dir",
+        type=str,
+        default=str(benchmarks_dir / "configs"),
+        help="Directory with the benchmark configurations",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=str(Path(tempfile.gettempdir()) / "experiment-benchmarks"),
+        help="Directory of the synthetic dataset (generated if missing)",
+    )
+    parser.add_argument("--backends", nargs="+", default=backends, choices=backends)
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=int,
+        default=[2],
+        help="Number of workers of the process pool (each one is measured)",
+    )
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=2,
+        help="Number of copies of each configuration (experiments executed)",
+    )
+    parser.add_argument("--train-samples", type=int, default=3000)
+    parser.add_argument("--validation-samples", type=int, default=1000)
+    parser.add_argument("--test-samples", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--options",
+        nargs=argparse.REMAINDER,
+        default=[],
+        help="Other options of execute.py, used with every backend",
+    )
+    args = parser.parse_args()
+
+    generator_kwargs = {
+        "num_samples": {
+            "train": args.train_samples,
+            "validation": args.validation_samples,
+            "test": args.test_samples,
+        },
+        "window_size": 60,
+        "features": list(default_features),
+        "seed": args.seed,
+    }
+    data_dir = prepare_dataset(Path(args.data_dir), generator_kwargs).resolve()
+
+    with tempfile.TemporaryDirectory() as configs_dir:
+        config_files = sorted(Path(args.configs_dir).glob("*.yaml"))
+        for config_file in config_files:
+            for i in range(args.copies):
+                shutil.copy(
+                    config_file, Path(configs_dir) / f"{config_file.stem}.{i}.yaml"
+                )
+        num_experiments = len(config_files) * args.copies
+
+        print(f"{'backend':<16} {'time':>10} {'experiments/min':>16}")
+        for backend in args.backends:
+            for workers in args.workers if backend == "pool" else [None]:
+                elapsed = run_backend(
+                    Path(configs_dir), data_dir, backend, workers, args.options
+                )
+                name = backend if workers is None else f"pool ({workers})"
+                print(
+                    f"{name:<16} {elapsed:>8.1f} s "
+                    + f"{num_experiments / elapsed * 60:>16.1f}"
+                )
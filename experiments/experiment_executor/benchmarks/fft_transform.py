@@ -0,0 +1,92 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Compare the time taken by the FFT transform (`do_transform`) when applied to
+all windows at once (batched) and window by window (`WindowedTransform`).
+
+Example:
+    python -m benchmarks.fft_transform --samples 10000 --window-size 60 --windows 6
+"""
+
+# Python imports
+import argparse
+import time
+
+# Third-party imports
+import numpy as np
+
+# Librep imports
+from librep.datasets.multimodal import ArrayMultiModalDataset
+
+from config import TransformConfig
+from execute import do_transform
+
+
+def random_dataset(
+    num_samples: int, num_windows: int, window_size: int
+) -> ArrayMultiModalDataset:
+    return ArrayMultiModalDataset(
+        X=np.random.rand(num_samples, num_windows * window_size),
+        y=np.random.randint(0, 6, num_samples),
+        window_slices=[
+            (i * window_size, (i + 1) * window_size) for i in range(num_windows)
+        ],
+        window_names=[f"window-{i}" for i in range(num_windows)],
+    )
+
+
+def time_transform(dataset, transform_configs, batched: bool, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        do_transform([dataset], transform_configs, batched=batched)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="FFT transform benchmark",
+        description="Compare the batched and the windowed FFT transforms",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--windows", type=int, default=6)
+    parser.add_argument("--window-size", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    dataset = random_dataset(args.samples, args.windows, args.window_size)
+    transform_configs = [
+        TransformConfig(name="fft.0", transform="fft", kwargs={"centered": True})
+    ]
+
+    batched = do_transform([dataset], transform_configs, batched=True)[0]
+    windowed = do_transform([dataset], transform_configs, batched=False)[0]
+    assert np.allclose(batched[:][0], windowed[:][0])
+    assert list(batched.window_names) == list(windowed.window_names)
+
+    batched_time = time_transform(dataset, transform_configs, True, args.repeat)
+    windowed_time = time_transform(dataset, transform_configs, False, args.repeat)
+    print(
+        f"Dataset: {args.samples} samples, {args.windows} windows of {args.window_size}"
+    )
+    print(f"Windowed: {windowed_time:.4f} seconds")
+    print(f"Batched:  {batched_time:.4f} seconds")
+    print(f"Speedup:  {windowed_time / batched_time:.2f}x")
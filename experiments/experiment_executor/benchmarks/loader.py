@@ -0,0 +1,136 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Check that the splits read by `execute.read_split` are the same loaded by
+librep's `PandasMultiModalLoader` (samples, labels, window slices and window
+names), on a synthetic dataset, and compare the time taken by both.
+
+Example:
+    python -m benchmarks.loader --samples 10000 --window-size 60
+"""
+
+# Python imports
+import argparse
+import tempfile
+import time
+
+# Third-party imports
+import numpy as np
+
+# Librep imports
+from librep.datasets.har.loaders import PandasMultiModalLoader
+from librep.datasets.multimodal import ArrayMultiModalDataset
+
+from benchmarks.synthetic import default_features, generate_dataset
+from execute import read_split
+
+splits = ["train", "validation", "test"]
+label = "standard activity code"
+
+
+def load_librep(dataset_path: str, features: list) -> dict:
+    loader = PandasMultiModalLoader(root_dir=dataset_path)
+    loaded = loader.load(
+        load_train=True,
+        load_validation=True,
+        load_test=True,
+        as_multimodal=True,
+        as_array=True,
+        features=features,
+        label=label,
+    )
+    # As in the executor before `read_split`
+    return {
+        split: ArrayMultiModalDataset.from_pandas(dataset)
+        for split, dataset in zip(splits, loaded)
+    }
+
+
+def load_splits(dataset_path: str, features: list) -> dict:
+    return {split: read_split(dataset_path, split, label, features) for split in splits}
+
+
+def check_equal(expected: ArrayMultiModalDataset, actual: ArrayMultiModalDataset):
+    assert np.array_equal(np.asarray(expected.X), np.asarray(actual.X))
+    assert np.array_equal(np.asarray(expected.y), np.asarray(actual.y))
+    assert [tuple(s) for s in expected.window_slices] == [
+        tuple(s) for s in actual.window_slices
+    ]
+    assert list(expected.window_names) == list(actual.window_names)
+
+
+def time_load(load, dataset_path: str, features: list, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(dataset_path, features)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="Dataset loader benchmark",
+        description="Check and compare read_split against PandasMultiModalLoader",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--samples", type=int, default=3000)
+    parser.add_argument("--window-size", type=int, default=60)
+    parser.add_argument(
+        "--features",
+        nargs="+",
+        default=default_features,
+        help="Sensor axes of the dataset (all are loaded, in reverse order)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # The features are loaded in other order than the columns of the files
+    features = list(reversed(args.features))
+    with tempfile.TemporaryDirectory() as dataset_path:
+        generate_dataset(
+            dataset_path,
+            num_samples={split: args.samples for split in splits},
+            window_size=args.window_size,
+            features=args.features,
+        )
+
+        expected = load_librep(dataset_path, features)
+        actual = load_splits(dataset_path, features)
+        for split in splits:
+            check_equal(expected[split], actual[split])
+        # Subsets of the features are loaded in the same way
+        for split, dataset in load_splits(dataset_path, features[:1]).items():
+            check_equal(load_librep(dataset_path, features[:1])[split], dataset)
+
+        # A feature without columns is an error (not an empty window)
+        try:
+            read_split(dataset_path, "train", label, features + ["magnet-x"])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("A feature without columns was loaded")
+
+        librep_time = time_load(load_librep, dataset_path, features, args.repeat)
+        read_time = time_load(load_splits, dataset_path, features, args.repeat)
+    print(f"Dataset: {args.samples} samples per split, {len(features)} features")
+    print("The splits are the same loaded by PandasMultiModalLoader")
+    print(f"PandasMultiModalLoader: {librep_time:.4f} seconds")
+    print(f"read_split:             {read_time:.4f} seconds")
+    print(f"Speedup:                {librep_time / read_time:.2f}x")
@@ -0,0 +1,321 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Run the standard experiment configurations (`benchmarks/configs`) on a
+synthetic HAR dataset (see `benchmarks/synthetic.py`), using `run_experiment`
+with profiling enabled, and report the time and the peak memory (RSS) of each
+stage. The results are compared against the stored baselines
+(`benchmarks/baselines/<config>.yaml`), so performance changes can be
+measured offline and reproduced.
+
+Each repetition runs in a new (forked) process, so the peak memory of an
+experiment does not depend on the experiments executed before it. The time of
+a stage is the minimum over the repetitions and its peak memory the maximum.
+
+Example:
+    python -m benchmarks.run --repeat 3
+    python -m benchmarks.run --train-samples 20000 --save-baseline
+    python -m benchmarks.run --check --tolerance 0.2
+"""
+
+# Python imports
+import argparse
+import itertools
+import multiprocessing
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Third-party imports
+import yaml
+from dacite import from_dict
+
+from benchmarks.synthetic import default_features, generate_dataset
+from config import ExecutionConfig, ExecutorOptions
+from execute import run_experiment
+from utils import get_sys_info, load_yaml
+
+benchmarks_dir = Path(__file__).parent
+
+# Name of the dataset view used by the benchmark configurations
+dataset_name = "synthetic.benchmark"
+
+# Stages reported (names of the top-level profiling spans of `run_experiment`)
+stages = ["load", "transform", "reduce", "scale", "estimate"]
+
+
+def prepare_dataset(data_dir: Path, generator_kwargs: dict) -> Path:
+    """Generate the synthetic dataset, unless it was already generated (in
+    the same directory) with the same parameters."""
+    params_file = data_dir / "generator.yaml"
+    if params_file.exists() and load_yaml(params_file) == generator_kwargs:
+        return data_dir
+    generate_dataset(data_dir, **generator_kwargs)
+    with params_file.open("w") as f:
+        yaml.dump(generator_kwargs, f)
+    return data_dir
+
+
+def stage_metrics(profile: List[dict]) -> Dict[str, float]:
+    """Time (seconds) and peak RSS (MB) of each stage, from the top-level
+    spans of the profile of an experiment."""
+    metrics = dict()
+    for s in profile:
+        if s["parent"] is not None or s["name"] not in stages:
+            continue
+        metrics[f"{s['name']}_time"] = s["duration"]
+        metrics[f"{s['name']}_peak_rss"] = s["peak_rss"] / 1024**2
+    return metrics
+
+
+def mean_accuracy(report: List[dict]) -> float:
+    """Mean accuracy of the runs of all estimators of an experiment."""
+    accuracies = [
+        run["result"]["accuracy"]
+        for estimator in report
+        for run in estimator["results"]["runs"]
+    ]
+    return sum(accuracies) / len(accuracies)
+
+
+def run_once(config_file: Path, data_dir: Path, dtype: str = None) -> Dict[str, float]:
+    """Run a benchmark configuration once (with samples of `dtype`, if
+    informed) and return its metrics."""
+    config = from_dict(data_class=ExecutionConfig, data=load_yaml(config_file))
+    if dtype is not None:
+        config.extra.dtype = dtype
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_file = Path(output_dir) / f"{config_file.stem}.yaml"
+        run_experiment(
+            {dataset_name: data_dir},
+            output_file,
+            config,
+            ExecutorOptions(profile=True),
+        )
+        results = load_yaml(output_file)
+    additional_info = results["additional"]
+    metrics = stage_metrics(additional_info.get("profile", []))
+    metrics["total_time"] = additional_info["total_time"]
+    metrics["peak_rss"] = max(v for k, v in metrics.items() if k.endswith("_peak_rss"))
+    metrics["accuracy"] = mean_accuracy(results["report"])
+    return metrics
+
+
+def run_benchmark(
+    config_file: Path, data_dir: Path, repeat: int, dtype: str = None
+) -> Dict[str, float]:
+    """Run a benchmark configuration `repeat` times, each time in a new
+    process, and aggregate the metrics (minimum time, maximum memory and mean
+    accuracy, which differs between repetitions only if the estimators are
+    not deterministic)."""
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            runs.append(pool.submit(run_once, config_file, data_dir, dtype).result())
+    accuracies = [r["accuracy"] for r in runs]
+    if max(accuracies) != min(accuracies):
+        print(
+            f"    accuracy differs between repetitions "
+            f"({min(accuracies):.4f} to {max(accuracies):.4f}), reporting the mean"
+        )
+    metrics = {
+        k: (max if k.endswith("peak_rss") else min)(r[k] for r in runs) for k in runs[0]
+    }
+    metrics["accuracy"] = sum(accuracies) / len(accuracies)
+    return metrics
+
+
+def compare(
+    metrics: Dict[str, float],
+    baseline: Optional[Dict[str, float]],
+    time_tolerance: float,
+    memory_tolerance: float,
+    min_time: float = 0.05,
+) -> List[str]:
+    """Print the metrics (and their ratio to the baseline) and return the
+    metrics that regressed beyond the tolerance. Time increases smaller than
+    `min_time` seconds are ignored (they are usually noise). The accuracy is
+    only reported."""
+    regressions = []
+    for k, v in metrics.items():
+        unit = "MB" if k.endswith("peak_rss") else "s"
+        if k == "accuracy":
+            print(f"    {k:<24} {v:>10.3f}")
+            continue
+        line = f"    {k:<24} {v:>10.3f} {unit:<2}"
+        if baseline is not None and baseline.get(k):
+            ratio = v / baseline[k]
+            tolerance = memory_tolerance if unit == "MB" else time_tolerance
+            line += f"  baseline {baseline[k]:>10.3f} {unit:<2} ({ratio:.2f}x)"
+            significant = unit == "MB" or v - baseline[k] > min_time
+            if ratio > 1 + tolerance and significant:
+                line += "  REGRESSION"
+                regressions.append(k)
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="Experiment benchmarks",
+        description="Run the benchmark configurations on a synthetic dataset and "
+        + "compare the time and memory of each stage against the baselines",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--configs-dir",
+        type=str,
+        default=str(benchmarks_dir / "configs"),
+        help="Directory with the benchmark configurations",
+    )
+    parser.add_argument(
+        "--baselines-dir",
+        type=str,
+        default=str(benchmarks_dir / "baselines"),
+        help="Directory with the baselines (one YAML file per configuration)",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=str(Path(tempfile.gettempdir()) / "experiment-benchmarks"),
+        help="Directory of the synthetic dataset (generated if missing)",
+    )
+    parser.add_argument(
+        "--only", nargs="+", default=None, help="Run only these configurations"
+    )
+    parser.add_argument("--train-samples", type=int, default=3000)
+    parser.add_argument("--validation-samples", type=int, default=1000)
+    parser.add_argument("--test-samples", type=int, default=1000)
+    parser.add_argument("--window-size", type=int, default=60)
+    parser.add_argument(
+        "--features", nargs="+", default=default_features, help="Sensor axes"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--dtypes",
+        nargs="+",
+        default=None,
+        help="Run each configuration with samples of each of these data types "
+        + "(extra.dtype, e.g., float64 float32), instead of the configured one",
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=0.2,
+        help="Maximum relative increase of the time over the baseline",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=0.1,
+        help="Maximum relative increase of the peak memory over the baseline",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="Time increases (in seconds) smaller than this are not regressions",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save the results as the new baselines",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with an error code if any metric regressed",
+    )
+    args = parser.parse_args()
+
+    generator_kwargs = {
+        "num_samples": {
+            "train": args.train_samples,
+            "validation": args.validation_samples,
+            "test": args.test_samples,
+        },
+        "window_size": args.window_size,
+        "features": list(args.features),
+        "seed": args.seed,
+    }
+    data_dir = prepare_dataset(Path(args.data_dir), generator_kwargs)
+
+    config_files = sorted(Path(args.configs_dir).glob("*.yaml"))
+    if args.only:
+        config_files = [c for c in config_files if c.stem in args.only]
+
+    baselines_dir = Path(args.baselines_dir)
+    regressions = dict()
+    summary = []
+    for config_file, dtype in itertools.product(config_files, args.dtypes or [None]):
+        name = config_file.stem if dtype is None else f"{config_file.stem}.{dtype}"
+        print(f"{name}:")
+        metrics = run_benchmark(config_file, data_dir, args.repeat, dtype)
+        summary.append((name, metrics))
+        baseline_file = baselines_dir / f"{name}.yaml"
+        baseline = None
+        if baseline_file.exists():
+            stored = load_yaml(baseline_file)
+            if stored["dataset"] == generator_kwargs:
+                baseline = stored["metrics"]
+            else:
+                print("    (baseline was measured on a different dataset)")
+        else:
+            print("    (no baseline)")
+        failed = compare(
+            metrics,
+            baseline,
+            args.time_tolerance,
+            args.memory_tolerance,
+            args.min_time,
+        )
+        if failed:
+            regressions[name] = failed
+
+        if args.save_baseline:
+            baselines_dir.mkdir(parents=True, exist_ok=True)
+            with baseline_file.open("w") as f:
+                yaml.dump(
+                    {
+                        "dataset": generator_kwargs,
+                        "repeat": args.repeat,
+                        "system": get_sys_info(),
+                        "metrics": metrics,
+                    },
+                    f,
+                )
+
+    # Accuracy and memory of each configuration (and data type) side by side
+    if len(summary) > 1:
+        print(f"{'':<32} {'accuracy':>10} {'peak_rss':>13} {'total_time':>12}")
+        for name, metrics in summary:
+            print(
+                f"{name:<32} {metrics['accuracy']:>10.4f} "
+                + f"{metrics['peak_rss']:>10.1f} MB {metrics['total_time']:>10.3f} s"
+            )
+
+    if regressions:
+        print(f"Regressions: {regressions}")
+        if args.check:
+            sys.exit(1)
@@ -0,0 +1,100 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Measure the startup time of the executor (and of its workers): the time to
+import `execute.py` in a new interpreter, and the heavy modules imported by it.
+The algorithms of the configuration are imported only when they are used (see
+`config.LazyRegistry`), so their import time is measured separately, with
+`--lookup`.
+
+Example:
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --lookup reducers_cls:umap estimator_cls:SVM
+"""
+
+# Python imports
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+executor_dir = Path(__file__).parent.parent
+
+# Modules whose import is slow (e.g., they compile code when imported)
+heavy_modules = ["umap", "numba", "pynndescent", "sklearn", "scipy", "ray", "pandas"]
+
+# Code run in the new interpreter. It prints the import time and the heavy
+# modules imported, as JSON.
+startup_code = """
+import json, sys, time
+start = time.perf_counter()
+import execute
+import_time = time.perf_counter() - start
+modules = [m for m in {heavy_modules!r} if m in sys.modules]
+lookups = dict()
+for lookup in {lookups!r}:
+    registry, key = lookup.split(":")
+    start = time.perf_counter()
+    getattr(execute, registry)[key]
+    lookups[lookup] = time.perf_counter() - start
+print(json.dumps({{
+    "import_time": import_time,
+    "lookups": lookups,
+    "modules": modules,
+}}))
+"""
+
+
+def measure_startup(lookups=()) -> dict:
+    """Import `execute.py` (and look up the registry keys) in a new
+    interpreter and return the times (in seconds) and the heavy modules
+    imported by `execute.py`."""
+    code = startup_code.format(lookups=list(lookups), heavy_modules=heavy_modules)
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=executor_dir,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="Startup benchmark",
+        description="Measure the time to import the executor",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--lookup",
+        nargs="+",
+        default=[],
+        help="Registry keys to look up after the import (<registry>:<key>, "
+        + "e.g., reducers_cls:umap)",
+    )
+    args = parser.parse_args()
+
+    results = [measure_startup(args.lookup) for _ in range(args.repeat)]
+    print(f"import execute: {min(r['import_time'] for r in results):.3f} s")
+    for lookup in args.lookup:
+        print(f"{lookup}: {min(r['lookups'][lookup] for r in results):.3f} s")
+    print(f"heavy modules imported: {', '.join(results[-1]['modules']) or 'none'}")
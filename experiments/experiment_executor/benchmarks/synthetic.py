@@ -0,0 +1,179 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Generator of synthetic HAR datasets, in the layout expected by
+`PandasMultiModalLoader` (and, thus, by `execute.load_datasets`): a directory
+with `train.csv`, `validation.csv` and `test.csv` files, where each row is a
+window of samples, with a column for each time step of each sensor axis
+(`<feature>-<i>`, e.g., `accel-x-0` ... `accel-x-59`) and the label in the
+`standard activity code` column.
+
+The signal of each axis is a sinusoid, whose frequency and amplitude depend on
+the activity (label), plus noise, so estimators have something to learn.
+
+Example:
+    python -m benchmarks.synthetic data/synthetic --train-samples 10000
+"""
+
+# Python imports
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+
+default_features = ["accel-x", "accel-y", "accel-z", "gyro-x", "gyro-y", "gyro-z"]
+
+
+def generate_split(
+    num_samples: int,
+    window_size: int = 60,
+    features: List[str] = tuple(default_features),
+    num_classes: int = 6,
+    sampling_rate: float = 20.0,
+    noise: float = 0.5,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Generate a split of a synthetic HAR dataset.
+
+    Parameters
+    ----------
+    num_samples : int
+        Number of windows (rows).
+    window_size : int, optional
+        Number of time steps of each window, by default 60
+    features : List[str], optional
+        The sensor axes, by default accel-x/y/z and gyro-x/y/z
+    num_classes : int, optional
+        Number of activities (labels from 0 to `num_classes - 1`), by default 6
+    sampling_rate : float, optional
+        Sampling rate (in Hz) of the signals, by default 20.0
+    noise : float, optional
+        Standard deviation of the noise, by default 0.5
+    seed : int, optional
+        Seed of the random generator, by default 0
+
+    Returns
+    -------
+    pd.DataFrame
+        The split, with a row per window.
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.arange(num_samples) % num_classes
+    rng.shuffle(labels)
+    t = np.arange(window_size) / sampling_rate
+
+    columns = dict()
+    for j, feature in enumerate(features):
+        # Frequency and amplitude of each activity, for this axis
+        frequency = 0.5 + (labels[:, None] + 1) * (1.0 + 0.1 * j)
+        amplitude = 1.0 + 0.2 * ((labels[:, None] + j) % num_classes)
+        phase = rng.uniform(0, 2 * np.pi, size=(num_samples, 1))
+        signal = amplitude * np.sin(2 * np.pi * frequency * t[None, :] + phase)
+        signal += rng.normal(0, noise, size=signal.shape)
+        for i in range(window_size):
+            columns[f"{feature}-{i}"] = signal[:, i].astype(np.float32)
+
+    columns["user"] = rng.integers(0, 30, size=num_samples)
+    columns["activity code"] = labels
+    columns["standard activity code"] = labels
+    return pd.DataFrame(columns)
+
+
+def generate_dataset(
+    root_dir: PathLike,
+    num_samples: Dict[str, int] = None,
+    window_size: int = 60,
+    features: List[str] = tuple(default_features),
+    num_classes: int = 6,
+    seed: int = 0,
+) -> Path:
+    """Generate a synthetic HAR dataset (train, validation and test splits).
+
+    Parameters
+    ----------
+    root_dir : PathLike
+        Directory where the split files are written (created if needed).
+    num_samples : Dict[str, int], optional
+        Number of windows of each split, by default 3000 (train), 1000
+        (validation) and 1000 (test)
+    window_size : int, optional
+        Number of time steps of each window, by default 60
+    features : List[str], optional
+        The sensor axes, by default accel-x/y/z and gyro-x/y/z
+    num_classes : int, optional
+        Number of activities, by default 6
+    seed : int, optional
+        Seed of the random generator, by default 0
+
+    Returns
+    -------
+    Path
+        The dataset directory.
+    """
+    num_samples = num_samples or {"train": 3000, "validation": 1000, "test": 1000}
+    root_dir = Path(root_dir)
+    root_dir.mkdir(parents=True, exist_ok=True)
+    for i, (split, n) in enumerate(num_samples.items()):
+        df = generate_split(
+            n,
+            window_size=window_size,
+            features=features,
+            num_classes=num_classes,
+            seed=seed + i,
+        )
+        df.to_csv(root_dir / f"{split}.csv", index=False)
+    return root_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="Synthetic HAR dataset",
+        description="Generate a synthetic HAR dataset (train, validation and test CSV files)",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("output_dir", help="Directory of the dataset", type=str)
+    parser.add_argument("--train-samples", type=int, default=3000)
+    parser.add_argument("--validation-samples", type=int, default=1000)
+    parser.add_argument("--test-samples", type=int, default=1000)
+    parser.add_argument("--window-size", type=int, default=60)
+    parser.add_argument(
+        "--features", nargs="+", default=default_features, help="Sensor axes"
+    )
+    parser.add_argument("--num-classes", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_dataset(
+        args.output_dir,
+        num_samples={
+            "train": args.train_samples,
+            "validation": args.validation_samples,
+            "test": args.test_samples,
+        },
+        window_size=args.window_size,
+        features=args.features,
+        num_classes=args.num_classes,
+        seed=args.seed,
+    )
@@ -0,0 +1,526 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Caches shared between experiments.
+
+Each cache entry is a directory, named after a hash of everything that
+produced it (content-addressed). Multimodal datasets are stored as plain numpy
+`.npy` files (`X.npy` and `y.npy`) plus a small YAML file with the window
+slices and names, so they can be memory-mapped back instead of being parsed
+again from the CSV files.
+"""
+
+# Python imports
+import fcntl
+import logging
+import os
+import pickle
+import shutil
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+import yaml
+from dict_hash import sha256
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+from librep.datasets.multimodal import ArrayMultiModalDataset
+
+
+def source_fingerprint(dataset_path: PathLike, split: str) -> dict:
+    """Identify the current version of a dataset split file (`<split>.csv`).
+    Any change in the file (size or modification time) changes the fingerprint
+    and, thus, the keys of the entries derived from it.
+
+    Parameters
+    ----------
+    dataset_path : PathLike
+        The root directory of the dataset view.
+    split : str
+        The split name (train, validation or test).
+
+    Returns
+    -------
+    dict
+        A dictionary with the path, size and modification time of the file.
+    """
+    path = Path(dataset_path) / f"{split}.csv"
+    stat = path.stat()
+    return {
+        "path": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+
+
+def save_multimodal(directory: PathLike, dataset: ArrayMultiModalDataset):
+    """Save an ArrayMultiModalDataset to a directory. The directory is first
+    written to a temporary location and then renamed, so concurrent readers
+    never see a partially written entry.
+
+    Parameters
+    ----------
+    directory : PathLike
+        The directory where the dataset will be saved.
+    dataset : ArrayMultiModalDataset
+        The dataset to save.
+    """
+    directory = Path(directory)
+    tmp_directory = directory.with_name(f".{directory.name}.{uuid.uuid4().hex}")
+    tmp_directory.mkdir(parents=True)
+    try:
+        np.save(tmp_directory / "X.npy", np.asarray(dataset.X))
+        np.save(tmp_directory / "y.npy", np.asarray(dataset.y))
+        metadata = {
+            "window_slices": [list(s) for s in dataset.window_slices],
+            "window_names": list(dataset.window_names),
+        }
+        with (tmp_directory / "metadata.yaml").open("w") as f:
+            yaml.dump(metadata, f)
+        os.rename(tmp_directory, directory)
+    except OSError:
+        # Other process has written the same entry first
+        if not directory.exists():
+            raise
+    finally:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+
+
+def load_multimodal(directory: PathLike, mmap: bool = True) -> ArrayMultiModalDataset:
+    """Load an ArrayMultiModalDataset saved with `save_multimodal`.
+
+    Parameters
+    ----------
+    directory : PathLike
+        The directory where the dataset was saved.
+    mmap : bool, optional
+        Memory-map the arrays (read-only) instead of reading them,
+        by default True
+
+    Returns
+    -------
+    ArrayMultiModalDataset
+        The loaded dataset.
+    """
+    directory = Path(directory)
+    mmap_mode = "r" if mmap else None
+    with (directory / "metadata.yaml").open("r") as f:
+        metadata = yaml.load(f, Loader=yaml.CLoader)
+    return ArrayMultiModalDataset(
+        X=np.load(directory / "X.npy", mmap_mode=mmap_mode),
+        y=np.load(directory / "y.npy", mmap_mode=mmap_mode),
+        window_slices=[tuple(s) for s in metadata["window_slices"]],
+        window_names=metadata["window_names"],
+    )
+
+
+def dataset_nbytes(dataset: ArrayMultiModalDataset) -> int:
+    """Size, in bytes, of the arrays of an ArrayMultiModalDataset."""
+    return int(np.asarray(dataset.X).nbytes + np.asarray(dataset.y).nbytes)
+
+
+class DatasetCache:
+    """Content-addressed cache of loaded dataset splits.
+
+    Each entry stores one split of one dataset view, loaded with a set of
+    features and a label column. The key also includes the fingerprint of
+    the split file, so entries are invalidated when the source changes.
+
+    If `max_bytes` is informed, the least recently used entries are evicted
+    to store new ones (so entries of changed sources, which are not used
+    anymore, are eventually removed). The processes sharing the cache use a
+    file lock.
+
+    Parameters
+    ----------
+    root_dir : PathLike
+        Directory where the entries are stored.
+    mmap : bool, optional
+        Memory-map the cached arrays when loading, by default True
+    max_bytes : int, optional
+        Maximum size of the entries, in bytes, by default None (no limit)
+    """
+
+    def __init__(
+        self, root_dir: PathLike, mmap: bool = True, max_bytes: Optional[int] = None
+    ):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.mmap = mmap
+        self.max_bytes = max_bytes
+
+    def key(
+        self,
+        dataset_path: PathLike,
+        split: str,
+        features: List[str],
+        label: str,
+    ) -> str:
+        return sha256(
+            {
+                "source": source_fingerprint(dataset_path, split),
+                "features": list(features),
+                "label": label,
+            }
+        )
+
+    @contextmanager
+    def _lock(self):
+        with (self.root_dir / ".lock").open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _entry_size(directory: Path) -> int:
+        return sum(f.stat().st_size for f in directory.iterdir())
+
+    def _evict(self, nbytes: int):
+        """Remove the least recently used entries until `nbytes` more bytes
+        fit in the cache (the lock must be held)."""
+        entries = []
+        for directory in self.root_dir.iterdir():
+            if directory.name.startswith(".") or not directory.is_dir():
+                continue
+            entries.append(
+                (directory.stat().st_mtime, self._entry_size(directory), directory)
+            )
+        used = sum(size for _, size, _ in entries)
+        for _, size, directory in sorted(entries):
+            if used + nbytes <= self.max_bytes:
+                break
+            # Processes with the entry memory-mapped keep reading it
+            shutil.rmtree(directory, ignore_errors=True)
+            used -= size
+            logging.info(f"Evicted {directory.name} from {self.root_dir}")
+
+    def _load(self, key: str) -> Optional[ArrayMultiModalDataset]:
+        directory = self.root_dir / key
+        if not directory.exists():
+            return None
+        try:
+            return load_multimodal(directory, mmap=self.mmap)
+        except Exception:
+            logging.exception(f"Invalid dataset cache entry {directory}. Ignoring it")
+            return None
+
+    def get(self, key: str) -> Optional[ArrayMultiModalDataset]:
+        if self.max_bytes is None:
+            return self._load(key)
+        directory = self.root_dir / key
+        with self._lock():
+            if not directory.exists():
+                return None
+            # Mark the entry as recently used
+            os.utime(directory)
+            return self._load(key)
+
+    def put(self, key: str, dataset: ArrayMultiModalDataset):
+        directory = self.root_dir / key
+        if self.max_bytes is None:
+            if not directory.exists():
+                save_multimodal(directory, dataset)
+            return
+        nbytes = dataset_nbytes(dataset)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock():
+            if directory.exists():
+                return
+            self._evict(nbytes)
+            save_multimodal(directory, dataset)
+
+
+class NodeDatasetCache(DatasetCache):
+    """Node-local cache of loaded dataset splits (e.g., in `/dev/shm` or in
+    a local disk), in front of the dataset files (and of the shared dataset
+    cache, if any) stored in a network filesystem. The first experiment of a
+    node that uses a split reads it from the shared storage (copying the
+    entry of the shared cache or parsing the CSV file) and stores it in the
+    node cache; the next experiments of the node memory-map it from there.
+
+    Entries have the same keys of `DatasetCache` (the hash of the fingerprint
+    of the source file, the features and the label). The cache is limited to
+    `max_bytes`: the least recently used entries are evicted to store new
+    ones. The processes of a node share the cache, using a file lock.
+
+    Parameters
+    ----------
+    root_dir : PathLike
+        Directory where the entries are stored (local to the node).
+    max_bytes : int
+        Maximum size of the entries, in bytes.
+    shared_cache : DatasetCache, optional
+        Shared cache of loaded splits, whose entries are copied to the node
+        cache when missing. Splits put in the node cache are also put in it.
+        By default None
+    mmap : bool, optional
+        Memory-map the cached arrays when loading, by default True
+    """
+
+    def __init__(
+        self,
+        root_dir: PathLike,
+        max_bytes: int,
+        shared_cache: DatasetCache = None,
+        mmap: bool = True,
+    ):
+        super().__init__(root_dir, mmap=mmap, max_bytes=max_bytes)
+        self.shared_cache = shared_cache
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[ArrayMultiModalDataset]:
+        directory = self.root_dir / key
+        with self._lock():
+            if directory.exists():
+                # Mark the entry as recently used
+                os.utime(directory)
+                dataset = self._load(key)
+                if dataset is not None:
+                    self.hits += 1
+                    return dataset
+            self.misses += 1
+            # Copy the entry of the shared cache, if any
+            if self.shared_cache is None:
+                return None
+            shared_directory = self.shared_cache.root_dir / key
+            if not shared_directory.exists():
+                return None
+            nbytes = self._entry_size(shared_directory)
+            if nbytes > self.max_bytes:
+                return self.shared_cache.get(key)
+            self._evict(nbytes)
+            tmp_directory = directory.with_name(f".{key}.{uuid.uuid4().hex}")
+            try:
+                shutil.copytree(shared_directory, tmp_directory)
+                shutil.rmtree(directory, ignore_errors=True)
+                os.rename(tmp_directory, directory)
+            finally:
+                shutil.rmtree(tmp_directory, ignore_errors=True)
+            return self._load(key)
+
+    def put(self, key: str, dataset: ArrayMultiModalDataset):
+        if self.shared_cache is not None:
+            self.shared_cache.put(key, dataset)
+        nbytes = dataset_nbytes(dataset)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock():
+            if (self.root_dir / key).exists():
+                return
+            self._evict(nbytes)
+            save_multimodal(self.root_dir / key, dataset)
+
+    def stats(self) -> dict:
+        """Number of hits and misses (splits read from the shared storage)
+        of this instance, and the hit rate."""
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else None,
+        }
+
+
+class TransformCache:
+    """Two-tier cache of transformed datasets.
+
+    The first tier is an in-process LRU, bounded by the total size (in bytes)
+    of the stored arrays. As it lives in the process, it is shared by all
+    experiments executed by it (e.g., sequential runs or reused Ray workers).
+    The second tier (optional) stores the datasets on disk, in a
+    `DatasetCache` (optionally bounded, with least recently used eviction),
+    shared by all processes.
+
+    Parameters
+    ----------
+    root_dir : PathLike, optional
+        Directory where the disk entries are stored. If None, only the
+        in-process tier is used. By default None
+    max_memory_bytes : int, optional
+        Maximum size of the in-process tier, by default 1 GiB
+    max_disk_bytes : int, optional
+        Maximum size of the disk tier, by default None (no limit)
+    """
+
+    def __init__(
+        self,
+        root_dir: PathLike = None,
+        max_memory_bytes: int = 1024**3,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        self.root_dir = Path(root_dir) if root_dir is not None else None
+        self._disk = None
+        if self.root_dir is not None:
+            self._disk = DatasetCache(self.root_dir, max_bytes=max_disk_bytes)
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+
+    def key(
+        self,
+        datasets: List[dict],
+        features: List[str],
+        transform_configs: List[dict],
+    ) -> str:
+        return sha256(
+            {
+                "datasets": list(datasets),
+                "features": list(features),
+                "transforms": list(transform_configs),
+            }
+        )
+
+    def get(self, key: str) -> Optional[ArrayMultiModalDataset]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if self._disk is None:
+            return None
+        dataset = self._disk.get(key)
+        if dataset is not None:
+            self._put_memory(key, dataset)
+        return dataset
+
+    def put(self, key: str, dataset: ArrayMultiModalDataset):
+        if self._disk is not None:
+            self._disk.put(key, dataset)
+        self._put_memory(key, dataset)
+
+    def _put_memory(self, key: str, dataset: ArrayMultiModalDataset):
+        size = dataset_nbytes(dataset)
+        if key in self._memory or size > self.max_memory_bytes:
+            return
+        self._memory[key] = dataset
+        self._memory_bytes += size
+        # Evict the least recently used entries
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= dataset_nbytes(evicted)
+
+
+class ReducerStore:
+    """On-disk store of fitted reducers.
+
+    Each entry is a pickled fitted reducer, keyed by everything that
+    determines the fit: the dataset used to fit it (see
+    `execute.dataset_spec`), the transforms applied to it, the reducer
+    configuration, how the reduction is applied (`reduce_on`) and the window
+    it was fit on (and the number of samples it was fit on, if subsampled).
+    The time taken to fit is stored along with the reducer.
+
+    Parameters
+    ----------
+    root_dir : PathLike
+        Directory where the entries are stored.
+    """
+
+    def __init__(self, root_dir: PathLike):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(
+        self,
+        reducer_dataset: dict,
+        transforms: List[dict],
+        reducer: dict,
+        reduce_on: str,
+        window: Any,
+        fit_samples: Optional[int] = None,
+    ) -> str:
+        inputs = {
+            "reducer_dataset": reducer_dataset,
+            "transforms": list(transforms),
+            "reducer": reducer,
+            "reduce_on": reduce_on,
+            "window": window,
+        }
+        # Reducers fitted on a subsample (streaming mode) differ from the
+        # ones fitted on the whole dataset
+        if fit_samples is not None:
+            inputs["fit_samples"] = fit_samples
+        return sha256(inputs)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return the fitted reducer and the time (in seconds) taken to fit it,
+        or None if it is not stored."""
+        path = self.root_dir / f"{key}.pkl"
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as f:
+                entry = pickle.load(f)
+            return entry["reducer"], entry["fit_time"]
+        except Exception:
+            logging.exception(f"Invalid reducer store entry {path}. Ignoring it")
+            return None
+
+    def put(self, key: str, reducer: Any, fit_time: float):
+        path = self.root_dir / f"{key}.pkl"
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        try:
+            with tmp_path.open("wb") as f:
+                pickle.dump({"reducer": reducer, "fit_time": fit_time}, f)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+
+# Transform caches of this process (one per configuration)
+_transform_caches = dict()
+
+
+def get_transform_cache(
+    root_dir: PathLike = None,
+    max_memory_bytes: int = 1024**3,
+    max_disk_bytes: Optional[int] = None,
+) -> TransformCache:
+    """Return the TransformCache of this process with the given configuration,
+    creating it at the first call. Thus, its in-process tier is kept between
+    experiments executed by the same process.
+
+    Parameters
+    ----------
+    root_dir : PathLike, optional
+        Directory where the disk entries are stored, by default None
+    max_memory_bytes : int, optional
+        Maximum size of the in-process tier, by default 1 GiB
+    max_disk_bytes : int, optional
+        Maximum size of the disk tier, by default None (no limit)
+
+    Returns
+    -------
+    TransformCache
+        The transform cache.
+    """
+    key = (str(root_dir), max_memory_bytes, max_disk_bytes)
+    if key not in _transform_caches:
+        _transform_caches[key] = TransformCache(
+            root_dir, max_memory_bytes, max_disk_bytes
+        )
+    return _transform_caches[key]
@@ -0,0 +1,178 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Stage-level checkpoints of an experiment, so an interrupted experiment
+resumes from its last completed stage instead of from the beginning.
+
+The checkpoints of an experiment are in
+`<output_dir>/.checkpoints/<experiment_id>/`: a directory for the latest
+preprocessing stage completed (the checkpoints of the previous stages are
+removed) and a pickled file for each estimator evaluated (with its results).
+The datasets of a stage are saved with `save_multimodal` (the arrays are
+streamed to `.npy` files, so memory-mapped datasets are not read into memory)
+and loaded memory-mapped, and only the additional information produced by
+the stage is pickled. Each checkpoint stores a hash of the experiment
+configuration, so checkpoints of a modified configuration are ignored. The
+checkpoints are removed when the experiment finishes.
+"""
+
+# Python imports
+import logging
+import os
+import pickle
+import shutil
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+# Third-party imports
+from dict_hash import sha256
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+
+from cache import load_multimodal, save_multimodal
+from config import ExecutionConfig
+
+# Stages with checkpoints (in the order they are executed)
+checkpoint_stages = ["transform", "reduce", "scale"]
+
+
+class ExperimentCheckpoint:
+    """Checkpoints of the stages of an experiment.
+
+    Parameters
+    ----------
+    root_dir : PathLike
+        Directory of the checkpoints of all experiments (e.g.,
+        `<output_dir>/.checkpoints`).
+    experiment_id : str
+        The experiment identifier (name of the configuration file).
+    config : ExecutionConfig
+        The configuration of the experiment.
+    extra : dict, optional
+        Other values that change the outputs of the stages (e.g., executor
+        options), included in the configuration hash. By default None
+    """
+
+    def __init__(
+        self,
+        root_dir: PathLike,
+        experiment_id: str,
+        config: ExecutionConfig,
+        extra: dict = None,
+    ):
+        self.directory = Path(root_dir) / experiment_id
+        self.config_hash = sha256({"config": asdict(config), "extra": extra or {}})
+
+    def _save(self, name: str, value: Any):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}.pkl"
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        try:
+            with tmp_path.open("wb") as f:
+                pickle.dump({"config_hash": self.config_hash, "value": value}, f)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def _load(self, name: str) -> Optional[Any]:
+        path = self.directory / f"{name}.pkl"
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            logging.exception(f"Invalid checkpoint {path}. Ignoring it")
+            return None
+        if entry["config_hash"] != self.config_hash:
+            logging.warning(f"Checkpoint {path} is from other configuration")
+            return None
+        return entry["value"]
+
+    def save_stage(self, stage: str, datasets: Tuple[Any, ...], additional_info: dict):
+        """Save the output of a preprocessing stage, removing the checkpoints
+        of the previous stages (only the latest stage is resumed from)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"stage-{stage}"
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        try:
+            tmp_path.mkdir()
+            for i, dataset in enumerate(datasets):
+                if dataset is not None:
+                    save_multimodal(tmp_path / str(i), dataset)
+            # The datasets are not pickled, only which of them are present
+            info = {
+                "config_hash": self.config_hash,
+                "datasets": [dataset is not None for dataset in datasets],
+                "additional_info": additional_info,
+            }
+            with (tmp_path / "info.pkl").open("wb") as f:
+                pickle.dump(info, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        for previous in checkpoint_stages[: checkpoint_stages.index(stage)]:
+            shutil.rmtree(self.directory / f"stage-{previous}", ignore_errors=True)
+
+    def _load_stage(self, stage: str) -> Optional[Tuple[Tuple[Any, ...], dict]]:
+        path = self.directory / f"stage-{stage}"
+        if not (path / "info.pkl").exists():
+            return None
+        try:
+            with (path / "info.pkl").open("rb") as f:
+                info = pickle.load(f)
+            if info["config_hash"] != self.config_hash:
+                logging.warning(f"Checkpoint {path} is from other configuration")
+                return None
+            datasets = tuple(
+                load_multimodal(path / str(i)) if present else None
+                for i, present in enumerate(info["datasets"])
+            )
+        except Exception:
+            logging.exception(f"Invalid checkpoint {path}. Ignoring it")
+            return None
+        return datasets, info["additional_info"]
+
+    def latest_stage(self) -> Optional[Tuple[str, Tuple[Any, ...], dict]]:
+        """The latest valid stage checkpoint, as a (stage, datasets,
+        additional_info) tuple, or None if there is no valid checkpoint. The
+        datasets are memory-mapped (read-only)."""
+        for stage in reversed(checkpoint_stages):
+            value = self._load_stage(stage)
+            if value is not None:
+                datasets, additional_info = value
+                return stage, datasets, additional_info
+        return None
+
+    def save_estimator(self, index: int, results: dict):
+        """Save the results of the `index`-th estimator."""
+        self._save(f"estimator-{index}", results)
+
+    def load_estimator(self, index: int) -> Optional[dict]:
+        """The results of the `index`-th estimator, or None if not saved."""
+        return self._load(f"estimator-{index}")
+
+    def clear(self):
+        """Remove the checkpoints of the experiment."""
+        shutil.rmtree(self.directory, ignore_errors=True)
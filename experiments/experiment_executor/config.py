@@ -18,19 +18,14 @@
 # DEALINGS IN THE SOFTWARE. 
 
 # Python imports
+import importlib
+from collections.abc import Mapping
 from dataclasses import dataclass
-from typing import List, Optional
+from importlib.metadata import entry_points
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 # Librep imports
 from librep.base.transform import Transform
-from librep.estimators import SVC, KNeighborsClassifier, RandomForestClassifier
-from librep.transforms.fft import FFT
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
-
-from transforms import Spectrogram
-
-# Third-party imports
-from umap import UMAP
 
 ################################################################################
 # Configuration classes
@@ -83,6 +78,19 @@ class ExtraConfig:
     in_use_features: list
     reduce_on: str  # valid values: all, sensor, axis
     scale_on: str  # valid values: self, train
+    # Data type of the samples (e.g., float32). The datasets are cast to it
+    # when loaded, and kept in it by every stage. None keeps the loaded type
+    dtype: Optional[str] = None
+
+
+@dataclass
+class SearchConfig:
+    # Values of each parameter. The key is the parameter: "reducer.<kwarg>",
+    # "scaler.<kwarg>" or "estimators.<index>.<kwarg>" (see search.py)
+    space: Dict[str, list]
+    method: str = "grid"  # valid values: grid, random
+    num_samples: Optional[int] = None  # Number of points sampled (random)
+    seed: Optional[int] = 0  # Seed of the sampling (random)
 
 
 @dataclass
@@ -103,6 +111,63 @@ class ExecutionConfig:
     estimators: List[EstimatorConfig]
     # Extra
     extra: ExtraConfig
+    # Hyperparameter search (each point is an experiment, see search.py)
+    search: Optional[SearchConfig] = None
+
+
+################################################################################
+# Executor options
+################################################################################
+
+# Options that control how the experiments are executed (not what is executed).
+# They are not part of the YAML configuration files, and they are set from the
+# command line arguments of the `execute.py` script.
+
+
+@dataclass
+class ExecutorOptions:
+    # Root directory of the on-disk caches (None disables caching)
+    cache_dir: Optional[str] = None
+    # Maximum size (in MB) of the in-process cache of transformed datasets
+    transform_cache_memory: int = 1024
+    # Maximum size (in MB) of each on-disk cache of datasets (loaded and
+    # transformed) in cache_dir, evicting the least recently used entries
+    # (None is no limit)
+    cache_size: Optional[int] = 16384
+    # Fit the reducers even if they are in the reducer store
+    force_refit: bool = False
+    # Number of processes running the runs of each estimator in parallel
+    estimator_workers: int = 1
+    # Number of processes fitting the reducers of each window in parallel
+    reducer_workers: int = 1
+    # Number of rows of each chunk in streaming mode (None disables it)
+    chunk_size: Optional[int] = None
+    # Maximum number of rows used to fit reducers and scalers (without
+    # partial_fit) in streaming mode (None uses all rows)
+    fit_samples: Optional[int] = None
+    # Reserve CPUs and memory for each Ray task, estimated from the
+    # configuration and dataset sizes (see resources.py)
+    task_resources: bool = False
+    # Maximum number of CPUs reserved for a Ray task (None is the number of
+    # CPUs of the largest node)
+    max_task_cpus: Optional[int] = None
+    # Save stage checkpoints, to resume interrupted experiments
+    checkpoint: bool = False
+    # Backend where the results are stored (see results.py)
+    results_backend: str = "yaml"
+    # Also save the results as YAML files (when the backend is not "yaml")
+    export_yaml: bool = False
+    # Record nested profiling spans of the experiments (see profiler.py)
+    profile: bool = False
+    # Also trace the memory allocated by Python in each span (slow)
+    profile_allocations: bool = False
+    # Do not run the points of hyperparameter searches with saved results
+    skip_existing: bool = False
+    # Directory of the node-local cache of dataset splits (e.g., in /dev/shm),
+    # in front of the shared storage (None disables it)
+    node_cache_dir: Optional[str] = None
+    # Maximum size (in MB) of the node-local cache of dataset splits
+    node_cache_size: int = 4096
 
 
 ################################################################################
@@ -118,6 +183,77 @@ class Identity(Transform):
         return X
 
 
+################################################################################
+# Lazy registries
+################################################################################
+
+
+class LazyRegistry(Mapping):
+    """Dictionary of classes, indexed by their configuration keys,
+    that imports each class only the first time its key is looked up. Thus,
+    the executor (and each of its workers) only imports the algorithms used by
+    the experiments it runs (e.g., UMAP, whose import compiles numba code, is
+    not imported if no experiment uses it).
+
+    The classes are given as "module:attribute" strings (or as the class
+    itself). Other packages may add keys to a registry by declaring entry
+    points in the registry group (e.g., `experiment_executor.estimators`),
+    whose name is the key and whose value is the "module:attribute" string.
+    The entry points are read the first time a key is not found or the keys
+    are listed.
+
+    Parameters
+    ----------
+    entries : Dict[str, Union[str, Any]]
+        The builtin keys and their classes (or "module:attribute" strings).
+    group : str, optional
+        The entry point group of the plugins, by default None (no plugins)
+    """
+
+    def __init__(self, entries: Dict[str, Union[str, Any]], group: str = None):
+        self._entries = dict(entries)
+        self.group = group
+        self._plugins_loaded = group is None
+
+    def register(self, key: str, value: Union[str, Any]):
+        """Add (or replace) a key, given its class or its "module:attribute"
+        string."""
+        self._entries[key] = value
+
+    def _load_plugins(self):
+        if self._plugins_loaded:
+            return
+        self._plugins_loaded = True
+        for entry_point in entry_points(group=self.group):
+            # The builtin keys are not replaced by plugins
+            self._entries.setdefault(entry_point.name, entry_point.value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._entries:
+            self._load_plugins()
+        value = self._entries[key]
+        if isinstance(value, str):
+            module, _, attribute = value.split("[")[0].strip().partition(":")
+            value = importlib.import_module(module)
+            for name in attribute.split("."):
+                value = getattr(value, name)
+            self._entries[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        self._load_plugins()
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        self._load_plugins()
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        if key not in self._entries:
+            self._load_plugins()
+        return key in self._entries
+
+
 ################################################################################
 # Constants (Valid keys)
 ################################################################################
@@ -127,40 +263,64 @@ class Identity(Transform):
 # The key is the algorithm name and the value is the class to use.
 # Estimators must be a subclass of `librep.estimators.base.BaseEstimator` or implement
 # the same interface (scikit-learn compatible, fit/predict methods)
-estimator_cls = {
-    "SVM": SVC,
-    "KNN": KNeighborsClassifier,
-    "RandomForest": RandomForestClassifier,
-}
+# The classes are imported when first used (see `LazyRegistry`).
+estimator_cls = LazyRegistry(
+    {
+        "SVM": "librep.estimators:SVC",
+        "KNN": "librep.estimators:KNeighborsClassifier",
+        "RandomForest": "librep.estimators:RandomForestClassifier",
+        "ApproxKNN": "estimators:RandomProjectionForestKNN",
+        "SGD": "estimators:IncrementalSGDClassifier",
+        "GaussianNB": "estimators:IncrementalGaussianNB",
+        "MiniBatchKMeans": "estimators:MiniBatchKMeansClassifier",
+    },
+    group="experiment_executor.estimators",
+)
 
 # Dictionary with the valid reducer keys to use in experiment configuration
 # (under reducer.algorithm key).
 # The key is the algorithm name and the value is the class to use.
 # Reducers must be a subclass of `librep.reducers.base.Transform` or implement
 # the same interface (scikit-learn compatible, fit/transform methods)
-reducers_cls = {"identity": Identity, "umap": UMAP}
+reducers_cls = LazyRegistry(
+    {"identity": Identity, "umap": "umap:UMAP"},
+    group="experiment_executor.reducers",
+)
 
 # Dictionary with the valid transforms keys to use in experiment configuration
 # (under transform.transform key).
 # The key is the algorithm name and the value is the class to use.
 # Transforms must be a subclass of `librep.transforms.base.Transform` or implement
 # the same interface (scikit-learn compatible, fit/transform methods)
-transforms_cls = {
-    "identity": Identity,
-    "fft": FFT,
-    "spectrogram": Spectrogram
-}
+transforms_cls = LazyRegistry(
+    {
+        "identity": Identity,
+        "fft": "librep.transforms.fft:FFT",
+        "spectrogram": "transforms:Spectrogram",
+    },
+    group="experiment_executor.transforms",
+)
+
+# Transforms (keys of `transforms_cls`) that transform each row of the input
+# independently (e.g., the FFT of each sample), with the kwargs known to keep them
+# row-wise. When applied to each window (and configured only with these kwargs),
+# they are applied to all windows at once (see `do_batched_transform` in
+# execute.py). Other transforms may declare it with a `rowwise = True` attribute.
+rowwise_transforms = {"identity": [], "fft": ["absolute", "centered"]}
 
 # Dictionary with the valid scalers keys to use in experiment configuration
 # (under scaler.algorithm key).
 # The key is the algorithm name and the value is the class to use.
 # Scalers must be a subclass of `librep.scalers.base.Transform` or implement
 # the same interface (scikit-learn compatible, fit/transform methods)
-scaler_cls = {
-    "identity": Identity,
-    "StandardScaler": StandardScaler,
-    "MinMaxScaler": MinMaxScaler,
-}
+scaler_cls = LazyRegistry(
+    {
+        "identity": Identity,
+        "StandardScaler": "sklearn.preprocessing:StandardScaler",
+        "MinMaxScaler": "sklearn.preprocessing:MinMaxScaler",
+    },
+    group="experiment_executor.scalers",
+)
 
 # Dictionary with standard labels for each activity code
 standard_labels_activity = {
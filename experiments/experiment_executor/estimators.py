@@ -0,0 +1,428 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Estimators that complement the ones from `librep.estimators` (see
+`estimator_cls` in config.py).
+"""
+
+# Python imports
+from typing import Any, List, Tuple
+
+# Third-party imports
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+from sklearn.utils import check_random_state
+
+from streaming import iter_chunks
+
+
+class RandomProjectionTree:
+    """A tree that recursively splits the samples by random hyperplanes (the
+    perpendicular bisector of two random samples of the node), until the
+    leaves have at most `leaf_size` samples. Close samples tend to fall in
+    the same leaf.
+
+    The nodes are stored in arrays: `normals` and `offsets` (the hyperplane
+    of each internal node), `children` (left and right child of each internal
+    node) and `leaves` (index of the leaf of each leaf node, -1 for internal
+    nodes). The samples of each leaf are in `leaf_samples`.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        The samples (n_samples, n_features).
+    leaf_size : int
+        Maximum number of samples in a leaf.
+    random_state : np.random.RandomState
+        The random generator.
+    """
+
+    def __init__(self, X: np.ndarray, leaf_size: int, random_state):
+        normals, offsets, children, leaves = [], [], [], []
+        self.leaf_samples: List[np.ndarray] = []
+        # Stack of (node id, samples of the node)
+        stack = [
+            (self._add_node(normals, offsets, children, leaves), np.arange(len(X)))
+        ]
+        while stack:
+            node, samples = stack.pop()
+            split = None
+            if len(samples) > leaf_size:
+                split = self._split(X, samples, random_state)
+            if split is None:
+                leaves[node] = len(self.leaf_samples)
+                self.leaf_samples.append(samples)
+                continue
+            normal, offset, left, right = split
+            normals[node] = normal
+            offsets[node] = offset
+            children[node] = (
+                self._add_node(normals, offsets, children, leaves),
+                self._add_node(normals, offsets, children, leaves),
+            )
+            stack.append((children[node][0], left))
+            stack.append((children[node][1], right))
+
+        # Leaves have no hyperplane
+        zeros = np.zeros(X.shape[1], dtype=X.dtype)
+        self.normals = np.array(
+            [zeros if normal is None else normal for normal in normals], dtype=X.dtype
+        )
+        self.offsets = np.array(offsets, dtype=X.dtype)
+        self.children = np.array(children, dtype=np.intp)
+        self.leaves = np.array(leaves, dtype=np.intp)
+
+    @staticmethod
+    def _add_node(normals, offsets, children, leaves) -> int:
+        normals.append(None)
+        offsets.append(0.0)
+        children.append((-1, -1))
+        leaves.append(-1)
+        return len(leaves) - 1
+
+    @staticmethod
+    def _split(
+        X: np.ndarray, samples: np.ndarray, random_state
+    ) -> Tuple[np.ndarray, float, np.ndarray, np.ndarray]:
+        a, b = X[random_state.choice(samples, 2, replace=False)]
+        normal = a - b
+        offset = normal @ (a + b) / 2
+        side = X[samples] @ normal > offset
+        left, right = samples[~side], samples[side]
+        if len(left) == 0 or len(right) == 0:
+            # Duplicated samples: split them in two halves, at random
+            samples = random_state.permutation(samples)
+            left, right = samples[: len(samples) // 2], samples[len(samples) // 2 :]
+            # Route the queries to the left leaf (any of them is as good)
+            normal = np.zeros(X.shape[1], dtype=X.dtype)
+            offset = 0.0
+        return normal, offset, left, right
+
+    def query_leaves(self, Q: np.ndarray) -> np.ndarray:
+        """The leaf of each query sample (n_queries,)."""
+        node = np.zeros(len(Q), dtype=np.intp)
+        internal = np.flatnonzero(self.leaves[node] < 0)
+        while len(internal) > 0:
+            current = node[internal]
+            side = np.einsum("ij,ij->i", Q[internal], self.normals[current])
+            side = side > self.offsets[current]
+            node[internal] = self.children[current, side.astype(np.intp)]
+            internal = internal[self.leaves[node[internal]] < 0]
+        return self.leaves[node]
+
+
+class RandomProjectionForestKNN(BaseEstimator, ClassifierMixin):
+    """Approximate k-nearest neighbors classifier, using a forest of random
+    projection trees as index (see `RandomProjectionTree`), built at fit time.
+
+    The candidate neighbors of a query are the samples of the leaf it falls
+    in, in each tree. The `n_neighbors` closest candidates (exact Euclidean
+    distance) vote its class. Queries are answered in batches: all queries
+    that fall in the same leaf are compared with its samples at once.
+
+    More trees (`n_trees`) and larger leaves (`leaf_size`) find more of the
+    true neighbors (higher recall) but compare each query with more samples
+    (slower predictions); more trees also take longer to fit.
+
+    Parameters
+    ----------
+    n_neighbors : int, optional
+        Number of neighbors that vote the class, by default 5
+    n_trees : int, optional
+        Number of trees of the index, by default 10
+    leaf_size : int, optional
+        Maximum number of samples in each leaf, by default 50
+    batch_size : int, optional
+        Number of queries answered at once (bounds the memory used to
+        predict), by default 4096
+    random_state : int, optional
+        Seed of the random hyperplanes, by default None (the global numpy
+        random generator)
+    """
+
+    def __init__(
+        self,
+        n_neighbors: int = 5,
+        n_trees: int = 10,
+        leaf_size: int = 50,
+        batch_size: int = 4096,
+        random_state: int = None,
+    ):
+        self.n_neighbors = n_neighbors
+        self.n_trees = n_trees
+        self.leaf_size = leaf_size
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X)
+        if not np.issubdtype(X.dtype, np.floating):
+            X = X.astype(np.float64)
+        random_state = check_random_state(self.random_state)
+        self.classes_, self._y = np.unique(np.asarray(y), return_inverse=True)
+        self._X = X
+        self._norms = np.einsum("ij,ij->i", X, X)
+        self.trees_ = [
+            RandomProjectionTree(X, max(self.leaf_size, self.n_neighbors), random_state)
+            for _ in range(self.n_trees)
+        ]
+        return self
+
+    def kneighbors(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate neighbors of each sample of X.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The squared distances and the indexes (of the train samples) of
+            the neighbors of each sample (n_samples, n_neighbors), closest
+            first. Missing neighbors (fewer candidates than `n_neighbors`)
+            have infinite distance and index -1.
+        """
+        X = np.asarray(X, dtype=self._X.dtype)
+        distances = np.empty((len(X), self.n_neighbors))
+        indexes = np.empty((len(X), self.n_neighbors), dtype=np.intp)
+        for start in range(0, len(X), self.batch_size):
+            batch = slice(start, start + self.batch_size)
+            distances[batch], indexes[batch] = self._kneighbors_batch(X[batch])
+        return distances, indexes
+
+    def _kneighbors_batch(self, Q: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Distances to the candidates of each query: the samples of its leaf
+        # in each tree (in the columns of the tree, padded with -1 and inf)
+        leaf_size = max(len(s) for tree in self.trees_ for s in tree.leaf_samples)
+        num_columns = max(self.n_trees * leaf_size, self.n_neighbors)
+        distances = np.full((len(Q), num_columns), np.inf)
+        indexes = np.full((len(Q), num_columns), -1, dtype=np.intp)
+        query_norms = np.einsum("ij,ij->i", Q, Q)
+        for i, tree in enumerate(self.trees_):
+            query_leaves = tree.query_leaves(Q)
+            order = np.argsort(query_leaves, kind="stable")
+            leaves, starts = np.unique(query_leaves[order], return_index=True)
+            for leaf, queries in zip(leaves, np.split(order, starts[1:])):
+                candidates = tree.leaf_samples[leaf]
+                columns = slice(i * leaf_size, i * leaf_size + len(candidates))
+                distances[queries, columns] = (
+                    query_norms[queries, None]
+                    - 2 * Q[queries] @ self._X[candidates].T
+                    + self._norms[candidates][None, :]
+                )
+                indexes[queries, columns] = candidates
+
+        # Candidates found by more than one tree are only counted once
+        order = np.argsort(indexes, axis=1)
+        indexes = np.take_along_axis(indexes, order, axis=1)
+        distances = np.take_along_axis(distances, order, axis=1)
+        distances[:, 1:][indexes[:, 1:] == indexes[:, :-1]] = np.inf
+
+        k = self.n_neighbors
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        distances = np.take_along_axis(distances, nearest, axis=1)
+        indexes = np.take_along_axis(indexes, nearest, axis=1)
+        order = np.argsort(distances, axis=1)
+        distances = np.take_along_axis(distances, order, axis=1)
+        indexes = np.take_along_axis(indexes, order, axis=1)
+        indexes[np.isinf(distances)] = -1
+        return distances, indexes
+
+    def predict_proba(self, X) -> np.ndarray:
+        _, indexes = self.kneighbors(X)
+        found = indexes >= 0
+        votes = np.zeros((len(indexes), len(self.classes_)))
+        rows = np.repeat(np.arange(len(indexes)), found.sum(axis=1))
+        np.add.at(votes, (rows, self._y[indexes[found]]), 1)
+        return votes / np.maximum(votes.sum(axis=1, keepdims=True), 1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class IncrementalClassifier:
+    """Base of the classifiers trained incrementally (out-of-core): `fit`
+    streams the train samples, in mini-batches of `batch_size` rows, to the
+    `partial_fit` method of an estimator (created by `_create_estimator`).
+    Only one mini-batch is read at a time, so memory-mapped train sets (e.g.,
+    in streaming mode) are never fully loaded. Predictions are also made in
+    mini-batches.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        Number of rows of each mini-batch, by default 1024
+    n_epochs : int, optional
+        Number of passes over the train samples, by default 1
+    shuffle : bool, optional
+        Shuffle the order of the mini-batches (and the rows in each one) at
+        each epoch, by default True
+    random_state : int, optional
+        Seed of the shuffling (and of the estimator, if it is random),
+        by default None (the global numpy random generator)
+    **kwargs
+        Parameters of the estimator.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1024,
+        n_epochs: int = 1,
+        shuffle: bool = True,
+        random_state: int = None,
+        **kwargs,
+    ):
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.shuffle = shuffle
+        self.random_state = random_state
+        self.kwargs = kwargs
+
+    def _create_estimator(self) -> Any:
+        raise NotImplementedError
+
+    def _partial_fit(self, X: np.ndarray, y: np.ndarray):
+        self.estimator_.partial_fit(X, y, classes=self.classes_)
+
+    def _predict(self, X: np.ndarray) -> np.ndarray:
+        return self.estimator_.predict(X)
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        random_state = check_random_state(self.random_state)
+        self.classes_ = np.unique(y)
+        self.estimator_ = self._create_estimator()
+        batches = list(iter_chunks(len(X), self.batch_size))
+        for _ in range(self.n_epochs):
+            order = range(len(batches))
+            if self.shuffle:
+                order = random_state.permutation(len(batches))
+            for i in order:
+                X_batch = np.asarray(X[batches[i]])
+                y_batch = y[batches[i]]
+                if self.shuffle:
+                    rows = random_state.permutation(len(X_batch))
+                    X_batch, y_batch = X_batch[rows], y_batch[rows]
+                self._partial_fit(X_batch, y_batch)
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        if len(X) == 0:
+            return np.empty(0, dtype=self.classes_.dtype)
+        return np.concatenate(
+            [
+                self._predict(np.asarray(X[rows]))
+                for rows in iter_chunks(len(X), self.batch_size)
+            ]
+        )
+
+
+class IncrementalSGDClassifier(IncrementalClassifier):
+    """Linear classifier (`sklearn.linear_model.SGDClassifier`) trained
+    incrementally. See `IncrementalClassifier` for the parameters; the other
+    parameters (e.g., `loss` and `alpha`) are passed to `SGDClassifier`."""
+
+    def _create_estimator(self) -> Any:
+        return SGDClassifier(random_state=self.random_state, **self.kwargs)
+
+
+class IncrementalGaussianNB(IncrementalClassifier):
+    """Gaussian naive Bayes classifier (`sklearn.naive_bayes.GaussianNB`)
+    trained incrementally. See `IncrementalClassifier` for the parameters;
+    the other parameters are passed to `GaussianNB`."""
+
+    def _create_estimator(self) -> Any:
+        return GaussianNB(**self.kwargs)
+
+
+class MiniBatchKMeansClassifier(IncrementalClassifier):
+    """Nearest centroid classifier, with `n_clusters` centroids per class,
+    found by a `sklearn.cluster.MiniBatchKMeans` for each class, trained
+    incrementally with the samples of the class. A sample is classified as
+    the class of its closest centroid. See `IncrementalClassifier` for the
+    other parameters; the remaining ones are passed to `MiniBatchKMeans`.
+
+    Parameters
+    ----------
+    n_clusters : int, optional
+        Number of centroids of each class, by default 8
+    """
+
+    def __init__(
+        self,
+        n_clusters: int = 8,
+        batch_size: int = 1024,
+        n_epochs: int = 1,
+        shuffle: bool = True,
+        random_state: int = None,
+        **kwargs,
+    ):
+        super().__init__(batch_size, n_epochs, shuffle, random_state, **kwargs)
+        self.n_clusters = n_clusters
+
+    def _create_estimator(self) -> Any:
+        # The k-means of each class and the samples of the classes whose
+        # k-means was not started yet (it needs at least n_clusters samples)
+        self._pending = {c: [] for c in range(len(self.classes_))}
+        return [
+            MiniBatchKMeans(
+                n_clusters=self.n_clusters,
+                random_state=self.random_state,
+                **self.kwargs,
+            )
+            for _ in self.classes_
+        ]
+
+    def _partial_fit(self, X: np.ndarray, y: np.ndarray):
+        labels = np.searchsorted(self.classes_, y)
+        for c, kmeans in enumerate(self.estimator_):
+            X_class = X[labels == c]
+            if c in self._pending:
+                self._pending[c].append(X_class)
+                X_class = np.concatenate(self._pending[c])
+                if len(X_class) < self.n_clusters:
+                    continue
+                del self._pending[c]
+            if len(X_class) > 0:
+                kmeans.partial_fit(X_class)
+
+    def fit(self, X, y):
+        super().fit(X, y)
+        # Classes with fewer samples than n_clusters: their samples are the
+        # centroids
+        centroids, centroid_labels = [], []
+        for c, kmeans in enumerate(self.estimator_):
+            if c in self._pending:
+                class_centroids = np.concatenate(self._pending[c])
+            else:
+                class_centroids = kmeans.cluster_centers_
+            centroids.append(class_centroids)
+            centroid_labels.append(np.full(len(class_centroids), c))
+        del self._pending
+        self.cluster_centers_ = np.concatenate(centroids)
+        self.cluster_labels_ = np.concatenate(centroid_labels)
+        return self
+
+    def _predict(self, X: np.ndarray) -> np.ndarray:
+        distances = (
+            np.einsum("ij,ij->i", X, X)[:, None]
+            - 2 * X @ self.cluster_centers_.T
+            + np.einsum("ij,ij->i", self.cluster_centers_, self.cluster_centers_)
+        )
+        return self.classes_[self.cluster_labels_[np.argmin(distances, axis=1)]]
@@ -20,24 +20,33 @@
 
 # Python imports
 import argparse
+import functools
 import logging
+import multiprocessing
+import os
+import re
+import resource
 import sys
 import time
+from collections import deque
 from dataclasses import asdict
+from multiprocessing.connection import wait
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # Third-party imports
 import coloredlogs
+import numpy as np
+import pandas as pd
+import psutil
 import ray
 import tqdm
-import yaml
 from config import *
 from dacite import from_dict
+from dict_hash import sha256
 
 # Librep imports
 from librep.config.type_definitions import PathLike
-from librep.datasets.har.loaders import PandasMultiModalLoader
 from librep.datasets.multimodal import (
     ArrayMultiModalDataset,
     MultiModalDataset,
@@ -45,9 +54,71 @@ from librep.datasets.multimodal import (
     WindowedTransform,
 )
 from librep.metrics.report import ClassificationReport
-from librep.utils.workflow import MultiRunWorkflow, SimpleTrainEvalWorkflow
-from ray.util.multiprocessing import Pool
-from utils import catchtime, load_yaml, get_sys_info, multimodal_multi_merge
+from librep.utils.workflow import SimpleTrainEvalWorkflow
+
+from admission import AdmissionController
+from checkpoint import ExperimentCheckpoint, checkpoint_stages
+from cache import (
+    DatasetCache,
+    NodeDatasetCache,
+    ReducerStore,
+    TransformCache,
+    dataset_nbytes,
+    get_transform_cache,
+    load_multimodal,
+    source_fingerprint,
+)
+from planner import (
+    PlanNode,
+    PlannedExperiment,
+    build_plan,
+    plan_summary,
+    stage_keys,
+    stage_names,
+)
+from profiler import (
+    ProfiledWorkflow,
+    profiled_estimator,
+    record_profile,
+    save_chrome_trace,
+    span,
+)
+from results import YAMLResults, get_results_backend, results_backends
+from resources import (
+    DatasetSizes,
+    base_memory,
+    estimate_resources,
+    limit_threads,
+    ray_assigned_cpus,
+    ray_node_limits,
+    view_nbytes,
+)
+from scheduler import (
+    CostEstimate,
+    CostModel,
+    longest_first,
+    makespan,
+    simulate_schedule,
+)
+from search import expand_search, experiment_ids, point_id
+from streaming import (
+    chunked_concatenate,
+    chunked_estimator,
+    chunked_fit,
+    chunked_map,
+    subsample,
+)
+from utils import (
+    catchtime,
+    dataset_files,
+    get_sys_info,
+    load_yaml,
+    multimodal_concatenate,
+    multimodal_multi_merge,
+    process_map,
+    shutdown_process_pool,
+)
+from workflow import ParallelMultiRunWorkflow
 
 """This module is used to execute the experiments based on configuration files,
 written in YAML. The configuration files are writen in YAML and the valid keys 
@@ -83,12 +154,215 @@ The code is divided into four main parts:
     This experiment is controled by a `ExecutionConfig` object, which is passed to the
     function as a parameter. This object is created from the YAML configuration file.
     The `run_experiment` function calls the utilitary functions defined in this module.
+
+Alternatively (with `--plan`), all configuration files are planned together (see
+`planner.py`): the preprocessing stages shared by several experiments are run only
+once, by `run_plan_single_thread` or `run_plan_ray`, and their outputs are used by
+all these experiments.
 """
 
 # Uncomment to remove warnings
 # warnings.filterwarnings("always")
 
 
+def dataset_view_key(
+    dataset: str,
+    features: List[str],
+    label_columns: str = "standard activity code",
+) -> str:
+    """Key that identifies a loaded dataset split, i.e., a dataset string
+    ("dataset_name.dataset_view[split]") loaded with a set of features and
+    a label column.
+
+    Parameters
+    ----------
+    dataset : str
+        The dataset, in the format "dataset_name.dataset_view[split]".
+    features : List[str]
+        The features loaded.
+    label_columns : str, optional
+        The name of column that have the label, by default "standard activity code"
+
+    Returns
+    -------
+    str
+        The key of the loaded dataset split.
+    """
+    return f"{dataset}|{','.join(features)}|{label_columns}"
+
+
+def dataset_spec(
+    dataset_locations: Dict[str, PathLike],
+    datasets_to_load: List[str],
+    features: List[str],
+    label_columns: str = "standard activity code",
+    dtype: str = None,
+) -> dict:
+    """Describe a dataset loaded with `load_datasets`, including the
+    fingerprints of the source files (see `cache.source_fingerprint`). Two
+    loaded datasets with the same description have the same content. It is
+    used to key the data derived from the dataset (e.g., cached transforms).
+
+    Parameters
+    ----------
+    dataset_locations : Dict[str, PathLike]
+        Dictionary with dataset locations. Key is the dataset name and value
+        is the path to the dataset.
+    datasets_to_load : List[str]
+        The datasets loaded, in the format "dataset_name.dataset_view[split]".
+    features : List[str]
+        The features loaded.
+    label_columns : str, optional
+        The name of column that have the label, by default "standard activity code"
+    dtype : str, optional
+        The data type the dataset was cast to, by default None (not cast)
+
+    Returns
+    -------
+    dict
+        A JSON-serializable description of the dataset.
+    """
+    sources = []
+    for dset in datasets_to_load:
+        name = dset.split("[")[0]
+        split = dset.split("[")[1].split("]")[0]
+        sources.append(source_fingerprint(dataset_locations[name], split))
+    spec = {
+        "datasets": list(datasets_to_load),
+        "sources": sources,
+        "features": list(features),
+        "label": label_columns,
+    }
+    # Only informed if cast, so the keys of the datasets not cast are kept
+    if dtype is not None:
+        spec["dtype"] = dtype
+    return spec
+
+
+def read_split(
+    dataset_path: PathLike,
+    split: str,
+    label_columns: str = "standard activity code",
+    features: List[str] = (
+        "accel-x",
+        "accel-y",
+        "accel-z",
+        "gyro-x",
+        "gyro-y",
+        "gyro-z",
+    ),
+) -> ArrayMultiModalDataset:
+    """Read a split file (`<split>.csv`) of a dataset view, in the layout of
+    `PandasMultiModalLoader`: one window for each feature, with the columns
+    named `<feature>-<index>` (e.g., "accel-x-0"). Only the columns of the
+    features and the label are parsed.
+
+    Parameters
+    ----------
+    dataset_path : PathLike
+        The root directory of the dataset view (where the split files are).
+    split : str
+        The split name ("train", "validation" or "test").
+    label_columns : str, optional
+        The name of column that have the label, by default "standard activity code"
+    features : List[str], optional
+        The features to load, by default ( "accel-x", "accel-y", "accel-z",
+        "gyro-x", "gyro-y", "gyro-z", )
+
+    Returns
+    -------
+    ArrayMultiModalDataset
+        The split, with a window for each feature.
+
+    Raises
+    ------
+    ValueError
+        If a feature has no columns in the split file.
+    """
+    path = Path(dataset_path) / f"{split}.csv"
+    header = pd.read_csv(path, nrows=0).columns
+    feature_columns = [
+        [c for c in header if re.fullmatch(rf"{re.escape(f)}-\d+", c)] for f in features
+    ]
+    missing = [f for f, window in zip(features, feature_columns) if not window]
+    if missing:
+        raise ValueError(f"Features {missing} have no columns in {path}")
+    columns = [c for window in feature_columns for c in window]
+    df = pd.read_csv(path, usecols=columns + [label_columns])
+
+    window_slices = []
+    start = 0
+    for window in feature_columns:
+        window_slices.append((start, start + len(window)))
+        start += len(window)
+    return ArrayMultiModalDataset(
+        X=df[columns].to_numpy(),
+        y=df[label_columns].to_numpy(),
+        window_slices=window_slices,
+        window_names=list(features),
+    )
+
+
+def load_dataset_splits(
+    dataset_path: PathLike,
+    splits: List[str],
+    label_columns: str = "standard activity code",
+    features: List[str] = (
+        "accel-x",
+        "accel-y",
+        "accel-z",
+        "gyro-x",
+        "gyro-y",
+        "gyro-z",
+    ),
+    dataset_cache: DatasetCache = None,
+) -> Dict[str, ArrayMultiModalDataset]:
+    """Utilitary function to load some splits of a single dataset view.
+
+    Parameters
+    ----------
+    dataset_path : PathLike
+        The root directory of the dataset view (where the split files are).
+    splits : List[str]
+        The splits to load ("train", "validation" and/or "test").
+    label_columns : str, optional
+        The name of column that have the label, by default "standard activity code"
+    features : List[str], optional
+        The features to load, from datasets
+        by default ( "accel-x", "accel-y", "accel-z", "gyro-x", "gyro-y", "gyro-z", )
+    dataset_cache : DatasetCache, optional
+        Cache of loaded dataset splits. Splits found in the cache are
+        memory-mapped from it, instead of being parsed from the CSV files, and
+        loaded splits are stored in it. By default None (no cache)
+
+    Returns
+    -------
+    Dict[str, ArrayMultiModalDataset]
+        A dictionary with the split name as key and the loaded split as value.
+    """
+    # Use the cached splits
+    datasets = dict()
+    if dataset_cache is not None:
+        keys = {
+            split: dataset_cache.key(dataset_path, split, features, label_columns)
+            for split in splits
+        }
+        for split, key in keys.items():
+            dset = dataset_cache.get(key)
+            if dset is not None:
+                datasets[split] = dset
+
+    # Load the required splits only (that are not cached)
+    for split in splits:
+        if split in datasets:
+            continue
+        dset = read_split(dataset_path, split, label_columns, features)
+        if dataset_cache is not None:
+            dataset_cache.put(keys[split], dset)
+        datasets[split] = dset
+    return datasets
+
+
 def load_datasets(
     dataset_locations: Dict[str, PathLike],
     datasets_to_load: List[str],
@@ -101,6 +375,12 @@ def load_datasets(
         "gyro-y",
         "gyro-z",
     ),
+    dataset_cache: DatasetCache = None,
+    shared_datasets: Dict[str, ArrayMultiModalDataset] = None,
+    chunk_size: int = None,
+    spill_dir: PathLike = None,
+    dataset_sizes: DatasetSizes = None,
+    dtype: str = None,
 ) -> ArrayMultiModalDataset:
     """Utilitary function to load the datasets.
     It load the datasets from specified in the `datasets_to_load` parameter.
@@ -120,6 +400,26 @@ def load_datasets(
     features : List[str], optional
         The features to load, from datasets
         by default ( "accel-x", "accel-y", "accel-z", "gyro-x", "gyro-y", "gyro-z", )
+    dataset_cache : DatasetCache, optional
+        Cache of loaded dataset splits. Splits found in the cache are
+        memory-mapped from it, instead of being parsed from the CSV files, and
+        loaded splits are stored in it. By default None (no cache)
+    shared_datasets : Dict[str, ArrayMultiModalDataset], optional
+        Dataset splits already loaded (e.g., by the Ray driver), indexed by
+        `dataset_view_key`. These splits are used instead of loading them
+        again. By default None
+    chunk_size : int, optional
+        If informed, the datasets are concatenated in chunks of `chunk_size`
+        rows into a memory-mapped spill file (see `streaming.chunked_concatenate`),
+        instead of in memory. By default None
+    spill_dir : PathLike, optional
+        Directory of the spill file, by default None (system temporary directory)
+    dataset_sizes : DatasetSizes, optional
+        If informed, the size of each loaded split is recorded in it (used to
+        estimate the resources of the next executions). By default None
+    dtype : str, optional
+        If informed, the samples are cast to this data type (e.g., float32)
+        while concatenated. By default None (the type of the loaded splits)
 
     Returns
     -------
@@ -141,55 +441,176 @@ def load_datasets(
     ...     ],
     ... )
     """
-    # Transform it to a Path object
-    dset_names = set()
+    shared_datasets = shared_datasets or dict()
+    loaded_datasets = dict()
 
-    # Remove the split from the dataset name
-    # dset_names will contain the name of the datasets to load
-    # it is used to index the datasets variable in the config.py file
+    # Splits required for each dataset name (without the split), that were
+    # not shared. The dataset name is used to index the `dataset_locations`
+    required_splits = dict()
     for dset in datasets_to_load:
+        key = dataset_view_key(dset, features, label_columns)
+        if key in shared_datasets:
+            loaded_datasets[dset] = shared_datasets[key]
+            continue
         name = dset.split("[")[0]
-        dset_names.add(name)
+        split = dset.split("[")[1].split("]")[0]
+        required_splits.setdefault(name, set()).add(split)
 
     # Load the datasets
-    multimodal_datasets = dict()
-    for name in dset_names:
+    for name, splits in required_splits.items():
         # Define dataset path. Join the root_dir with the path of the dataset
         path = dataset_locations[name]
-        # Load the dataset
-        loader = PandasMultiModalLoader(root_dir=path)
-        train, validation, test = loader.load(
-            load_train=True,
-            load_validation=True,
-            load_test=True,
-            as_multimodal=True,
-            as_array=True,
-            features=features,
-            label=label_columns,
-        )
-        # Store the multiple MultimodalDataset in a dictionary
-        multimodal_datasets[name] = {
-            "train": train,
-            "validation": validation,
-            "test": test,
-        }
+        with span("load dataset", dataset=name, splits=sorted(splits)):
+            splits = load_dataset_splits(
+                dataset_path=path,
+                splits=sorted(splits),
+                label_columns=label_columns,
+                features=features,
+                dataset_cache=dataset_cache,
+            )
+        for split, dset in splits.items():
+            loaded_datasets[f"{name}[{split}]"] = dset
+            if dataset_sizes is not None:
+                dataset_sizes.put(
+                    dataset_view_key(f"{name}[{split}]", features, label_columns),
+                    dataset_nbytes(dset),
+                    len(dset),
+                )
 
-    # Concatenate the datasets
+    # Concatenate the datasets, in the order they were specified
+    with span("concatenate", datasets=len(datasets_to_load)):
+        if chunk_size is not None:
+            return chunked_concatenate(
+                [loaded_datasets[dset] for dset in datasets_to_load],
+                chunk_size=chunk_size,
+                spill_dir=spill_dir,
+                dtype=dtype,
+            )
+        final_dset = multimodal_concatenate(
+            [loaded_datasets[dset] for dset in datasets_to_load], dtype=dtype
+        )
+        # A single split is not copied while concatenated
+        return cast_datasets([final_dset], dtype)[0]
 
-    # Pick the name and the split of the first dataset to load
-    name = datasets_to_load[0].split("[")[0]
-    split = datasets_to_load[0].split("[")[1].split("]")[0]
-    final_dset = ArrayMultiModalDataset.from_pandas(multimodal_datasets[name][split])
 
-    # Pick the name and the split of the other datasets to load and
-    # Concatenate the other datasets
-    for dset in datasets_to_load[1:]:
-        name = dset.split("[")[0]
-        split = dset.split("[")[1].split("]")[0]
-        dset = ArrayMultiModalDataset.from_pandas(multimodal_datasets[name][split])
-        final_dset = ArrayMultiModalDataset.concatenate(final_dset, dset)
+def cast_datasets(
+    datasets: List[Optional[MultiModalDataset]],
+    dtype: Optional[str],
+    chunk_size: int = None,
+    spill_dir: PathLike = None,
+) -> List[Optional[MultiModalDataset]]:
+    """Cast the samples of datasets to a data type. Datasets already of that
+    type (and None datasets) are returned as they are, so stages that keep the
+    type (e.g., scikit-learn scalers on float32) do not copy their outputs,
+    while stages that upcast (e.g., a float64 FFT) are cast back.
+
+    Parameters
+    ----------
+    datasets : List[Optional[MultiModalDataset]]
+        The datasets to cast.
+    dtype : Optional[str]
+        The data type (e.g., float32). If None, nothing is cast.
+    chunk_size : int, optional
+        If informed, the datasets are cast in chunks of `chunk_size` rows into
+        memory-mapped spill files (see `streaming.chunked_map`), instead of in
+        memory. By default None
+    spill_dir : PathLike, optional
+        Directory of the spill files, by default None
+
+    Returns
+    -------
+    List[Optional[MultiModalDataset]]
+        The datasets, with samples of the data type.
+    """
+    if dtype is None:
+        return list(datasets)
+
+    def _cast(dataset: MultiModalDataset) -> ArrayMultiModalDataset:
+        return ArrayMultiModalDataset(
+            X=np.asarray(dataset.X).astype(dtype, copy=False),
+            y=dataset.y,
+            window_slices=dataset.window_slices,
+            window_names=dataset.window_names,
+        )
 
-    return final_dset
+    cast = []
+    for dataset in datasets:
+        if dataset is None or np.asarray(dataset[0:1][0]).dtype == np.dtype(dtype):
+            cast.append(dataset)
+        elif chunk_size is not None:
+            cast.append(chunked_map(dataset, _cast, chunk_size, spill_dir))
+        else:
+            cast.append(_cast(dataset))
+    return cast
+
+
+def do_batched_transform(
+    dataset: MultiModalDataset,
+    transforms: List[Any],
+    new_window_name_prefix: str = "",
+    dtype: str = None,
+) -> Optional[ArrayMultiModalDataset]:
+    """Utilitary function to apply a list of row-wise transforms (see
+    `rowwise_transforms` in config.py) to each window of a dataset, with a
+    single call of each transform for all windows. The (n_samples,
+    n_windows * window_size) array is viewed as a (n_samples * n_windows,
+    window_size) array, transformed and reshaped back. The result is the same
+    of applying the transforms window by window (`transform_on="window"`).
+
+    Parameters
+    ----------
+    dataset : MultiModalDataset
+        The dataset to transform.
+    transforms : List[Any]
+        The transforms to apply (not wrapped in a WindowedTransform).
+    new_window_name_prefix : str, optional
+        The prefix added to the window names, by default ""
+    dtype : str, optional
+        If informed, the output of each transform is cast to this data type
+        (e.g., float32) as soon as it is produced, so the upcast output of a
+        transform (e.g., a float64 FFT) is not kept while the next transforms
+        run. By default None
+
+    Returns
+    -------
+    Optional[ArrayMultiModalDataset]
+        The transformed dataset, or None if the dataset is not an
+        ArrayMultiModalDataset with contiguous windows of the same size (in
+        this case, the transforms must be applied window by window).
+    """
+    if not isinstance(dataset, ArrayMultiModalDataset):
+        return None
+    window_slices = [tuple(s) for s in dataset.window_slices]
+    num_windows = len(window_slices)
+    window_size = window_slices[0][1] - window_slices[0][0]
+    X = np.asarray(dataset.X)
+    if X.ndim != 2 or X.shape[1] != num_windows * window_size:
+        return None
+    if window_slices != [
+        (i * window_size, (i + 1) * window_size) for i in range(num_windows)
+    ]:
+        return None
+
+    num_samples = X.shape[0]
+    X = X.reshape(num_samples * num_windows, window_size)
+    for transform in transforms:
+        with span("transform", transform=type(transform).__name__, batched=True):
+            X = np.asarray(transform.transform(X))
+            if dtype is not None:
+                X = X.astype(dtype, copy=False)
+    new_window_size = X.shape[1]
+    X = X.reshape(num_samples, num_windows * new_window_size)
+
+    return ArrayMultiModalDataset(
+        X=X,
+        y=dataset.y,
+        window_slices=[
+            (i * new_window_size, (i + 1) * new_window_size) for i in range(num_windows)
+        ],
+        window_names=[
+            f"{new_window_name_prefix}{name}" for name in dataset.window_names
+        ],
+    )
 
 
 # Non-parametric transform
@@ -197,6 +618,8 @@ def do_transform(
     datasets: List[MultiModalDataset],
     transform_configs: List[TransformConfig],
     keep_suffixes: bool = True,
+    batched: bool = True,
+    dtype: str = None,
 ) -> List[MultiModalDataset]:
     """Utilitary function to apply a list of transforms to a list of datasets
 
@@ -210,6 +633,12 @@ def do_transform(
         datasets.
     keep_suffixes : bool, optional
         Keep the window name suffixes, by default True
+    batched : bool, optional
+        If all transforms are row-wise and applied to each window, apply them
+        to all windows at once, using `do_batched_transform`, by default True
+    dtype : str, optional
+        If informed, the transformed datasets are cast to this data type (after
+        each transform, when batched). By default None
 
     Returns
     -------
@@ -221,12 +650,32 @@ def do_transform(
     for dset in datasets:
         transforms = []
         new_names = []
+        # The transforms (not windowed) and if they can be applied to all
+        # windows at once
+        unwindowed_transforms = []
+        batchable = True
 
         # Loop over the transforms and instantiate them
         for transform_config in transform_configs:
             # Get the transform class and kwargs and instantiate the transform
             kwargs = transform_config.kwargs or {}
             the_transform = transforms_cls[transform_config.transform](**kwargs)
+            unwindowed_transforms.append(the_transform)
+            # Row-wise transforms (with known kwargs), applied to each window
+            rowwise = getattr(the_transform, "rowwise", False) or (
+                transform_config.transform in rowwise_transforms
+                and set(kwargs) <= set(rowwise_transforms[transform_config.transform])
+            )
+            batchable = batchable and (
+                rowwise
+                and (
+                    not transform_config.windowed
+                    or (
+                        transform_config.windowed.fit_on is None
+                        and transform_config.windowed.transform_on == "window"
+                    )
+                )
+            )
             # If the transform is windowed, instantiate the WindowedTransform
             # with the defined fit_on and transform_on.
             if transform_config.windowed:
@@ -253,12 +702,23 @@ def do_transform(
         if new_name_prefix:
             new_name_prefix += "."
 
+        # Apply all transforms to all windows at once, if possible
+        if batched and batchable:
+            batched_dset = do_batched_transform(
+                dset, unwindowed_transforms, new_name_prefix, dtype=dtype
+            )
+            if batched_dset is not None:
+                new_datasets.append(batched_dset)
+                continue
+
         # Instantiate the TransformMultiModalDataset with the list of transforms
         transformer = TransformMultiModalDataset(
             transforms=transforms, new_window_name_prefix=new_name_prefix
         )
         # Apply the transforms to the dataset
-        dset = transformer(dset)
+        with span("transform", transforms=new_name_prefix, batched=False):
+            dset = transformer(dset)
+        dset = cast_datasets([dset], dtype)[0]
         # Append the transformed dataset to the list of new datasets
         new_datasets.append(dset)
 
@@ -266,12 +726,144 @@ def do_transform(
     return new_datasets
 
 
+def do_cached_transform(
+    datasets: List[MultiModalDataset],
+    dataset_specs: List[dict],
+    transform_configs: List[TransformConfig],
+    transform_cache: TransformCache,
+    keep_suffixes: bool = True,
+    stats: dict = None,
+    dtype: str = None,
+) -> List[MultiModalDataset]:
+    """Utilitary function to apply a list of transforms to a list of datasets,
+    like `do_transform`, but reusing the transformed datasets stored in the
+    transform cache. Datasets not found in the cache are transformed and
+    stored in it.
+
+    Parameters
+    ----------
+    datasets : List[MultiModalDataset]
+        List of the datasets to transform.
+    dataset_specs : List[dict]
+        The description of each dataset (see `dataset_spec`), used to key
+        the cache.
+    transform_configs : List[TransformConfig]
+        List of the transforms to apply.
+    transform_cache : TransformCache
+        The cache of transformed datasets.
+    keep_suffixes : bool, optional
+        Keep the window name suffixes, by default True
+    stats : dict, optional
+        If informed, the "hits" and "misses" keys of this dictionary are
+        incremented for each dataset found (or not) in the cache.
+    dtype : str, optional
+        The data type of the transformed datasets (see `do_transform`), by
+        default None
+
+    Returns
+    -------
+    List[MultiModalDataset]
+        The transformed datasets.
+    """
+    stats = stats if stats is not None else dict()
+    transforms = [asdict(t) for t in transform_configs]
+    new_datasets = []
+    for dset, spec in zip(datasets, dataset_specs):
+        key = transform_cache.key(
+            datasets=[spec],
+            features=spec["features"],
+            transform_configs=transforms + [{"keep_suffixes": keep_suffixes}],
+        )
+        transformed = transform_cache.get(key)
+        if transformed is not None:
+            stats["hits"] = stats.get("hits", 0) + 1
+        else:
+            stats["misses"] = stats.get("misses", 0) + 1
+            transformed = do_transform(
+                datasets=[dset],
+                transform_configs=transform_configs,
+                keep_suffixes=keep_suffixes,
+                dtype=dtype,
+            )[0]
+            transform_cache.put(key, transformed)
+        new_datasets.append(transformed)
+    return new_datasets
+
+
+def fit_reducer(
+    reducer_config: ReducerConfig,
+    X: Any,
+    reducer_store: ReducerStore = None,
+    store_key: str = None,
+    force_refit: bool = False,
+    stats: dict = None,
+) -> Any:
+    """Utilitary function to instantiate and fit a reducer. If a reducer store
+    is informed, the fitted reducer is loaded from it (if stored), instead of
+    being fit again. Reducers fitted are saved in the store.
+
+    Parameters
+    ----------
+    reducer_config : ReducerConfig
+        The reducer configuration, used to instantiate the reducer.
+    X : Any
+        The data used to fit the reducer.
+    reducer_store : ReducerStore, optional
+        The store of fitted reducers, by default None (no store)
+    store_key : str, optional
+        The key of the reducer in the store, by default None
+    force_refit : bool, optional
+        Fit the reducer even if it is stored (it is stored again),
+        by default False
+    stats : dict, optional
+        If informed, the "hits" and "misses" keys of this dictionary are
+        incremented for each reducer loaded from (or not) the store, and the
+        "saved_time" key is incremented by the fit time saved (in seconds).
+
+    Returns
+    -------
+    Any
+        The fitted reducer.
+    """
+    stats = stats if stats is not None else dict()
+    if reducer_store is not None and not force_refit:
+        with catchtime() as load_time:
+            stored = reducer_store.get(store_key)
+        if stored is not None:
+            reducer, fit_time = stored
+            stats["hits"] = stats.get("hits", 0) + 1
+            stats["saved_time"] = stats.get("saved_time", 0.0) + max(
+                fit_time - float(load_time), 0.0
+            )
+            return reducer
+
+    # Get the reducer class and instantiate it using the kwargs
+    kwargs = reducer_config.kwargs or {}
+    reducer = reducers_cls[reducer_config.algorithm](**kwargs)
+    with catchtime() as fit_time, span(
+        "fit reducer", algorithm=reducer_config.algorithm
+    ):
+        reducer.fit(X)
+    if reducer_store is not None:
+        stats["misses"] = stats.get("misses", 0) + 1
+        reducer_store.put(store_key, reducer, float(fit_time))
+    return reducer
+
+
 # Parametric transform
 def do_reduce(
     datasets: List[MultiModalDataset],
     reducer_config: ReducerConfig,
     reduce_on: str = "all",
     suffix: str = "reduced",
+    reducer_store: ReducerStore = None,
+    store_key: dict = None,
+    force_refit: bool = False,
+    stats: dict = None,
+    num_workers: int = 1,
+    chunk_size: int = None,
+    fit_samples: int = None,
+    spill_dir: PathLike = None,
 ) -> List[MultiModalDataset]:
     """Utilitary function to perform dimensionality reduce to a list of
     datasets. The first dataset will be used to fit the reducer. And the
@@ -295,6 +887,31 @@ def do_reduce(
             and then, the datasets will be concatenated.
     suffix : str, optional
         The new suffix to be appended to the window name, by default "reduced."
+    reducer_store : ReducerStore, optional
+        Store of fitted reducers. Reducers already fitted (with the same
+        dataset, transforms, configuration and window) are loaded from it
+        instead of being fit again. By default None (no store)
+    store_key : dict, optional
+        Description of the fitting dataset used to key the store, with the
+        `reducer_dataset` (see `dataset_spec`) and the `transforms` applied
+        to it. Required if `reducer_store` is informed.
+    force_refit : bool, optional
+        Fit the reducers even if they are in the store, by default False
+    stats : dict, optional
+        Reducer store statistics, updated by `fit_reducer`.
+    num_workers : int, optional
+        Number of processes used to fit and apply the reducers of each window
+        in parallel, when reduce_on is "sensor" or "axis", by default 1
+    chunk_size : int, optional
+        If informed (streaming mode), the reducers are fit on a subsample of
+        the first dataset (at most `fit_samples` rows) and applied to the
+        remaining datasets in chunks of `chunk_size` rows, written to spill
+        files (see `streaming.py`). By default None
+    fit_samples : int, optional
+        Maximum number of rows used to fit the reducers, in streaming mode,
+        by default None (all rows)
+    spill_dir : PathLike, optional
+        Directory of the spill files, in streaming mode, by default None
 
     Returns
     -------
@@ -316,13 +933,43 @@ def do_reduce(
 
     sensor_names = ["accel", "gyro"]
 
-    # Get the reducer kwargs
-    kwargs = reducer_config.kwargs or {}
+    # Dataset used to fit the reducers
+    fit_dataset = datasets[0]
+    if chunk_size is not None:
+        fit_dataset = subsample(datasets[0], fit_samples)
+
+    # Apply a transformer (with fitted transforms) to a dataset, chunk by
+    # chunk in streaming mode. `window` selects the windows to transform.
+    def _apply(transformer, dataset, window=None) -> MultiModalDataset:
+        def _transform(dset):
+            if window is not None:
+                dset = dset.windows(window)
+            return transformer(dset)
+
+        if chunk_size is None:
+            return _transform(dataset)
+        return chunked_map(dataset, _transform, chunk_size, spill_dir)
+
+    def _store_key(window) -> Optional[str]:
+        if reducer_store is None:
+            return None
+        return reducer_store.key(
+            reducer=asdict(reducer_config),
+            reduce_on=reduce_on,
+            window=window,
+            **store_key,
+        )
+
     if reduce_on == "all":
-        # Get the reducer class and instantiate it using the kwargs
-        reducer = reducers_cls[reducer_config.algorithm](**kwargs)
         # Fit the reducer on the first dataset
-        reducer.fit(datasets[0][:][0])
+        reducer = fit_reducer(
+            reducer_config,
+            fit_dataset[:][0],
+            reducer_store=reducer_store,
+            store_key=_store_key("all"),
+            force_refit=force_refit,
+            stats=stats,
+        )
         # Instantiate the WindowedTransform with fit_on=None and
         # transform_on="all", i.e. the transform will be applied to
         # whole dataset.
@@ -337,7 +984,8 @@ def do_reduce(
             transforms=[transform], new_window_name_prefix=suffix
         )
         # Apply the transform to the remaining datasets
-        datasets = [transformer(dataset) for dataset in datasets[1:]]
+        with span("apply reducer"):
+            datasets = [_apply(transformer, dataset) for dataset in datasets[1:]]
         return datasets
 
     elif reduce_on == "sensor" or reduce_on == "axis":
@@ -349,36 +997,66 @@ def do_reduce(
             ]
             window_names = [w for w in window_names if w]
 
-        window_datasets = []
-
-
-        # Loop over the windows
-        for i, wname in enumerate(window_names):
-            # Get the reducer class and instantiate it using the kwargs
-            reducer = reducers_cls[reducer_config.algorithm](**kwargs)
-            # Fit the reducer on the first dataset
-            reducer_window = datasets[0].windows(wname)
-            reducer.fit(reducer_window[:][0])
-            # Instantiate the WindowedTransform with fit_on=None and
-            # transform_on="all", i.e. the transform will be applied to
-            # whole dataset.
-            transform = WindowedTransform(
-                transform=reducer,
-                fit_on=None,
-                transform_on="all",
-            )
-            # Instantiate the TransformMultiModalDataset with the list of transforms
-            # and the new suffix
-            transformer = TransformMultiModalDataset(
-                transforms=[transform], new_window_name_prefix=f"{suffix}-{i}"
-            )
-            # Apply the transform to the remaining datasets
-            _window_datasets = []
-            for dataset in datasets[1:]:
-                dset_window = dataset.windows(wname)
-                dset_window = transformer(dset_window)
-                _window_datasets.append(dset_window)
-            window_datasets.append(_window_datasets)
+        # Fit and apply the reducer of a single window. The datasets are
+        # files (memory-mapped) in the worker processes
+        def _reduce_window(window) -> Tuple[List[MultiModalDataset], dict]:
+            i, wname, fit_dataset, datasets = window
+            if not isinstance(fit_dataset, MultiModalDataset):
+                fit_dataset = load_multimodal(fit_dataset)
+                datasets = [load_multimodal(dataset) for dataset in datasets]
+            with span("reduce window", window=str(wname)):
+                window_stats = dict()
+                # Fit the reducer on the first dataset
+                reducer_window = fit_dataset.windows(wname)
+                reducer = fit_reducer(
+                    reducer_config,
+                    reducer_window[:][0],
+                    reducer_store=reducer_store,
+                    store_key=_store_key(wname),
+                    force_refit=force_refit,
+                    stats=window_stats,
+                )
+                # Instantiate the WindowedTransform with fit_on=None and
+                # transform_on="all", i.e. the transform will be applied to
+                # whole dataset.
+                transform = WindowedTransform(
+                    transform=reducer,
+                    fit_on=None,
+                    transform_on="all",
+                )
+                # Instantiate the TransformMultiModalDataset with the list of transforms
+                # and the new suffix
+                transformer = TransformMultiModalDataset(
+                    transforms=[transform], new_window_name_prefix=f"{suffix}-{i}"
+                )
+                # Apply the transform to the remaining datasets
+                _window_datasets = []
+                for dataset in datasets:
+                    dset_window = _apply(transformer, dataset, window=wname)
+                    _window_datasets.append(dset_window)
+                return _window_datasets, window_stats
+
+        # Loop over the windows. The windows are independent, so they may be
+        # reduced in parallel, in spawned processes (see `process_map`). The
+        # results keep the order of the windows.
+        if num_workers > 1 and len(window_names) > 1:
+            with dataset_files([fit_dataset] + datasets[1:], spill_dir) as paths:
+                windows = [
+                    (i, wname, paths[0], paths[1:])
+                    for i, wname in enumerate(window_names)
+                ]
+                outputs = process_map(_reduce_window, windows, num_workers)
+        else:
+            windows = [
+                (i, wname, fit_dataset, datasets[1:])
+                for i, wname in enumerate(window_names)
+            ]
+            outputs = process_map(_reduce_window, windows, 1)
+        window_datasets = [_window_datasets for _window_datasets, _ in outputs]
+        if stats is not None:
+            for _, window_stats in outputs:
+                for k, v in window_stats.items():
+                    stats[k] = stats.get(k, 0) + v
 
         # Merge dataset windows
         datasets = [
@@ -401,6 +1079,9 @@ def do_scaling(
     scaler_config: ScalerConfig,
     scale_on: str = "self",
     suffix: str = "scaled.",
+    chunk_size: int = None,
+    fit_samples: int = None,
+    spill_dir: PathLike = None,
 ) -> List[MultiModalDataset]:
     """Utilitary function to perform scaling to a list of datasets.
     If scale_on is "self", the scaling will be fit and transformed applied
@@ -423,6 +1104,15 @@ def do_scaling(
             scaling will be applied to all the datasets.
     suffix : str, optional
         The new suffix to be appended to the window name, by default "scaled."
+    chunk_size : int, optional
+        If informed (streaming mode), the scalers are fit incrementally (or on
+        a subsample, see `streaming.chunked_fit`) and applied in chunks of
+        `chunk_size` rows, written to spill files. By default None
+    fit_samples : int, optional
+        Maximum number of rows used to fit scalers without `partial_fit`, in
+        streaming mode, by default None (all rows)
+    spill_dir : PathLike, optional
+        Directory of the spill files, in streaming mode, by default None
 
     Returns
     -------
@@ -436,6 +1126,17 @@ def do_scaling(
     """
     #
     kwargs = scaler_config.kwargs or {}
+    if chunk_size is not None:
+        return do_chunked_scaling(
+            datasets=datasets,
+            scaler_config=scaler_config,
+            scale_on=scale_on,
+            suffix=suffix,
+            chunk_size=chunk_size,
+            fit_samples=fit_samples,
+            spill_dir=spill_dir,
+        )
+
     if scale_on == "self":
         new_datasets = []
         # Loop over the datasets
@@ -488,75 +1189,130 @@ def do_scaling(
         raise ValueError(f"scale_on: {scale_on} is not valid")
 
 
-# Function that runs the experiment
-def run_experiment(
-    dataset_locations: Dict[str, PathLike],
-    experiment_output_file: PathLike,
-    config_to_execute: ExecutionConfig,
-) -> dict:
-    """This function is the wrapper that runs the experiment.
-    The experiment is defined by the config_to_execute parameter,
-    which controls the experiment execution.
+def do_chunked_scaling(
+    datasets: List[MultiModalDataset],
+    scaler_config: ScalerConfig,
+    scale_on: str = "self",
+    suffix: str = "scaled.",
+    chunk_size: int = 10000,
+    fit_samples: int = None,
+    spill_dir: PathLike = None,
+) -> List[MultiModalDataset]:
+    """Streaming version of `do_scaling`. The scalers are fit with
+    `streaming.chunked_fit` (`partial_fit` over the chunks, or a subsample of
+    at most `fit_samples` rows) and applied to each chunk of `chunk_size` rows.
+    See `do_scaling` for the parameters.
+    """
+    if scale_on not in ["self", "train"]:
+        raise ValueError(f"scale_on: {scale_on} is not valid")
 
-    This code runs the following steps (in order):
-    1. Load the datasets
-    2. Perform the non-parametric transformations, if any, using `do_transform`
-        function. The transforms are specified by `config_to_execute.transforms`
-        which is a list of `TransformConfig` objects.
-    3. Perform the parametric transformations, if any, using `do_reduce` function.
-        The reducer algorithm and parameters are specified by
-        `config_to_execute.reducers` which `ReducerConfig` object.
-    4. Perform the scaling, if any, using `do_scaling` function. The scaler
-        algorithm and parameters are specified by `config_to_execute.scaler`
-        which is a `ScalerConfig` object.
-    5. Perform the training and evaluation of the model.
-    6. Save the results to a file.
+    kwargs = scaler_config.kwargs or {}
+    if scale_on == "train":
+        # Fit the scaler on the first dataset
+        transform = scaler_cls[scaler_config.algorithm](**kwargs)
+        chunked_fit(transform, datasets[0], chunk_size, fit_samples)
 
-    Parameters
-    ----------
-    dataset_locations :  Dict[str, PathLike],
-        Dictionary with dataset locations. Key is the dataset name and value
-        is the path to the dataset.
-    experiment_output_file : PathLike
-        Path to the file where the results will be saved.
-    config_to_execute : ExecutionConfig
-        The configuration of the experiment to be executed.
+    new_datasets = []
+    for dataset in datasets:
+        if scale_on == "self":
+            # Fit a scaler for each dataset
+            transform = scaler_cls[scaler_config.algorithm](**kwargs)
+            chunked_fit(transform, dataset, chunk_size, fit_samples)
+        # Apply the fitted scaler to the whole dataset (fit_on=None), chunk by chunk
+        transformer = TransformMultiModalDataset(
+            transforms=[
+                WindowedTransform(transform=transform, fit_on=None, transform_on="all")
+            ],
+            new_window_name_prefix=suffix,
+        )
+        new_datasets.append(chunked_map(dataset, transformer, chunk_size, spill_dir))
+    return new_datasets
 
-    Returns
-    -------
-    dict
-        Dictionary with the results of the experiment.
 
-    Raises
-    ------
-    ValueError
-        If the reducer is specified but the reducer_dataset is not specified.
-    """
-    experiment_output_file = Path(experiment_output_file)
+################################################################################
+# Pipeline stages
+################################################################################
 
-    if config_version != config_to_execute.version:
-        raise ValueError(
-            f"Config version ({config_to_execute.version}) "
-            f"does not match the current version ({config_version})"
-        )
+# Each experiment runs the following stages (in order): load, transform, reduce
+# and scale. Each stage receives the datasets produced by the previous one, as
+# a (train, test, reducer) tuple, and returns the new datasets. The stages also
+# add their meta information (e.g., the time taken) to `additional_info`.
+# Finally, the estimators are trained and evaluated (`estimate_stage`).
+#
+# In streaming mode (`options.chunk_size` is set), the stages process the
+# datasets in chunks of rows, writing their outputs to memory-mapped spill
+# files (see `streaming.py`), so their memory is bounded by the chunk size.
 
-    # Useful variables
-    additional_info = dict()
-    start_time = time.time()
 
-    # ----------- 1. Load the datasets -----------
-    with catchtime() as loading_time:
-        # Load train dataset
+def spill_directory(options: ExecutorOptions) -> Optional[Path]:
+    """Directory of the spill files of streaming mode: `<cache_dir>/spill`,
+    or None (system temporary directory) if there is no cache directory."""
+    if options.cache_dir is None:
+        return None
+    return Path(options.cache_dir) / "spill"
+
+
+def cache_bytes(options: ExecutorOptions) -> Optional[int]:
+    """Maximum size, in bytes, of each on-disk cache of datasets in
+    `options.cache_dir`, or None if they are not limited."""
+    if options.cache_size is None:
+        return None
+    return options.cache_size * 1024**2
+
+
+def load_stage(
+    dataset_locations: Dict[str, PathLike],
+    config_to_execute: ExecutionConfig,
+    options: ExecutorOptions,
+    datasets: Tuple[MultiModalDataset, ...],
+    additional_info: dict,
+    shared_datasets: Dict[str, ArrayMultiModalDataset] = None,
+) -> Tuple[MultiModalDataset, ...]:
+    """Load the train, test and reducer datasets (the input `datasets` is
+    ignored). The reducer dataset is None, if not specified.
+    """
+    dataset_cache = None
+    dataset_sizes = None
+    if options.cache_dir is not None:
+        dataset_cache = DatasetCache(
+            Path(options.cache_dir) / "datasets", max_bytes=cache_bytes(options)
+        )
+        dataset_sizes = DatasetSizes(Path(options.cache_dir) / "sizes")
+    # The node cache is in front of the shared storage (and of the shared cache)
+    node_cache = None
+    if options.node_cache_dir is not None:
+        node_cache = NodeDatasetCache(
+            options.node_cache_dir,
+            options.node_cache_size * 1024**2,
+            shared_cache=dataset_cache,
+        )
+        dataset_cache = node_cache
+    spill_dir = spill_directory(options)
+
+    with catchtime() as loading_time:
+        # Load train dataset
         train_dset = load_datasets(
             dataset_locations=dataset_locations,
             datasets_to_load=config_to_execute.train_dataset,
             features=config_to_execute.extra.in_use_features,
+            dataset_cache=dataset_cache,
+            shared_datasets=shared_datasets,
+            chunk_size=options.chunk_size,
+            spill_dir=spill_dir,
+            dataset_sizes=dataset_sizes,
+            dtype=config_to_execute.extra.dtype,
         )
         # Load test dataset
         test_dset = load_datasets(
             dataset_locations=dataset_locations,
             datasets_to_load=config_to_execute.test_dataset,
             features=config_to_execute.extra.in_use_features,
+            dataset_cache=dataset_cache,
+            shared_datasets=shared_datasets,
+            chunk_size=options.chunk_size,
+            spill_dir=spill_dir,
+            dataset_sizes=dataset_sizes,
+            dtype=config_to_execute.extra.dtype,
         )
         # If there is any reducer dataset speficied, load reducer
         if config_to_execute.reducer_dataset:
@@ -564,6 +1320,12 @@ def run_experiment(
                 dataset_locations=dataset_locations,
                 datasets_to_load=config_to_execute.reducer_dataset,
                 features=config_to_execute.extra.in_use_features,
+                dataset_cache=dataset_cache,
+                shared_datasets=shared_datasets,
+                chunk_size=options.chunk_size,
+                spill_dir=spill_dir,
+                dataset_sizes=dataset_sizes,
+                dtype=config_to_execute.extra.dtype,
             )
         else:
             reducer_dset = None
@@ -573,41 +1335,176 @@ def run_experiment(
     additional_info["train_size"] = len(train_dset)
     additional_info["test_size"] = len(test_dset)
     additional_info["reduce_size"] = len(reducer_dset) if reducer_dset else 0
+    if node_cache is not None:
+        additional_info["node_cache"] = node_cache.stats()
+    return train_dset, test_dset, reducer_dset
 
-    # ----------- 2. Do the non-parametric transform on train, test and reducer datasets ------------
+
+def transform_stage(
+    dataset_locations: Dict[str, PathLike],
+    config_to_execute: ExecutionConfig,
+    options: ExecutorOptions,
+    datasets: Tuple[MultiModalDataset, ...],
+    additional_info: dict,
+) -> Tuple[MultiModalDataset, ...]:
+    """Do the non-parametric transforms on train, test and reducer datasets."""
+    train_dset, test_dset, reducer_dset = datasets
 
     with catchtime() as transform_time:
         # Is there any transform to do?
         if config_to_execute.transforms is not None:
+            datasets = [train_dset, test_dset]
+            datasets_to_load = [
+                config_to_execute.train_dataset,
+                config_to_execute.test_dataset,
+            ]
             # If there is a reducer dataset, do the transform on all of them
             if reducer_dset is not None:
-                train_dset, test_dset, reducer_dset = do_transform(
-                    datasets=[train_dset, test_dset, reducer_dset],
+                datasets.append(reducer_dset)
+                datasets_to_load.append(config_to_execute.reducer_dataset)
+
+            # Transform chunk by chunk, in streaming mode
+            if options.chunk_size is not None:
+                def transform_chunk(chunk):
+                    return do_transform(
+                        datasets=[chunk],
+                        transform_configs=config_to_execute.transforms,
+                        keep_suffixes=True,
+                        dtype=config_to_execute.extra.dtype,
+                    )[0]
+
+                datasets = [
+                    chunked_map(
+                        dset,
+                        transform_chunk,
+                        chunk_size=options.chunk_size,
+                        spill_dir=spill_directory(options),
+                    )
+                    for dset in datasets
+                ]
+            # Reuse the transformed datasets of other experiments, if caching
+            elif options.cache_dir is not None:
+                transform_cache_stats = {"hits": 0, "misses": 0}
+                datasets = do_cached_transform(
+                    datasets=datasets,
+                    dataset_specs=[
+                        dataset_spec(
+                            dataset_locations,
+                            dsets,
+                            config_to_execute.extra.in_use_features,
+                            dtype=config_to_execute.extra.dtype,
+                        )
+                        for dsets in datasets_to_load
+                    ],
                     transform_configs=config_to_execute.transforms,
+                    transform_cache=get_transform_cache(
+                        Path(options.cache_dir) / "transforms",
+                        options.transform_cache_memory * 1024**2,
+                        cache_bytes(options),
+                    ),
                     keep_suffixes=True,
+                    stats=transform_cache_stats,
+                    dtype=config_to_execute.extra.dtype,
                 )
-            # If there is no reducer dataset, do the transform only on train and test
+                additional_info["transform_cache"] = transform_cache_stats
             else:
-                train_dset, test_dset = do_transform(
-                    datasets=[train_dset, test_dset],
+                datasets = do_transform(
+                    datasets=datasets,
                     transform_configs=config_to_execute.transforms,
                     keep_suffixes=True,
+                    dtype=config_to_execute.extra.dtype,
                 )
+
+            # Keep the data type of the loaded datasets (the transforms cast
+            # their outputs, this only casts transform cache entries of other
+            # data types)
+            datasets = cast_datasets(
+                datasets,
+                config_to_execute.extra.dtype,
+                chunk_size=options.chunk_size,
+                spill_dir=spill_directory(options),
+            )
+            if reducer_dset is not None:
+                train_dset, test_dset, reducer_dset = datasets
+            else:
+                train_dset, test_dset = datasets
     additional_info["transform_time"] = float(transform_time)
+    return train_dset, test_dset, reducer_dset
 
-    # ----------- 3. Do the parametric transform on train and test, using the reducer dataset to fit the transform ------------
+
+def reduce_stage(
+    dataset_locations: Dict[str, PathLike],
+    config_to_execute: ExecutionConfig,
+    options: ExecutorOptions,
+    datasets: Tuple[MultiModalDataset, ...],
+    additional_info: dict,
+) -> Tuple[MultiModalDataset, ...]:
+    """Do the parametric transform on train and test, using the reducer
+    dataset to fit the transform. The reducer dataset is not returned (None),
+    as it is not used anymore.
+    """
+    train_dset, test_dset, reducer_dset = datasets
 
     with catchtime() as reduce_time:
         # Is there any reducer to do?
         if config_to_execute.reducer is not None and reducer_dset is not None:
+            # Reuse the reducers fitted by other experiments, if caching
+            reducer_store = None
+            reducer_store_key = None
+            if options.cache_dir is not None:
+                reducer_store = ReducerStore(Path(options.cache_dir) / "reducers")
+                reducer_store_key = {
+                    "reducer_dataset": dataset_spec(
+                        dataset_locations,
+                        config_to_execute.reducer_dataset,
+                        config_to_execute.extra.in_use_features,
+                        dtype=config_to_execute.extra.dtype,
+                    ),
+                    "transforms": [
+                        asdict(t) for t in (config_to_execute.transforms or [])
+                    ],
+                }
+                # In streaming mode the reducers are fitted on a subsample,
+                # so its size is part of what was fitted
+                if options.chunk_size is not None:
+                    reducer_store_key["fit_samples"] = options.fit_samples
+            reducer_stats = {"hits": 0, "misses": 0, "saved_time": 0.0}
             train_dset, test_dset = do_reduce(
                 datasets=[reducer_dset, train_dset, test_dset],
                 reducer_config=config_to_execute.reducer,
                 reduce_on=config_to_execute.extra.reduce_on,
+                reducer_store=reducer_store,
+                store_key=reducer_store_key,
+                force_refit=options.force_refit,
+                stats=reducer_stats,
+                num_workers=options.reducer_workers,
+                chunk_size=options.chunk_size,
+                fit_samples=options.fit_samples,
+                spill_dir=spill_directory(options),
+            )
+            train_dset, test_dset = cast_datasets(
+                [train_dset, test_dset],
+                config_to_execute.extra.dtype,
+                chunk_size=options.chunk_size,
+                spill_dir=spill_directory(options),
             )
+            if reducer_store is not None:
+                additional_info["reducer_cache"] = reducer_stats
     additional_info["reduce_time"] = float(reduce_time)
+    return train_dset, test_dset, None
 
-    # ----------- 4. Do the scaling on train and test, using the train dataset to fit the scaler ------------
+
+def scale_stage(
+    dataset_locations: Dict[str, PathLike],
+    config_to_execute: ExecutionConfig,
+    options: ExecutorOptions,
+    datasets: Tuple[MultiModalDataset, ...],
+    additional_info: dict,
+) -> Tuple[MultiModalDataset, ...]:
+    """Do the scaling on train and test, using the train dataset to fit the
+    scaler (if scale_on is "train").
+    """
+    train_dset, test_dset, reducer_dset = datasets
 
     with catchtime() as scaling_time:
         # Is there any scaler to do?
@@ -616,11 +1513,45 @@ def run_experiment(
                 datasets=[train_dset, test_dset],
                 scaler_config=config_to_execute.scaler,
                 scale_on=config_to_execute.extra.scale_on,
+                chunk_size=options.chunk_size,
+                fit_samples=options.fit_samples,
+                spill_dir=spill_directory(options),
+            )
+            train_dset, test_dset = cast_datasets(
+                [train_dset, test_dset],
+                config_to_execute.extra.dtype,
+                chunk_size=options.chunk_size,
+                spill_dir=spill_directory(options),
             )
 
     additional_info["scaling_time"] = float(scaling_time)
+    return train_dset, test_dset, reducer_dset
 
-    # ----------- 5. Do the training, testing and evaluate ------------
+
+# The preprocessing stages, in the order they are executed
+pipeline_stages = {
+    "load": load_stage,
+    "transform": transform_stage,
+    "reduce": reduce_stage,
+    "scale": scale_stage,
+}
+
+
+def estimate_stage(
+    config_to_execute: ExecutionConfig,
+    datasets: Tuple[MultiModalDataset, ...],
+    options: ExecutorOptions = None,
+    checkpoint: ExperimentCheckpoint = None,
+) -> List[dict]:
+    """Do the training, testing and evaluation of each estimator, using the
+    train and test datasets. Returns the results of each estimator.
+    The runs of each estimator are executed in parallel if
+    `options.estimator_workers` is greater than 1. If a checkpoint is
+    informed, the results of each estimator are saved in it, and estimators
+    with saved results are not evaluated again.
+    """
+    train_dset, test_dset, _ = datasets
+    options = options or ExecutorOptions()
 
     # Create reporter
     reporter = ClassificationReport(
@@ -636,92 +1567,1295 @@ def run_experiment(
     all_results = []
 
     # Create Simple Workflow
-    for estimator_cfg in config_to_execute.estimators:
+    for i, estimator_cfg in enumerate(config_to_execute.estimators):
+        # Reuse the results of a previous (interrupted) execution
+        if checkpoint is not None:
+            results = checkpoint.load_estimator(i)
+            if results is not None:
+                all_results.append(results)
+                continue
+
         results = dict()
 
+        # In streaming mode, predict chunk by chunk
+        estimator = estimator_cls[estimator_cfg.algorithm]
+        if options.chunk_size is not None:
+            estimator = functools.partial(
+                chunked_estimator, estimator, options.chunk_size
+            )
+
+        # Record the fit and predict of each run, if profiling
+        if options.profile:
+            estimator = functools.partial(profiled_estimator, estimator)
+
         workflow = SimpleTrainEvalWorkflow(
-            estimator=estimator_cls[estimator_cfg.algorithm],
+            estimator=estimator,
             estimator_creation_kwags=estimator_cfg.kwargs or {},
             do_not_instantiate=False,
             do_fit=True,
             evaluator=reporter,
         )
+        if options.profile:
+            workflow = ProfiledWorkflow(workflow)
+
+        # Create a multi execution workflow (sequential with one worker). The
+        # seeds of the runs are derived from the estimator configuration, so
+        # the runs are reproducible, with any number of workers
+        runner = ParallelMultiRunWorkflow(
+            workflow=workflow,
+            num_runs=estimator_cfg.num_runs,
+            num_workers=options.estimator_workers,
+            seed=int(sha256(asdict(estimator_cfg)), 16),
+        )
+        with catchtime() as classification_time, span(
+            "estimator", estimator=estimator_cfg.name
+        ):
+            results["results"] = runner(train_dset, test_dset)
+
+        results["classification_time"] = float(classification_time)
+        results["estimator"] = asdict(estimator_cfg)
+        all_results.append(results)
+        if checkpoint is not None:
+            checkpoint.save_estimator(i, results)
+
+    return all_results
+
+
+def save_results(
+    experiment_output_file: PathLike,
+    config_to_execute: ExecutionConfig,
+    all_results: List[dict],
+    additional_info: dict,
+    start_time: float,
+    options: ExecutorOptions = None,
+):
+    """Save the results of an experiment (and its additional information)
+    using the results backend of the options (see `results.py`). The
+    experiment identifier and the output directory are the name and the
+    directory of the output file (the file itself is written by the YAML
+    backend only, or if `options.export_yaml` is set).
+    """
+    options = options or ExecutorOptions()
+    end_time = time.time()
+    additional_info["total_time"] = end_time - start_time
+    additional_info["start_time"] = start_time
+    additional_info["end_time"] = end_time
+    additional_info["system"] = get_sys_info()
+
+    values = {
+        "experiment": asdict(config_to_execute),
+        "report": all_results,
+        "additional": additional_info,
+    }
+
+    experiment_output_file = Path(experiment_output_file)
+    output_dir = experiment_output_file.parent
+    experiment_id = experiment_output_file.stem
+    get_results_backend(options.results_backend, output_dir).save(experiment_id, values)
+    if options.export_yaml and options.results_backend != "yaml":
+        YAMLResults(output_dir).save(experiment_id, values)
+    if options.profile:
+        save_chrome_trace(
+            output_dir / f"{experiment_id}.trace.json",
+            additional_info.get("profile", []),
+            process_name=experiment_id,
+        )
+
+
+def run_search(
+    dataset_locations: Dict[str, PathLike],
+    experiment_output_file: PathLike,
+    config_to_execute: ExecutionConfig,
+    options: ExecutorOptions = None,
+    shared_datasets: Dict[str, ArrayMultiModalDataset] = None,
+) -> dict:
+    """Run the points of the hyperparameter search of an experiment (see
+    `search.py`) in this process. The points are sorted by their stage keys
+    (see `planner.stage_keys`), so points that only differ in later stages
+    run one after the other, and the output of each stage is reused by all
+    the points that share it (e.g., the points that only change the estimator
+    kwargs load, transform, reduce and scale the datasets only once). The
+    results of each point are saved as `<experiment_id>.<index>`.
+
+    The parameters are the same as `run_experiment`.
+
+    Returns
+    -------
+    dict
+        Dictionary with the results of the last point.
+
+    Raises
+    ------
+    RuntimeError
+        If any point fails (the other points are still executed).
+    """
+    experiment_output_file = Path(experiment_output_file)
+    options = options or ExecutorOptions()
+    output_dir = experiment_output_file.parent
+    experiment_id = experiment_output_file.stem
+
+    points = [
+        (point_id(experiment_id, i), params, config, stage_keys(config, options))
+        for i, (params, config) in enumerate(expand_search(config_to_execute))
+    ]
+    if options.skip_existing:
+        executed_ids = get_results_backend(
+            options.results_backend, output_dir
+        ).executed_ids()
+        points = [p for p in points if p[0] not in executed_ids]
+    points.sort(key=lambda p: tuple(p[3][stage] for stage in stage_names))
+
+    # Output of the last execution of each stage: (key, datasets, additional_info)
+    outputs = dict()
+    failed = []
+    last_results = None
+    for index, params, config, keys in points:
+        try:
+            datasets, additional_info = None, dict()
+            reused_stages = []
+            for level, stage in enumerate(stage_names):
+                if stage in outputs and outputs[stage][0] == keys[stage]:
+                    _, datasets, additional_info = outputs[stage]
+                    reused_stages.append(stage)
+                    continue
+                # The outputs of the later stages are no longer valid
+                for later in stage_names[level:]:
+                    outputs.pop(later, None)
+                additional_info = dict(additional_info)
+                # Only the load stage uses the shared datasets
+                kwargs = {"shared_datasets": shared_datasets} if stage == "load" else {}
+                with record_profile(
+                    additional_info, options.profile, options.profile_allocations
+                ), span(stage):
+                    datasets = pipeline_stages[stage](
+                        dataset_locations,
+                        config,
+                        options,
+                        datasets,
+                        additional_info,
+                        **kwargs,
+                    )
+                outputs[stage] = (keys[stage], datasets, additional_info)
+
+            additional_info = dict(additional_info)
+            additional_info["stage_keys"] = keys
+            additional_info["search"] = {
+                "experiment_id": experiment_id,
+                "params": params,
+                "reused_stages": reused_stages,
+            }
+            # The time of the (possibly reused) stages is accounted to every point
+            start_time = time.time() - sum(
+                additional_info[k]
+                for k in ["load_time", "transform_time", "reduce_time", "scaling_time"]
+            )
+            # Only the estimators are checkpointed (the stages are reused)
+            checkpoint = None
+            if options.checkpoint:
+                checkpoint = ExperimentCheckpoint(
+                    output_dir / ".checkpoints",
+                    index,
+                    config,
+                    extra={"fit_samples": options.fit_samples},
+                )
+            with record_profile(
+                additional_info, options.profile, options.profile_allocations
+            ), span("estimate"):
+                all_results = estimate_stage(config, datasets, options, checkpoint)
+            save_results(
+                output_dir / f"{index}.yaml",
+                config,
+                all_results,
+                additional_info,
+                start_time,
+                options,
+            )
+            if checkpoint is not None:
+                checkpoint.clear()
+            last_results = all_results[-1]
+        except Exception:
+            logging.exception(f"Error while running search point {index}: {params}")
+            failed.append(index)
+
+    if failed:
+        raise RuntimeError(f"Failed search points of {experiment_id}: {failed}")
+    return last_results
+
+
+# Function that runs the experiment
+def run_experiment(
+    dataset_locations: Dict[str, PathLike],
+    experiment_output_file: PathLike,
+    config_to_execute: ExecutionConfig,
+    options: ExecutorOptions = None,
+    shared_datasets: Dict[str, ArrayMultiModalDataset] = None,
+) -> dict:
+    """This function is the wrapper that runs the experiment.
+    The experiment is defined by the config_to_execute parameter,
+    which controls the experiment execution.
+
+    This code runs the following steps (in order):
+    1. Load the datasets
+    2. Perform the non-parametric transformations, if any, using `do_transform`
+        function. The transforms are specified by `config_to_execute.transforms`
+        which is a list of `TransformConfig` objects.
+    3. Perform the parametric transformations, if any, using `do_reduce` function.
+        The reducer algorithm and parameters are specified by
+        `config_to_execute.reducers` which `ReducerConfig` object.
+    4. Perform the scaling, if any, using `do_scaling` function. The scaler
+        algorithm and parameters are specified by `config_to_execute.scaler`
+        which is a `ScalerConfig` object.
+    5. Perform the training and evaluation of the model.
+    6. Save the results to a file.
+
+    Parameters
+    ----------
+    dataset_locations :  Dict[str, PathLike],
+        Dictionary with dataset locations. Key is the dataset name and value
+        is the path to the dataset.
+    experiment_output_file : PathLike
+        Path to the file where the results will be saved.
+    config_to_execute : ExecutionConfig
+        The configuration of the experiment to be executed.
+    options : ExecutorOptions, optional
+        Options that control the execution (e.g., caches and checkpoints),
+        by default None (default options).
+    shared_datasets : Dict[str, ArrayMultiModalDataset], optional
+        Dataset splits already loaded, indexed by `dataset_view_key`. They are
+        used instead of loading the splits again. By default None
+
+    Returns
+    -------
+    dict
+        Dictionary with the results of the experiment.
+
+    Raises
+    ------
+    ValueError
+        If the reducer is specified but the reducer_dataset is not specified.
+    """
+    experiment_output_file = Path(experiment_output_file)
+    options = options or ExecutorOptions()
+
+    if config_version != config_to_execute.version:
+        raise ValueError(
+            f"Config version ({config_to_execute.version}) "
+            f"does not match the current version ({config_version})"
+        )
+
+    # Each point of a hyperparameter search is an experiment
+    if config_to_execute.search is not None:
+        return run_search(
+            dataset_locations,
+            experiment_output_file,
+            config_to_execute,
+            options,
+            shared_datasets,
+        )
+
+    # Useful variables
+    additional_info = dict()
+    start_time = time.time()
+
+    # Resume from the latest checkpoint of a previous (interrupted) execution
+    checkpoint = None
+    datasets = None
+    completed_stages = []
+    if options.checkpoint:
+        checkpoint = ExperimentCheckpoint(
+            experiment_output_file.parent / ".checkpoints",
+            experiment_output_file.stem,
+            config_to_execute,
+            extra={"fit_samples": options.fit_samples},
+        )
+        resumed = checkpoint.latest_stage()
+        if resumed is not None:
+            stage, datasets, additional_info = resumed
+            completed_stages = stage_names[: stage_names.index(stage) + 1]
+            additional_info["resumed_from"] = stage
+            # The time of the completed stages is accounted to the experiment
+            start_time -= sum(
+                additional_info.get(k, 0.0)
+                for k in ["load_time", "transform_time", "reduce_time", "scaling_time"]
+            )
+            logging.info(f"Resuming {experiment_output_file.stem} after {stage} stage")
+
+    # Run a stage (if not completed before) and checkpoint its output
+    def _run_stage(stage: str, datasets, **kwargs):
+        if stage in completed_stages:
+            return datasets
+        with record_profile(
+            additional_info, options.profile, options.profile_allocations
+        ), span(stage):
+            datasets = pipeline_stages[stage](
+                dataset_locations,
+                config_to_execute,
+                options,
+                datasets,
+                additional_info,
+                **kwargs,
+            )
+        if checkpoint is not None and stage in checkpoint_stages:
+            checkpoint.save_stage(stage, datasets, additional_info)
+        return datasets
+
+    # ----------- 1. Load the datasets -----------
+    datasets = _run_stage("load", datasets, shared_datasets=shared_datasets)
+
+    # ----------- 2. Do the non-parametric transform on train, test and reducer datasets ------------
+    datasets = _run_stage("transform", datasets)
+
+    # ----------- 3. Do the parametric transform on train and test, using the reducer dataset to fit the transform ------------
+    datasets = _run_stage("reduce", datasets)
+
+    # ----------- 4. Do the scaling on train and test, using the train dataset to fit the scaler ------------
+    datasets = _run_stage("scale", datasets)
+
+    # ----------- 5. Do the training, testing and evaluate ------------
+    with record_profile(
+        additional_info, options.profile, options.profile_allocations
+    ), span("estimate"):
+        all_results = estimate_stage(config_to_execute, datasets, options, checkpoint)
+
+    # ----------- 6. Save results ------------
+    save_results(
+        experiment_output_file,
+        config_to_execute,
+        all_results,
+        additional_info,
+        start_time,
+        options,
+    )
+    if checkpoint is not None:
+        checkpoint.clear()
+
+    return all_results[-1]
+
+
+def run_wrapper(args) -> dict:
+    """Run a single experiment. This is the function that is parallelized, if needed.
+    It is a wrapper around run_experiment, that takes the arguments as a list.
+
+    Parameters
+    ----------
+    args : _type_
+        A list of arguments, in the following order:
+        - dataset_locations: Dict[str, PathLike] (locations of the datasets)
+        - output_dir: Path (the directory where the results will be stored)
+        - yaml_config_file: Path (the path to the yaml file containing the experiment configuration)
+        - options: ExecutorOptions (options that control the execution)
+        - shared_datasets: Dict[str, ArrayMultiModalDataset] (optional, dataset
+            splits already loaded)
+
+    Returns
+    -------
+    dict
+        A dict with the results of the experiment and additional information.
+    """
+    # Unpack arguments
+    dataset_locations: Dict[str, PathLike] = args[0]
+    output_dir: Path = Path(args[1])
+    yaml_config_file: Path = Path(args[2])
+    options: ExecutorOptions = args[3]
+    shared_datasets = args[4] if len(args) > 4 else None
+    experiment_id = yaml_config_file.stem
+    result = None
+    try:
+        # Load config
+        config = from_dict(data_class=ExecutionConfig, data=load_yaml(yaml_config_file))
+        # Create output file
+        experiment_output_file = output_dir / f"{experiment_id}.yaml"
+        logging.info(
+            f"Starting execution {experiment_id}. Output at {experiment_output_file}"
+        )
+
+        # Run experiment
+        result = run_experiment(
+            dataset_locations, experiment_output_file, config, options, shared_datasets
+        )
+    except Exception as e:
+        logging.exception(f"Error while running experiment: {yaml_config_file}")
+    finally:
+        return result
+
+
+def run_ray_wrapper(args) -> dict:
+    """Run a single experiment in a Ray task. It is a wrapper around
+    `run_wrapper`, that takes the same arguments, but the shared datasets are
+    references to objects in the Ray object store (see `put_shared_datasets`).
+    The references are resolved (without copying the arrays) before running.
+
+    Parameters
+    ----------
+    args : _type_
+        The same arguments of `run_wrapper`, but the shared datasets are a
+        dictionary of Ray object references.
+
+    Returns
+    -------
+    dict
+        A dict with the results of the experiment and additional information.
+    """
+    shared_refs = args[4]
+    try:
+        shared_datasets = dict(
+            zip(shared_refs.keys(), ray.get(list(shared_refs.values())))
+        )
+    except Exception:
+        logging.exception(f"Error while getting shared datasets of: {args[2]}")
+        return None
+    return run_wrapper(args[:4] + (shared_datasets,))
+
+
+def put_shared_datasets(
+    dataset_locations: Dict[str, PathLike],
+    execution_config_files: List[PathLike],
+    options: ExecutorOptions,
+    measured_sizes: Dict[str, int] = None,
+    put: Callable[[ArrayMultiModalDataset], Any] = ray.put,
+) -> Dict[PathLike, Dict[str, Any]]:
+    """Load each dataset split required by the experiments only once and put
+    it in the Ray object store. Experiments with the same dataset splits share
+    the same objects, which are read by the tasks without copying.
+
+    Parameters
+    ----------
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    execution_config_files : List[PathLike]
+        List of configuration files to execute.
+    options : ExecutorOptions
+        Options that control the execution (the dataset cache is used).
+    measured_sizes : Dict[str, int], optional
+        If informed, the size (in bytes) of each loaded split is stored in
+        it, indexed by `dataset_view_key`. By default None
+    put : Callable[[ArrayMultiModalDataset], Any], optional
+        Function that shares a dataset split and returns its reference, by
+        default `ray.put` (the process pool shares the datasets themselves)
+
+    Returns
+    -------
+    Dict[PathLike, Dict[str, Any]]
+        A dictionary with the configuration file as key and, as value, a
+        dictionary with the object references of the dataset splits
+        required by the experiment, indexed by `dataset_view_key`.
+    """
+    # Dataset splits (and the features to load) required by each experiment
+    required_views = dict()
+    for e in execution_config_files:
+        try:
+            config = from_dict(data_class=ExecutionConfig, data=load_yaml(e))
+        except Exception:
+            # Error will be reported by the task running the experiment
+            required_views[e] = []
+            continue
+        features = tuple(config.extra.in_use_features)
+        datasets = (
+            config.train_dataset + config.test_dataset + (config.reducer_dataset or [])
+        )
+        required_views[e] = [(dset, features) for dset in datasets]
+
+    # Group the splits by dataset name and features, to load each dataset once
+    splits_to_load = dict()
+    for views in required_views.values():
+        for dset, features in views:
+            name = dset.split("[")[0]
+            split = dset.split("[")[1].split("]")[0]
+            splits_to_load.setdefault((name, features), set()).add(split)
+
+    dataset_cache = None
+    dataset_sizes = None
+    if options.cache_dir is not None:
+        dataset_cache = DatasetCache(
+            Path(options.cache_dir) / "datasets",
+            mmap=False,
+            max_bytes=cache_bytes(options),
+        )
+        dataset_sizes = DatasetSizes(Path(options.cache_dir) / "sizes")
+
+    refs = dict()
+    for (name, features), splits in tqdm.tqdm(
+        splits_to_load.items(), desc="Sharing datasets"
+    ):
+        try:
+            loaded = load_dataset_splits(
+                dataset_path=dataset_locations[name],
+                splits=sorted(splits),
+                features=list(features),
+                dataset_cache=dataset_cache,
+            )
+        except Exception:
+            # Tasks will try to load it by themselves (and report the error)
+            logging.exception(f"Error while loading dataset {name} to share")
+            continue
+        for split, dset in loaded.items():
+            key = dataset_view_key(f"{name}[{split}]", features)
+            refs[key] = put(dset)
+            if measured_sizes is not None:
+                measured_sizes[key] = dataset_nbytes(dset)
+            if dataset_sizes is not None:
+                dataset_sizes.put(key, dataset_nbytes(dset), len(dset))
+        del loaded
+
+    return {
+        e: {
+            key: refs[key]
+            for key in (dataset_view_key(dset, features) for dset, features in views)
+            if key in refs
+        }
+        for e, views in required_views.items()
+    }
+
+
+def experiment_nbytes(
+    dataset_locations: Dict[str, PathLike],
+    config: ExecutionConfig,
+    options: ExecutorOptions,
+    measured_sizes: Dict[str, int] = None,
+) -> Dict[str, int]:
+    """Size, in bytes, of each dataset split of an experiment (see
+    `resources.view_nbytes`), indexed by the dataset string.
+
+    Parameters
+    ----------
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    config : ExecutionConfig
+        The configuration of the experiment.
+    options : ExecutorOptions
+        Options that control the execution (the sizes of the splits loaded by
+        previous executions are stored in the cache directory).
+    measured_sizes : Dict[str, int], optional
+        Size of the dataset splits loaded in this execution (see
+        `put_shared_datasets`), by default None
+
+    Returns
+    -------
+    Dict[str, int]
+        The size of each dataset split.
+    """
+    dataset_sizes = None
+    if options.cache_dir is not None:
+        dataset_sizes = DatasetSizes(Path(options.cache_dir) / "sizes")
+    features = config.extra.in_use_features
+    return {
+        dset: view_nbytes(
+            dataset_locations,
+            dset,
+            dataset_view_key(dset, features),
+            measured=measured_sizes,
+            dataset_sizes=dataset_sizes,
+        )
+        for dset in config.train_dataset
+        + config.test_dataset
+        + (config.reducer_dataset or [])
+    }
+
+
+def ray_task_options(
+    dataset_locations: Dict[str, PathLike],
+    config: ExecutionConfig,
+    options: ExecutorOptions,
+    node_limits: Tuple[int, Optional[int]],
+    measured_sizes: Dict[str, int] = None,
+    stage: str = None,
+    cost_model: CostModel = None,
+) -> dict:
+    """Ray task options (`num_cpus` and `memory`) to run an experiment, or one
+    of its stages, estimated by `resources.estimate_resources` (or, for whole
+    experiments, predicted by a cost model).
+
+    Parameters
+    ----------
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    config : ExecutionConfig
+        The configuration of the experiment.
+    options : ExecutorOptions
+        Options that control the execution of the experiment.
+    node_limits : Tuple[int, Optional[int]]
+        The CPUs and memory of the largest node (see `resources.ray_node_limits`).
+    measured_sizes : Dict[str, int], optional
+        Size of the dataset splits loaded in this execution (see
+        `put_shared_datasets`), by default None
+    stage : str, optional
+        The stage of a planned execution, by default None (whole experiment)
+    cost_model : CostModel, optional
+        If informed, the memory of whole experiments is the peak memory
+        predicted by the model (see `scheduler.py`), by default None
+
+    Returns
+    -------
+    dict
+        The keyword arguments of the `options` method of Ray remote functions.
+    """
+    nbytes = experiment_nbytes(dataset_locations, config, options, measured_sizes)
+    max_cpus, max_memory = node_limits
+    if options.max_task_cpus is not None:
+        max_cpus = min(max_cpus, options.max_task_cpus)
+    resources = estimate_resources(
+        config, nbytes, options, max_cpus, max_memory=max_memory, stage=stage
+    )
+    if cost_model is not None and stage is None:
+        resources.memory = cost_model.predict(config, nbytes).memory
+        if max_memory is not None:
+            resources.memory = min(resources.memory, max_memory)
+    return {"num_cpus": resources.num_cpus, "memory": resources.memory}
+
+
+def estimate_memory(
+    dataset_locations: Dict[str, PathLike],
+    execution_config_files: List[PathLike],
+    options: ExecutorOptions,
+    measured_sizes: Dict[str, int] = None,
+    cost_model: CostModel = None,
+) -> List[int]:
+    """Peak memory (in bytes) of each experiment, estimated from the size of
+    its datasets and its stages (see `resources.estimate_resources`), or
+    predicted by a cost model (see `scheduler.py`). Invalid configurations
+    have the base memory (their errors are reported when executed).
+
+    Parameters
+    ----------
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    execution_config_files : List[PathLike]
+        List of configuration files to execute.
+    options : ExecutorOptions
+        Options that control the execution of each experiment.
+    measured_sizes : Dict[str, int], optional
+        Size of the dataset splits loaded in this execution (see
+        `put_shared_datasets`), by default None
+    cost_model : CostModel, optional
+        The cost model, by default None (static estimate)
+
+    Returns
+    -------
+    List[int]
+        The peak memory of each experiment.
+    """
+    estimates = []
+    for e in execution_config_files:
+        try:
+            config = from_dict(data_class=ExecutionConfig, data=load_yaml(e))
+            estimates.append(
+                config_memory(
+                    dataset_locations, config, options, measured_sizes, cost_model
+                )
+            )
+        except Exception:
+            estimates.append(base_memory)
+    return estimates
+
+
+def config_memory(
+    dataset_locations: Dict[str, PathLike],
+    config: ExecutionConfig,
+    options: ExecutorOptions,
+    measured_sizes: Dict[str, int] = None,
+    cost_model: CostModel = None,
+) -> int:
+    """Peak memory (in bytes) of an experiment configuration (see
+    `estimate_memory`)."""
+    nbytes = experiment_nbytes(dataset_locations, config, options, measured_sizes)
+    if cost_model is not None:
+        return cost_model.predict(config, nbytes).memory
+    return estimate_resources(config, nbytes, options, 1).memory
+
+
+def run_ray_task(func, *args) -> Any:
+    """Call a function in a Ray task, limiting the threads of the libraries
+    (see `resources.limit_threads`) to the CPUs reserved for the task."""
+    with limit_threads(ray_assigned_cpus()):
+        return func(*args)
+
+
+def run_single_thread(
+    args: Any,
+    dataset_locations: Dict[str, PathLike],
+    execution_config_files: List[PathLike],
+    output_path: PathLike,
+    options: ExecutorOptions,
+):
+    """Runs the experiments sequentially, without parallelization.
+
+    Parameters
+    ----------
+    args : Any
+        The arguments passed to the script
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    execution_config_files : List[PathLike]
+        List of configuration files to execute.
+    output_path : PathLike
+        Output path where the results will be stored.
+    options : ExecutorOptions
+        Options that control the execution of each experiment.
+    """
+    results = []
+    for e in tqdm.tqdm(execution_config_files, desc="Executing experiments"):
+        r = run_wrapper((dataset_locations, output_path, e, options))
+        results.append(r)
+    return results
+
+
+def predict_costs(
+    dataset_locations: Dict[str, PathLike],
+    execution_config_files: List[PathLike],
+    cost_model: CostModel,
+    options: ExecutorOptions,
+) -> List[CostEstimate]:
+    """Predict the costs of the experiments with a cost model (see
+    `scheduler.py`). Invalid configurations have no cost (their errors are
+    reported when they are executed).
+
+    Parameters
+    ----------
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    execution_config_files : List[PathLike]
+        List of configuration files to execute.
+    cost_model : CostModel
+        The cost model.
+    options : ExecutorOptions
+        Options that control the execution of each experiment.
+
+    Returns
+    -------
+    List[CostEstimate]
+        The predicted costs of each experiment.
+    """
+    estimates = []
+    for e in execution_config_files:
+        try:
+            config = from_dict(data_class=ExecutionConfig, data=load_yaml(e))
+            nbytes = experiment_nbytes(dataset_locations, config, options)
+            estimates.append(cost_model.predict(config, nbytes))
+        except Exception:
+            estimates.append(CostEstimate(known=False))
+    return estimates
+
+
+def print_schedule_report(
+    execution_config_files: List[PathLike],
+    estimates: List[CostEstimate],
+    nodes: List[Tuple[int, Optional[int]]],
+):
+    """Print the predicted time and memory of each experiment, and the
+    predicted makespan when the experiments are submitted in the order of
+    their files and longest first (see `scheduler.simulate_schedule`).
+
+    Parameters
+    ----------
+    execution_config_files : List[PathLike]
+        List of configuration files to execute.
+    estimates : List[CostEstimate]
+        The predicted costs of each experiment.
+    nodes : List[Tuple[int, Optional[int]]]
+        The CPUs and memory (in bytes, or None for no limit) of each node.
+    """
+    order = longest_first(estimates)
+    print(f"{'experiment':<40} {'time':>10} {'memory':>12} {'cpus':>5}")
+    for i in order:
+        estimate = estimates[i]
+        name = Path(execution_config_files[i]).stem + ("" if estimate.known else " *")
+        print(
+            f"{name:<40} {estimate.time:>8.1f} s {estimate.memory / 1024**2:>9.1f} MB "
+            + f"{estimate.num_cpus:>5}"
+        )
+    print("(*) Kind of stage or estimator without results: mean rate of the stage")
+
+    total_cpus = sum(cpus for cpus, _ in nodes)
+    print(f"Predicted makespan on {len(nodes)} node(s) with {total_cpus} CPUs:")
+    for name, submit_order in [
+        ("file order", list(range(len(estimates)))),
+        ("longest first", order),
+    ]:
+        schedule = simulate_schedule(estimates, submit_order, nodes)
+        print(f"    {name:<16} {makespan(schedule):>10.1f} s")
+    print(f"    {'sequential':<16} {sum(e.time for e in estimates):>10.1f} s")
+
+
+def _pool_worker(
+    conn: multiprocessing.connection.Connection,
+    tasks: List[tuple],
+    num_cpus: int,
+    memory_limit: Optional[int],
+    max_tasks: Optional[int],
+):
+    """Loop of a worker process of `run_pool`: receive the index of a task,
+    run it (see `run_wrapper`) and send its result, until `max_tasks` tasks
+    are executed or None is received.
+
+    `memory_limit` limits the growth of the address space of the worker. The
+    worker inherits the address space of the main process (including the
+    shared datasets), so the limit is set relative to the address space
+    right after the fork.
+    """
+    if memory_limit is not None:
+        limit = psutil.Process().memory_info().vms + memory_limit
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    num_tasks = 0
+    with limit_threads(num_cpus):
+        while max_tasks is None or num_tasks < max_tasks:
+            i = conn.recv()
+            if i is None:
+                break
+            conn.send(run_wrapper(tasks[i]))
+            num_tasks += 1
+    shutdown_process_pool()
+    conn.close()
+
+
+def run_pool(
+    args: Any,
+    dataset_locations: Dict[str, PathLike],
+    execution_config_files: List[PathLike],
+    output_path: PathLike,
+    options: ExecutorOptions,
+    cost_model: CostModel = None,
+):
+    """Runs the experiments in parallel, using a pool of `args.workers`
+    processes in this node (a lightweight alternative to Ray).
+
+    The dataset splits required by the experiments are loaded once, before
+    the workers are forked, so the workers read them without copying
+    (copy-on-write memory, never written). Each worker runs at most
+    `args.max_tasks_per_worker` experiments and is replaced by a new one,
+    releasing the memory leaked by the experiments. The growth of the address
+    space of each worker, over what it inherits from this process, may be
+    limited (`args.worker_memory`, in MB), so an experiment that exceeds it
+    fails (MemoryError) instead of the node running out of memory.
+    Experiments whose worker dies are failures. With `args.memory_budget`
+    (in MB), experiments are started only while their projected memory usage
+    fits the budget (see `admission.py`).
+
+    Parameters
+    ----------
+    args : Any
+        The arguments passed to the script
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    execution_config_files : List[PathLike]
+        List of configuration files to execute.
+    output_path : PathLike
+        Output path where the results will be stored.
+    options : ExecutorOptions
+        Options that control the execution of each experiment.
+    cost_model : CostModel, optional
+        If informed, the memory of the experiments (with `args.memory_budget`)
+        is predicted by the model, by default None
+    """
+    # Each dataset split is loaded once and shared with the forked workers
+    measured_sizes = dict()
+    shared_datasets = put_shared_datasets(
+        dataset_locations,
+        execution_config_files,
+        options,
+        measured_sizes,
+        put=lambda dset: dset,
+    )
+    admission = None
+    if args.memory_budget is not None:
+        estimates = estimate_memory(
+            dataset_locations,
+            execution_config_files,
+            options,
+            measured_sizes,
+            cost_model,
+        )
+        admission = AdmissionController(args.memory_budget * 1024**2)
+    tasks = [
+        (dataset_locations, output_path, e, options, shared_datasets[e])
+        for e in execution_config_files
+    ]
+    num_workers = min(args.workers, len(tasks))
+    num_cpus = max((os.cpu_count() or 1) // max(num_workers, 1), 1)
+    memory_limit = None
+    if args.worker_memory is not None:
+        memory_limit = args.worker_memory * 1024**2
+
+    context = multiprocessing.get_context("fork")
+    # Connection to each worker -> [process, task running, tasks executed]
+    workers = dict()
+    pending = deque(range(len(tasks)))
+    results = [None] * len(tasks)
+    num_failed = 0
+
+    def _finish(i: int, result: Optional[dict]):
+        nonlocal num_failed
+        results[i] = result
+        if admission is not None:
+            admission.release(i)
+        if result is None:
+            num_failed += 1
+            logging.error(
+                f"Experiment {Path(execution_config_files[i]).stem} failed "
+                f"({num_failed} failures so far)"
+            )
+        progress.update(1)
+        progress.set_postfix(failed=num_failed)
+
+    with tqdm.tqdm(total=len(tasks), desc="Executing experiments") as progress:
+        while pending or workers:
+            # Start workers (replacing the finished ones) and assign tasks
+            running = sum(1 for w in workers.values() if w[1] is not None)
+            while len(workers) < min(num_workers, len(pending) + running):
+                conn, child_conn = context.Pipe()
+                process = context.Process(
+                    target=_pool_worker,
+                    args=(
+                        child_conn,
+                        tasks,
+                        num_cpus,
+                        memory_limit,
+                        args.max_tasks_per_worker,
+                    ),
+                )
+                process.start()
+                child_conn.close()
+                workers[conn] = [process, None, 0]
+            for conn, worker in workers.items():
+                if worker[1] is None and pending:
+                    if admission is not None:
+                        if not admission.can_admit(estimates[pending[0]]):
+                            break
+                        admission.admit(pending[0], estimates[pending[0]])
+                    worker[1] = pending.popleft()
+                    conn.send(worker[1])
+            # Stop the idle workers, if there are no tasks left
+            if not pending:
+                for conn, worker in list(workers.items()):
+                    if worker[1] is None:
+                        try:
+                            conn.send(None)
+                        except BrokenPipeError:
+                            # The worker already died
+                            pass
+                        worker[0].join()
+                        del workers[conn]
+                if not workers:
+                    break
+
+            # Wait for (at least) one task to finish (or a worker to die). With
+            # admission control, the memory usage is checked every second
+            ready = wait(list(workers.keys()), timeout=1 if admission else None)
+            for conn in ready:
+                process, i, num_tasks = workers[conn]
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    # The worker died (e.g., killed by the system)
+                    process.join()
+                    del workers[conn]
+                    if i is None:
+                        # It was idle, no experiment is lost (it is replaced)
+                        logging.warning(
+                            f"Idle worker died (exit code {process.exitcode})"
+                        )
+                        continue
+                    logging.error(
+                        f"Worker of {Path(execution_config_files[i]).stem} died "
+                        f"(exit code {process.exitcode})"
+                    )
+                    _finish(i, None)
+                    continue
+                _finish(i, result)
+                workers[conn] = [process, None, num_tasks + 1]
+                # Recycle the worker
+                if (
+                    args.max_tasks_per_worker is not None
+                    and num_tasks + 1 >= args.max_tasks_per_worker
+                ):
+                    process.join()
+                    del workers[conn]
+    return results
+
+
+def run_ray(
+    args: Any,
+    dataset_locations: Dict[str, PathLike],
+    execution_config_files: List[PathLike],
+    output_path: PathLike,
+    options: ExecutorOptions,
+    cost_model: CostModel = None,
+):
+    """Runs the experiments in parallel, using Ray.
+
+    Parameters
+    ----------
+    args : Any
+        The arguments passed to the script
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    execution_config_files : List[PathLike]
+        List of configuration files to execute.
+    output_path : PathLike
+        Output path where the results will be stored.
+    options : ExecutorOptions
+        Options that control the execution of each experiment.
+    cost_model : CostModel, optional
+        If informed, the memory reserved for each experiment (with
+        `options.task_resources`) is the peak memory predicted by the model,
+        by default None
+    """
+    ray.init(args.address)
+    # Each dataset split is loaded once and shared through the object store,
+    # unless it is read from the node caches
+    measured_sizes = dict()
+    if options.node_cache_dir is None:
+        shared_refs = put_shared_datasets(
+            dataset_locations, execution_config_files, options, measured_sizes
+        )
+    else:
+        shared_refs = {e: dict() for e in execution_config_files}
+    remote_func = ray.remote(run_ray_wrapper)
+    task_func = ray.remote(run_ray_task)
+    node_limits = ray_node_limits() if options.task_resources else None
+
+    def _submit(i: int) -> ray.ObjectRef:
+        e = execution_config_files[i]
+        task_args = (dataset_locations, output_path, e, options, shared_refs[e])
+        if not options.task_resources:
+            return remote_func.remote(task_args)
+        # Reserve the resources estimated for the experiment
+        try:
+            config = from_dict(data_class=ExecutionConfig, data=load_yaml(e))
+            task_options = ray_task_options(
+                dataset_locations,
+                config,
+                options,
+                node_limits,
+                measured_sizes,
+                cost_model=cost_model,
+            )
+        except Exception:
+            # Error will be reported by the task running the experiment
+            task_options = dict()
+        logging.info(f"Resources of {Path(e).stem}: {task_options}")
+        return task_func.options(**task_options).remote(run_ray_wrapper, task_args)
+
+    # Keep about two tasks per CPU of the cluster submitted, by default
+    max_in_flight = args.max_in_flight or 2 * int(ray.cluster_resources().get("CPU", 1))
+    # Memory admission control. The memory used in this node is only watched
+    # if the cluster is local (started by this script)
+    admission = None
+    memory_estimates = None
+    if args.memory_budget is not None:
+        memory_estimates = estimate_memory(
+            dataset_locations,
+            execution_config_files,
+            options,
+            measured_sizes,
+            cost_model,
+        )
+        admission = AdmissionController(
+            args.memory_budget * 1024**2, live=args.address is None
+        )
+    return collect_ray_results(
+        _submit,
+        [Path(e).stem for e in execution_config_files],
+        max_in_flight=max_in_flight,
+        admission=admission,
+        memory_estimates=memory_estimates,
+    )
+
 
-        # Create a multi execution workflow
-        runner = MultiRunWorkflow(workflow=workflow, num_runs=estimator_cfg.num_runs)
-        with catchtime() as classification_time:
-            results["results"] = runner(train_dset, test_dset)
+def collect_ray_results(
+    submit: Callable[[int], ray.ObjectRef],
+    task_names: List[str],
+    max_in_flight: int = None,
+    desc: str = "Executing experiments",
+    admission: AdmissionController = None,
+    memory_estimates: List[int] = None,
+) -> list:
+    """Submit Ray tasks and collect their results as they finish (in any
+    order), updating a progress bar and logging the failed tasks as soon as
+    they finish. At most `max_in_flight` tasks are submitted (and not
+    collected) at the same time. New tasks are submitted as others finish
+    (and, with an admission controller, while their memory fits its budget).
 
-        results["classification_time"] = float(classification_time)
-        results["estimator"] = asdict(estimator_cfg)
-        all_results.append(results)
+    Parameters
+    ----------
+    submit : Callable[[int], ray.ObjectRef]
+        Function that submits the i-th task and returns its object reference.
+        It may also return the reference of an already submitted task.
+    task_names : List[str]
+        The names of the tasks (used in the log messages).
+    max_in_flight : int, optional
+        Maximum number of tasks in flight, by default None (no limit)
+    desc : str, optional
+        Description of the progress bar, by default "Executing experiments"
+    admission : AdmissionController, optional
+        Admission controller of the tasks (see `admission.py`), by default
+        None (tasks are submitted up to `max_in_flight`)
+    memory_estimates : List[int], optional
+        Peak memory of each task (required with `admission`), by default None
 
-    end_time = time.time()
-    additional_info["total_time"] = end_time - start_time
-    additional_info["start_time"] = start_time
-    additional_info["end_time"] = end_time
-    additional_info["system"] = get_sys_info()
+    Returns
+    -------
+    list
+        The results of the tasks, in the order of `task_names`. Results of
+        failed tasks (that raised an exception or returned None) are None.
+    """
+    num_tasks = len(task_names)
+    max_in_flight = max_in_flight or num_tasks
+    results = [None] * num_tasks
+    in_flight = dict()
+    next_task = 0
+    num_failed = 0
+
+    with tqdm.tqdm(total=num_tasks, desc=desc) as progress:
+        while next_task < num_tasks or in_flight:
+            # Submit tasks up to the limit
+            while next_task < num_tasks and len(in_flight) < max_in_flight:
+                if admission is not None:
+                    if not admission.can_admit(memory_estimates[next_task]):
+                        break
+                    admission.admit(next_task, memory_estimates[next_task])
+                in_flight[submit(next_task)] = next_task
+                next_task += 1
+            # Wait for (at least) one task to finish. With admission control,
+            # the memory usage is checked every second
+            ready, _ = ray.wait(
+                list(in_flight.keys()),
+                num_returns=1,
+                timeout=1 if admission is not None else None,
+            )
+            for ref in ready:
+                i = in_flight.pop(ref)
+                if admission is not None:
+                    admission.release(i)
+                try:
+                    results[i] = ray.get(ref)
+                except Exception:
+                    logging.exception(f"Error while running {task_names[i]}")
+                if results[i] is None:
+                    num_failed += 1
+                    logging.error(
+                        f"Experiment {task_names[i]} failed "
+                        f"({num_failed} failures so far)"
+                    )
+                progress.update(1)
+                progress.set_postfix(failed=num_failed)
+    return results
 
-    # ----------- 6. Save results ------------
-    values = {
-        "experiment": asdict(config_to_execute),
-        "report": all_results,
-        "additional": additional_info,
-    }
 
-    with experiment_output_file.open("w") as f:
-        yaml.dump(values, f, indent=4, sort_keys=True)
+def run_stage_wrapper(
+    stage: str,
+    config: ExecutionConfig,
+    parent: Optional[Tuple[Tuple[MultiModalDataset, ...], dict]],
+    dataset_locations: Dict[str, PathLike],
+    options: ExecutorOptions,
+) -> Tuple[Tuple[MultiModalDataset, ...], dict]:
+    """Run a preprocessing stage of an execution plan (see `planner.py`).
 
-    return results
+    Parameters
+    ----------
+    stage : str
+        The name of the stage (a key of `pipeline_stages`).
+    config : ExecutionConfig
+        A configuration of the experiments sharing the stage.
+    parent : Optional[Tuple[Tuple[MultiModalDataset, ...], dict]]
+        The output of the previous stage (None for the load stage).
+    dataset_locations: Dict[str, PathLike]
+        A dictionary with the dataset names and their locations.
+    options : ExecutorOptions
+        Options that control the execution of the stage.
+
+    Returns
+    -------
+    Tuple[Tuple[MultiModalDataset, ...], dict]
+        The datasets produced by the stage and the additional information
+        of this stage and the stages before it.
+    """
+    datasets, additional_info = parent if parent is not None else (None, dict())
+    additional_info = dict(additional_info)
+    with record_profile(
+        additional_info, options.profile, options.profile_allocations
+    ), span(stage):
+        datasets = pipeline_stages[stage](
+            dataset_locations, config, options, datasets, additional_info
+        )
+    return datasets, additional_info
 
 
-def run_wrapper(args) -> dict:
-    """Run a single experiment. This is the function that is parallelized, if needed.
-    It is a wrapper around run_experiment, that takes the arguments as a list.
+def run_planned_experiment(
+    experiment: PlannedExperiment,
+    parent: Tuple[Tuple[MultiModalDataset, ...], dict],
+    output_dir: PathLike,
+    options: ExecutorOptions,
+) -> dict:
+    """Run the estimators of an experiment of an execution plan, using the
+    output of its last preprocessing stage, and save the results.
 
     Parameters
     ----------
-    args : _type_
-        A list of arguments, in the following order:
-        - dataset_locations: Dict[str, PathLike] (locations of the datasets)
-        - output_dir: Path (the directory where the results will be stored)
-        - yaml_config_file: Path (the path to the yaml file containing the experiment configuration)
+    experiment : PlannedExperiment
+        The experiment to run.
+    parent : Tuple[Tuple[MultiModalDataset, ...], dict]
+        The output of the last preprocessing stage of the experiment.
+    output_dir : PathLike
+        The directory where the results will be stored.
+    options : ExecutorOptions
+        Options that control the execution of the estimators.
 
     Returns
     -------
     dict
-        A dict with the results of the experiment and additional information.
+        A dict with the results of the experiment, or None if it fails.
     """
-    # Unpack arguments
-    dataset_locations: Dict[str, PathLike] = args[0]
-    output_dir: Path = Path(args[1])
-    yaml_config_file: Path = Path(args[2])
-    experiment_id = yaml_config_file.stem
-    result = None
+    experiment_id = experiment.experiment_id or Path(experiment.config_file).stem
     try:
-        # Load config
-        config = from_dict(data_class=ExecutionConfig, data=load_yaml(yaml_config_file))
-        # Create output file
-        experiment_output_file = output_dir / f"{experiment_id}.yaml"
-        logging.info(
-            f"Starting execution {experiment_id}. Output at {experiment_output_file}"
+        datasets, additional_info = parent
+        additional_info = dict(additional_info)
+        additional_info["stage_keys"] = stage_keys(experiment.config, options)
+        # The time of the (possibly shared) preprocessing stages is accounted
+        # to every experiment that uses them
+        start_time = time.time() - sum(
+            additional_info[k]
+            for k in ["load_time", "transform_time", "reduce_time", "scaling_time"]
         )
-
-        # Run experiment
-        result = run_experiment(dataset_locations, experiment_output_file, config)
-    except Exception as e:
-        logging.exception(f"Error while running experiment: {yaml_config_file}")
-    finally:
-        return result
+        # Only the estimators are checkpointed (the stages are shared)
+        checkpoint = None
+        if options.checkpoint:
+            checkpoint = ExperimentCheckpoint(
+                Path(output_dir) / ".checkpoints",
+                experiment_id,
+                experiment.config,
+                extra={"fit_samples": options.fit_samples},
+            )
+        with record_profile(
+            additional_info, options.profile, options.profile_allocations
+        ), span("estimate"):
+            all_results = estimate_stage(
+                experiment.config, datasets, options, checkpoint
+            )
+        save_results(
+            Path(output_dir) / f"{experiment_id}.yaml",
+            experiment.config,
+            all_results,
+            additional_info,
+            start_time,
+            options,
+        )
+        if checkpoint is not None:
+            checkpoint.clear()
+        return all_results[-1]
+    except Exception:
+        logging.exception(f"Error while running experiment: {experiment.config_file}")
+        return None
 
 
-def run_single_thread(
+def run_plan_single_thread(
     args: Any,
     dataset_locations: Dict[str, PathLike],
-    execution_config_files: List[PathLike],
+    plan: List[PlanNode],
     output_path: PathLike,
+    options: ExecutorOptions,
 ):
-    """Runs the experiments sequentially, without parallelization.
+    """Runs an execution plan sequentially. The plan is traversed depth-first,
+    so only the outputs of the stages in the current path are kept in memory.
 
     Parameters
     ----------
@@ -729,25 +2863,59 @@ def run_single_thread(
         The arguments passed to the script
     dataset_locations: Dict[str, PathLike]
         A dictionary with the dataset names and their locations.
-    execution_config_files : List[PathLike]
-        List of configuration files to execute.
+    plan : List[PlanNode]
+        The root nodes of the execution plan (see `planner.build_plan`).
     output_path : PathLike
         Output path where the results will be stored.
+    options : ExecutorOptions
+        Options that control the execution of each stage.
     """
     results = []
-    for e in tqdm.tqdm(execution_config_files, desc="Executing experiments"):
-        r = run_wrapper((dataset_locations, output_path, e))
-        results.append(r)
+    progress = tqdm.tqdm(
+        total=sum(node.num_experiments for node in plan),
+        desc="Executing experiments",
+    )
+
+    def _run(node: PlanNode, parent):
+        try:
+            output = run_stage_wrapper(
+                node.stage, node.config, parent, dataset_locations, options
+            )
+        except Exception:
+            logging.exception(f"Error while running {node.stage} stage {node.key}")
+            results.extend([None] * node.num_experiments)
+            progress.update(node.num_experiments)
+            return
+        for child in node.children:
+            _run(child, output)
+        for experiment in node.experiments:
+            results.append(
+                run_planned_experiment(experiment, output, output_path, options)
+            )
+            progress.update(1)
+
+    for node in plan:
+        _run(node, None)
+    progress.close()
     return results
 
 
-def run_ray(
+def run_plan_ray(
     args: Any,
     dataset_locations: Dict[str, PathLike],
-    execution_config_files: List[PathLike],
+    plan: List[PlanNode],
     output_path: PathLike,
+    options: ExecutorOptions,
+    cost_model: CostModel = None,
 ):
-    """Runs the experiments in parallel, using Ray.
+    """Runs an execution plan in parallel, using Ray. Each stage is a task
+    that receives the output of the previous stage (through the object store).
+
+    Experiments are submitted as in `run_ray` (at most `args.max_in_flight`
+    at the same time and, with `args.memory_budget`, while their memory fits
+    the budget), each one along with the stages it uses that are not
+    submitted yet. The output of a stage is released when all experiments
+    using it are submitted (and finished).
 
     Parameters
     ----------
@@ -755,31 +2923,104 @@ def run_ray(
         The arguments passed to the script
     dataset_locations: Dict[str, PathLike]
         A dictionary with the dataset names and their locations.
-    execution_config_files : List[PathLike]
-        List of configuration files to execute.
+    plan : List[PlanNode]
+        The root nodes of the execution plan (see `planner.build_plan`).
     output_path : PathLike
         Output path where the results will be stored.
+    options : ExecutorOptions
+        Options that control the execution of each stage.
+    cost_model : CostModel, optional
+        If informed, the memory of the experiments (with `args.memory_budget`)
+        is predicted by the model, by default None
     """
     ray.init(args.address)
-    remote_func = ray.remote(run_wrapper)
-    futures = [
-        remote_func.remote((dataset_locations, output_path, e))
-        for e in execution_config_files
-    ]
-    ready, not_ready = ray.wait(futures, num_returns=len(futures))
-
-    
-    # pool = Pool()
-    # iterator = pool.imap(
-    #     run_wrapper,
-    #     [(dataset_locations, output_path, e) for e in execution_config_files],
-    # )
-    # results = list(
-    #     tqdm.tqdm(
-    #         iterator, total=len(execution_config_files), desc="Executing experiments"
-    #     )
-    # )
-    return ready
+    stage_func = ray.remote(run_stage_wrapper)
+    experiment_func = ray.remote(run_planned_experiment)
+    task_func = ray.remote(run_ray_task)
+    node_limits = ray_node_limits() if options.task_resources else None
+
+    # Experiments in depth-first order, with the stages they use
+    experiments = []
+
+    def _collect(node: PlanNode, path: List[PlanNode]):
+        path = path + [node]
+        for child in node.children:
+            _collect(child, path)
+        for experiment in node.experiments:
+            experiments.append((experiment, path))
+
+    for node in plan:
+        _collect(node, [])
+
+    # Submitted stages -> [object reference, experiments not submitted yet]
+    stages = dict()
+
+    def _submit_stage(node: PlanNode, parent_ref) -> ray.ObjectRef:
+        stage_args = (node.stage, node.config, parent_ref, dataset_locations, options)
+        if not options.task_resources:
+            return stage_func.remote(*stage_args)
+        # Reserve the resources estimated for the stage
+        task_options = ray_task_options(
+            dataset_locations, node.config, options, node_limits, stage=node.stage
+        )
+        return task_func.options(**task_options).remote(run_stage_wrapper, *stage_args)
+
+    def _submit(i: int) -> ray.ObjectRef:
+        experiment, path = experiments[i]
+        parent_ref = None
+        for node in path:
+            if node.key not in stages:
+                stages[node.key] = [
+                    _submit_stage(node, parent_ref),
+                    node.num_experiments,
+                ]
+            parent_ref = stages[node.key][0]
+            # The running tasks keep the output while they need it
+            stages[node.key][1] -= 1
+            if stages[node.key][1] == 0:
+                del stages[node.key]
+        experiment_args = (experiment, parent_ref, output_path, options)
+        if not options.task_resources:
+            return experiment_func.remote(*experiment_args)
+        task_options = ray_task_options(
+            dataset_locations,
+            experiment.config,
+            options,
+            node_limits,
+            stage="estimate",
+        )
+        return task_func.options(**task_options).remote(
+            run_planned_experiment, *experiment_args
+        )
+
+    # Keep about two tasks per CPU of the cluster submitted, by default
+    max_in_flight = args.max_in_flight or 2 * int(ray.cluster_resources().get("CPU", 1))
+    admission = None
+    memory_estimates = None
+    if args.memory_budget is not None:
+        memory_estimates = []
+        for experiment, _ in experiments:
+            try:
+                memory_estimates.append(
+                    config_memory(
+                        dataset_locations,
+                        experiment.config,
+                        options,
+                        cost_model=cost_model,
+                    )
+                )
+            except Exception:
+                memory_estimates.append(base_memory)
+        admission = AdmissionController(
+            args.memory_budget * 1024**2, live=args.address is None
+        )
+    return collect_ray_results(
+        _submit,
+        [e.experiment_id or Path(e.config_file).stem for e, _ in experiments],
+        max_in_flight=max_in_flight,
+        admission=admission,
+        memory_estimates=memory_estimates,
+    )
 
 
 if __name__ == "__main__":
@@ -850,12 +3091,59 @@ if __name__ == "__main__":
         required=False,
     )
 
+    parser.add_argument(
+        "--results-backend",
+        action="store",
+        default="yaml",
+        choices=results_backends,
+        help="Where the results are stored: a YAML file per experiment (yaml) "
+        + "or a single SQLite database, results.sqlite (sqlite), in the output path "
+        + "(not supported in clusters, with --address)",
+        type=str,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--export-yaml",
+        action="store_true",
+        help="Also save the results as YAML files, when using other results backend",
+    )
+
     parser.add_argument(
         "--skip-existing",
         action="store_true",
         help="Skip executions that were already run, that is, have something in the output path",
     )
 
+    parser.add_argument(
+        "--schedule",
+        action="store",
+        default="name",
+        choices=["name", "cost"],
+        help="Order in which the experiments are submitted: name (sorted file "
+        + "names) or cost (longest predicted time first, with the time and "
+        + "memory predicted from previous results, see scheduler.py)",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--history",
+        action="store",
+        default=None,
+        nargs="+",
+        help="Output directories (with the run name) of previous executions, "
+        + "whose results are used to learn the cost model. By default, the "
+        + "output directory of this execution",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the predicted time and memory of each experiment and the "
+        + "predicted makespan of each schedule, without running them",
+    )
+
     parser.add_argument(
         "--start",
         default=None,
@@ -872,6 +3160,212 @@ if __name__ == "__main__":
         required=False,
     )
 
+    parser.add_argument(
+        "--workers",
+        action="store",
+        default=None,
+        help="Run the experiments in a pool of this number of processes in "
+        + "this node, instead of Ray (ignored with --ray, not supported "
+        + "with --plan)",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        action="store",
+        default=None,
+        help="Replace each worker of the pool (--workers) by a new process after "
+        + "it runs this number of experiments (releasing leaked memory)",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--worker-memory",
+        action="store",
+        default=None,
+        help="Limit of the growth of the address space (in MB) of each "
+        + "worker of the pool (--workers), over the address space inherited "
+        + "from the main process. Experiments exceeding it fail with a "
+        + "MemoryError",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        action="store",
+        default=None,
+        help="Memory budget (in MB) of the experiments running at the same time "
+        + "(with --workers or --ray). New experiments start only while the "
+        + "projected memory usage (estimated peak memory of the running "
+        + "experiments, or the memory used in the node, if larger) fits in it",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--max-in-flight",
+        action="store",
+        default=None,
+        help="Maximum number of experiments submitted to Ray (and not finished) "
+        + "at the same time. Twice the number of CPUs of the cluster if nothing "
+        + "is informed",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Save checkpoints after the transform, reduce and scale stages and "
+        + "after each estimator (in <output_path>/<run_name>/.checkpoints), so "
+        + "interrupted experiments resume from their latest checkpoint",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the experiments: record the time, CPU time and memory of "
+        + "nested spans (stages, dataset loads, transforms, reducer windows, "
+        + "estimator runs, ...), stored in the results and exported as Chrome "
+        + "traces (<experiment_id>.trace.json)",
+    )
+
+    parser.add_argument(
+        "--profile-allocations",
+        action="store_true",
+        help="Also trace the memory allocated by Python in each span "
+        + "(tracemalloc, slow). Used only with --profile",
+    )
+
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Plan the execution of all experiments together, running the "
+        + "preprocessing stages (load, transform, reduce and scale) shared "
+        + "by several experiments only once",
+    )
+
+    parser.add_argument(
+        "--estimator-workers",
+        action="store",
+        default=1,
+        help="Number of processes used to execute the runs of each estimator "
+        + "in parallel (inside each experiment)",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--reducer-workers",
+        action="store",
+        default=1,
+        help="Number of processes used to fit the reducers of each window in "
+        + "parallel (when reduce_on is sensor or axis)",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        action="store",
+        default=None,
+        help="Directory to cache loaded datasets (as memory-mappable binary "
+        + "files), shared by all experiments. No cache is used if "
+        + "nothing is informed",
+        type=str,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        action="store",
+        default=16384,
+        help="Maximum size (in MB) of each on-disk cache of datasets (loaded "
+        + "and transformed) in --cache-dir. The least recently used datasets "
+        + "are evicted (e.g., the ones of changed CSV files). Use 0 for no limit",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--transform-cache-size",
+        action="store",
+        default=1024,
+        help="Maximum size (in MB) of the in-process cache of transformed "
+        + "datasets (used only with --cache-dir)",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--node-cache-dir",
+        action="store",
+        default=None,
+        help="Directory of a cache of the dataset splits local to each node "
+        + "(e.g., /dev/shm/experiment-executor). The first experiment of a node "
+        + "reads each split from the shared storage, and the next ones from it",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--node-cache-size",
+        action="store",
+        default=4096,
+        help="Maximum size (in MB) of the node cache of dataset splits. The "
+        + "least recently used splits are evicted",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--force-refit",
+        action="store_true",
+        help="Fit the reducers even if they were already fit by other "
+        + "experiments (used only with --cache-dir)",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        action="store",
+        default=None,
+        help="Streaming mode: process the datasets in chunks of this number "
+        + "of rows, written to memory-mapped spill files, to bound the "
+        + "memory used. Datasets are fully loaded in memory if nothing is informed",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--fit-samples",
+        action="store",
+        default=None,
+        help="Streaming mode: maximum number of rows (random subsample) used "
+        + "to fit the reducers and the scalers that can not be fit "
+        + "incrementally. All rows are used if nothing is informed",
+        type=int,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--task-resources",
+        action="store_true",
+        help="Reserve CPUs and memory for each Ray task, estimated from the "
+        + "configuration (n_jobs of reducers and estimators) and from the "
+        + "size of the datasets, and limit the threads of each task to its CPUs",
+    )
+
+    parser.add_argument(
+        "--max-task-cpus",
+        action="store",
+        default=None,
+        help="Maximum number of CPUs reserved for a Ray task (used only with "
+        + "--task-resources). The CPUs of the largest node if nothing is informed",
+        type=int,
+        required=False,
+    )
+
     parser.add_argument(
         "-v",
         "--verbose",
@@ -882,6 +3376,12 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
     print(args)
+    # The plan stages are not run by the process pool
+    if args.plan and args.workers is not None and not args.ray:
+        parser.error("--workers is not supported with --plan (use --ray)")
+    # SQLite locks are not reliable in network filesystems (cluster output)
+    if args.results_backend == "sqlite" and args.address is not None:
+        parser.error("--results-backend sqlite is not supported with --address")
 
     # ------ Enable logging ------
     log_level = logging.WARNING
@@ -917,29 +3417,138 @@ if __name__ == "__main__":
     execution_config_files = execution_config_files[exp_from:exp_to]
 
     # Skip existing?
+    executed_ids = set()
     if args.skip_existing:
-        # Calculate the difference between the execution configs and the output files (configs already executed)
+        # Calculate the difference between the execution configs and the results (configs already executed)
         # Note, here we assume that the execution id is the same as the output file name
-        to_keep_execution_ids = set(
-            [e.stem for e in execution_config_files]
-        ).difference(set([o.stem for o in output_path.glob("*.yaml")]))
+        # (or the point identifiers, for configs with hyperparameter search)
+        executed_ids = get_results_backend(
+            args.results_backend, output_path
+        ).executed_ids()
+
+        def _executed(config_file: Path) -> bool:
+            try:
+                return executed_ids.issuperset(experiment_ids(config_file))
+            except Exception:
+                # Invalid configs are kept (their errors are reported later)
+                return False
+
         # Filter execution configs
+        execution_config_files = [e for e in execution_config_files if not _executed(e)]
+    logging.info(f"There are {len(execution_config_files)} to execute!")
+
+    # ------ Executor options ------
+    options = ExecutorOptions(
+        cache_dir=args.cache_dir,
+        transform_cache_memory=args.transform_cache_size,
+        cache_size=args.cache_size or None,
+        force_refit=args.force_refit,
+        estimator_workers=args.estimator_workers,
+        reducer_workers=args.reducer_workers,
+        chunk_size=args.chunk_size,
+        fit_samples=args.fit_samples,
+        task_resources=args.task_resources,
+        max_task_cpus=args.max_task_cpus,
+        checkpoint=args.checkpoint,
+        results_backend=args.results_backend,
+        export_yaml=args.export_yaml,
+        profile=args.profile,
+        profile_allocations=args.profile_allocations,
+        skip_existing=args.skip_existing,
+        node_cache_dir=args.node_cache_dir,
+        node_cache_size=args.node_cache_size,
+    )
+
+    # ------ Cost model (order of the experiments) ------
+    cost_model = None
+    if args.schedule == "cost" or args.dry_run:
+        history = [Path(h) for h in args.history or [output_path]]
+        cost_model = CostModel(options).fit(
+            [get_results_backend(args.results_backend, h) for h in history],
+            lambda config: experiment_nbytes(dataset_locations, config, options),
+        )
+        logging.info(
+            f"Cost model learned from {cost_model.num_observations} stage timings"
+        )
+        # The nodes (and the CPUs of each experiment) are only required by the
+        # makespan simulation
+        nodes = [(args.workers or 1, None)]
+        if args.dry_run and args.ray:
+            ray.init(args.address)
+            max_cpus, _ = ray_node_limits()
+            if options.max_task_cpus is not None:
+                max_cpus = min(max_cpus, options.max_task_cpus)
+            cost_model.max_cpus = max_cpus if options.task_resources else 1
+            # Without reserved resources, each task uses one CPU and any memory
+            nodes = [
+                (
+                    int(node["Resources"].get("CPU", 1)),
+                    node["Resources"].get("memory") if options.task_resources else None,
+                )
+                for node in ray.nodes()
+                if node.get("Alive", True)
+            ]
+        estimates = predict_costs(
+            dataset_locations, execution_config_files, cost_model, options
+        )
+        if args.dry_run:
+            print_schedule_report(execution_config_files, estimates, nodes)
+            sys.exit(0)
         execution_config_files = [
-            e for e in execution_config_files if e.stem in to_keep_execution_ids
+            execution_config_files[i] for i in longest_first(estimates)
         ]
-    logging.info(f"There are {len(execution_config_files)} to execute!")
 
     # ------ Run experiments ------
     with catchtime() as total_time:
+        # Run planned
+        if args.plan:
+            plan, invalid_config_files = build_plan(
+                execution_config_files, skip_ids=executed_ids, options=options
+            )
+            for stage, count in plan_summary(plan).items():
+                logging.info(
+                    f"Stage {stage} will run {count['planned']} times "
+                    f"(instead of {count['unplanned']})"
+                )
+            if not args.ray:
+                logging.warning("Running in single mode! (slow)")
+                results = run_plan_single_thread(
+                    args, dataset_locations, plan, output_path, options
+                )
+            else:
+                results = run_plan_ray(
+                    args,
+                    dataset_locations,
+                    plan,
+                    output_path,
+                    options,
+                    cost_model=cost_model,
+                )
+            results += [None] * len(invalid_config_files)
         # Run single
-        if not args.ray:
+        elif not args.ray and args.workers is None:
             logging.warning("Running in single mode! (slow)")
             results = run_single_thread(
-                args, dataset_locations, execution_config_files, output_path
+                args, dataset_locations, execution_config_files, output_path, options
+            )
+        # Run in a local process pool
+        elif not args.ray:
+            results = run_pool(
+                args,
+                dataset_locations,
+                execution_config_files,
+                output_path,
+                options,
+                cost_model=cost_model,
             )
         else:
             results = run_ray(
-                args, dataset_locations, execution_config_files, output_path
+                args,
+                dataset_locations,
+                execution_config_files,
+                output_path,
+                options,
+                cost_model=cost_model,
             )
             # ray.shutdown()
 
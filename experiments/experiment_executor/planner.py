@@ -0,0 +1,257 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Planning of the execution of many experiments at once.
+
+Experiments run the same preprocessing stages (load, transform, reduce and
+scale, see `execute.pipeline_stages`) and usually many of them share the same
+prefix of stages, e.g. the same datasets, FFT and UMAP feeding different
+estimators. The planner reads all the configurations and builds a tree
+(a DAG where each stage has a single input) of stages keyed by their inputs,
+that is, by the part of the configuration each stage (and the stages before
+it) depend on. Each node is executed only once and its output is fed to all
+of its children. The leaves are the experiments, which run their estimators
+and save the results.
+"""
+
+# Python imports
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Third-party imports
+from dacite import from_dict
+from dict_hash import sha256
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+
+from config import ExecutionConfig, ExecutorOptions, config_version
+from search import expand_search, point_id
+from utils import load_yaml
+
+# Name of the stages, in the order they are executed
+stage_names = ["load", "transform", "reduce", "scale"]
+
+
+@dataclass
+class PlannedExperiment:
+    # The experiment configuration file and its loaded configuration
+    config_file: PathLike
+    config: ExecutionConfig
+    # Identifier of the results (the file name without extension, or the
+    # identifier of the point, for the points of a search)
+    experiment_id: Optional[str] = None
+
+
+@dataclass
+class PlanNode:
+    # Name of the stage (one of `stage_names`)
+    stage: str
+    # Key of the stage (hash of its inputs and the inputs of the stages before)
+    key: str
+    # Configuration used to execute the stage (any of the experiments sharing
+    # this node can be used, as they have the same stage inputs)
+    config: ExecutionConfig
+    # Stages that use the output of this stage
+    children: List["PlanNode"] = field(default_factory=list)
+    # Experiments that use the output of this stage (only for the last stage)
+    experiments: List[PlannedExperiment] = field(default_factory=list)
+
+    @property
+    def num_experiments(self) -> int:
+        return len(self.experiments) + sum(c.num_experiments for c in self.children)
+
+
+def stage_inputs(
+    config: ExecutionConfig, options: ExecutorOptions = None
+) -> Dict[str, dict]:
+    """The part of an experiment configuration that each stage depends on.
+
+    Parameters
+    ----------
+    config : ExecutionConfig
+        The experiment configuration.
+    options : ExecutorOptions, optional
+        The executor options. In streaming mode (`chunk_size`), the reducers
+        are fitted on `fit_samples` samples, which is part of the reduce
+        stage inputs, by default None
+
+    Returns
+    -------
+    Dict[str, dict]
+        A dictionary with the stage name as key and its inputs as value.
+    """
+    # The reducer is only applied when there is a reducer dataset, and the
+    # scale_on option is only used when there is a scaler
+    reducer = None
+    if config.reducer is not None and config.reducer_dataset:
+        reducer = {
+            "reducer": asdict(config.reducer),
+            "reduce_on": config.extra.reduce_on,
+        }
+        if options is not None and options.chunk_size is not None:
+            reducer["fit_samples"] = options.fit_samples
+    scaler = None
+    if config.scaler is not None:
+        scaler = {
+            "scaler": asdict(config.scaler),
+            "scale_on": config.extra.scale_on,
+        }
+    return {
+        "load": {
+            "train_dataset": list(config.train_dataset),
+            "test_dataset": list(config.test_dataset),
+            "reducer_dataset": list(config.reducer_dataset or []),
+            "in_use_features": list(config.extra.in_use_features),
+            "dtype": config.extra.dtype,
+        },
+        "transform": {
+            "transforms": [asdict(t) for t in (config.transforms or [])],
+        },
+        "reduce": {"reducer": reducer},
+        "scale": {"scaler": scaler},
+    }
+
+
+def stage_keys(
+    config: ExecutionConfig, options: ExecutorOptions = None
+) -> Dict[str, str]:
+    """The key of each stage of an experiment. The key of a stage is the hash
+    of its inputs and the inputs of all stages before it. Thus, experiments
+    with the same key for a stage have the same output for that stage.
+
+    Parameters
+    ----------
+    config : ExecutionConfig
+        The experiment configuration.
+    options : ExecutorOptions, optional
+        The executor options (see `stage_inputs`), by default None
+
+    Returns
+    -------
+    Dict[str, str]
+        A dictionary with the stage name as key and the stage key as value.
+    """
+    inputs = stage_inputs(config, options)
+    keys = dict()
+    prefix = []
+    for stage in stage_names:
+        prefix.append(inputs[stage])
+        keys[stage] = sha256({"stages": prefix})
+    return keys
+
+
+def build_plan(
+    execution_config_files: List[PathLike],
+    skip_ids: Set[str] = None,
+    options: ExecutorOptions = None,
+) -> Tuple[List[PlanNode], List[PathLike]]:
+    """Build the execution plan of a list of experiment configuration files.
+    The points of hyperparameter searches (see search.py) are planned as
+    experiments, so they share their common stages.
+
+    Parameters
+    ----------
+    execution_config_files : List[PathLike]
+        List of configuration files to plan.
+    skip_ids : Set[str], optional
+        Identifiers of experiments (or search points) that are not planned
+        (e.g., already executed), by default None
+    options : ExecutorOptions, optional
+        The executor options, used to key the stages (see `stage_inputs`),
+        by default None
+
+    Returns
+    -------
+    Tuple[List[PlanNode], List[PathLike]]
+        The root nodes of the plan (load stages) and the list of configuration
+        files that could not be loaded (these are not planned).
+    """
+    roots = []
+    invalid = []
+    nodes = dict()
+    for config_file in execution_config_files:
+        try:
+            config = from_dict(data_class=ExecutionConfig, data=load_yaml(config_file))
+            if config.version != config_version:
+                raise ValueError(
+                    f"Config version ({config.version}) "
+                    f"does not match the current version ({config_version})"
+                )
+            experiment_id = Path(config_file).stem
+            experiments = [(experiment_id, config)]
+            if config.search is not None:
+                experiments = [
+                    (point_id(experiment_id, i), point_config)
+                    for i, (_, point_config) in enumerate(expand_search(config))
+                ]
+            experiments = [
+                (experiment_id, config, stage_keys(config, options))
+                for experiment_id, config in experiments
+                if experiment_id not in (skip_ids or set())
+            ]
+        except Exception:
+            logging.exception(f"Error while planning experiment: {config_file}")
+            invalid.append(config_file)
+            continue
+
+        for experiment_id, config, keys in experiments:
+            parent: Optional[PlanNode] = None
+            for stage in stage_names:
+                node = nodes.get(keys[stage])
+                if node is None:
+                    node = PlanNode(stage=stage, key=keys[stage], config=config)
+                    nodes[keys[stage]] = node
+                    if parent is None:
+                        roots.append(node)
+                    else:
+                        parent.children.append(node)
+                parent = node
+            parent.experiments.append(
+                PlannedExperiment(config_file, config, experiment_id)
+            )
+
+    return roots, invalid
+
+
+def plan_summary(roots: List[PlanNode]) -> Dict[str, Dict[str, int]]:
+    """Number of times each stage is executed with the plan and without it
+    (i.e., once for each experiment).
+
+    Parameters
+    ----------
+    roots : List[PlanNode]
+        The root nodes of the plan.
+
+    Returns
+    -------
+    Dict[str, Dict[str, int]]
+        A dictionary with the stage name as key and, as value, a dictionary
+        with the number of executions "planned" and "unplanned".
+    """
+    summary = {s: {"planned": 0, "unplanned": 0} for s in stage_names}
+    to_visit = list(roots)
+    while to_visit:
+        node = to_visit.pop()
+        summary[node.stage]["planned"] += 1
+        summary[node.stage]["unplanned"] += node.num_experiments
+        to_visit.extend(node.children)
+    return summary
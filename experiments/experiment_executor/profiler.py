@@ -0,0 +1,396 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Hierarchical profiler of the experiments.
+
+The profiler records nested spans (e.g., a stage, the load of a dataset, the
+fit of a reducer of a window, each run of an estimator and its fit and
+predict). Each span has its wall time, CPU time (of all threads of the
+process), resident memory (RSS) at the start, at the end and its peak
+(sampled by a background thread) and, optionally, the memory allocated by
+Python (tracemalloc), which has a significant overhead.
+
+The code being profiled opens spans with `span(name)`, which does nothing if
+there is no active profiler (see `Profiler.activate`). Spans opened in the
+worker processes of `utils.process_map` (e.g., by the reducer or estimator
+workers) are recorded by a profiler of the worker and added to the profiler
+that started the workers (see `Profiler.add_spans`), nested in its open span.
+
+The spans are stored as a list of dictionaries (see `Profiler.spans`) and may
+be exported as a Chrome trace (see `chrome_trace`), which can be opened in
+`chrome://tracing` or https://ui.perfetto.dev.
+"""
+
+# Python imports
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, List, Optional
+
+# Third-party imports
+import psutil
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+
+
+class Profiler:
+    """Records nested spans.
+
+    Parameters
+    ----------
+    trace_allocations : bool, optional
+        Trace the memory allocated by Python in each span (using tracemalloc),
+        by default False
+    sample_interval : float, optional
+        Interval (in seconds) between samples of the RSS, used to compute
+        the peak RSS of each span, by default 0.01
+    """
+
+    def __init__(self, trace_allocations: bool = False, sample_interval: float = 0.01):
+        self.trace_allocations = trace_allocations
+        self.sample_interval = sample_interval
+        self._pid = os.getpid()
+        self._process = psutil.Process(self._pid)
+        self._spans = []
+        self._stack = []
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop_sampler = threading.Event()
+
+    def _rss(self) -> int:
+        return self._process.memory_info().rss
+
+    def _sample(self):
+        # Update the peak RSS of the open spans
+        while not self._stop_sampler.wait(self.sample_interval):
+            rss = self._rss()
+            with self._lock:
+                for open_span in self._stack:
+                    open_span["peak_rss"] = max(open_span["peak_rss"], rss)
+
+    @contextmanager
+    def activate(self):
+        """Make this profiler the active one (used by `span`) in the context."""
+        global _active_profiler
+        previous = _active_profiler
+        _active_profiler = self
+        started_tracemalloc = False
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracemalloc = True
+        self._stop_sampler.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        try:
+            yield self
+        finally:
+            self._stop_sampler.set()
+            self._sampler.join()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            _active_profiler = previous
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Record a span, nested in the currently open span (if any).
+
+        Parameters
+        ----------
+        name : str
+            The name of the span.
+        **attributes
+            Extra information stored with the span (must be serializable).
+        """
+        rss = self._rss()
+        new_span = {
+            "id": len(self._spans),
+            "parent": self._stack[-1]["id"] if self._stack else None,
+            "name": name,
+            "start": time.time(),
+            "duration": None,
+            "cpu_time": None,
+            "rss_start": rss,
+            "rss_end": None,
+            "peak_rss": rss,
+        }
+        if attributes:
+            new_span["attributes"] = attributes
+        tracing = self.trace_allocations and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak of the parent span, up to now, is kept before resetting
+            if self._stack:
+                parent = self._stack[-1]
+                parent["_alloc_peak"] = max(parent["_alloc_peak"], peak)
+            tracemalloc.reset_peak()
+            new_span["_alloc_start"] = current
+            new_span["_alloc_peak"] = current
+
+        with self._lock:
+            self._spans.append(new_span)
+            self._stack.append(new_span)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield new_span
+        finally:
+            new_span["duration"] = time.perf_counter() - start_wall
+            new_span["cpu_time"] = time.process_time() - start_cpu
+            rss = self._rss()
+            with self._lock:
+                self._stack.pop()
+                new_span["rss_end"] = rss
+                new_span["peak_rss"] = max(new_span["peak_rss"], rss)
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent["peak_rss"] = max(parent["peak_rss"], new_span["peak_rss"])
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                alloc_start = new_span.pop("_alloc_start")
+                alloc_peak = max(new_span.pop("_alloc_peak"), peak)
+                new_span["alloc_delta"] = current - alloc_start
+                new_span["alloc_peak"] = alloc_peak - alloc_start
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent["_alloc_peak"] = max(parent["_alloc_peak"], alloc_peak)
+                tracemalloc.reset_peak()
+
+    def add_spans(self, spans: List[dict]):
+        """Add the spans recorded by other profiler (e.g., of a worker
+        process), nested in the currently open span. Their RSS is the RSS of
+        the other process.
+
+        Parameters
+        ----------
+        spans : List[dict]
+            The spans (see `spans`).
+        """
+        with self._lock:
+            offset = len(self._spans)
+            parent = self._stack[-1]["id"] if self._stack else None
+            for s in spans:
+                s = dict(s)
+                s["id"] += offset
+                s["parent"] = parent if s["parent"] is None else s["parent"] + offset
+                self._spans.append(s)
+
+    @property
+    def spans(self) -> List[dict]:
+        """The recorded spans, in the order they were opened. Each span has
+        an `id` and the `id` of its `parent` (None for top-level spans), its
+        `start` (timestamp, in seconds since the epoch), `duration` and
+        `cpu_time` (seconds), `rss_start`, `rss_end` and `peak_rss` (bytes)
+        and, if tracing allocations, `alloc_delta` (bytes allocated and not
+        freed) and `alloc_peak` (peak of bytes allocated, relative to the
+        start)."""
+        return [
+            {k: v for k, v in s.items() if not k.startswith("_")} for s in self._spans
+        ]
+
+
+# Profiler used by `span` (None if there is no active profiler)
+_active_profiler: Optional[Profiler] = None
+
+
+def active_profiler() -> Optional[Profiler]:
+    """The active profiler of this process, or None if there is none."""
+    # Forked processes inherit the active profiler, but not its sampler
+    # thread (and its lock may be held)
+    if _active_profiler is None or _active_profiler._pid != os.getpid():
+        return None
+    return _active_profiler
+
+
+def span(name: str, **attributes):
+    """Context manager that records a span in the active profiler (see
+    `Profiler.span`). It does nothing if there is no active profiler."""
+    profiler = active_profiler()
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(name, **attributes)
+
+
+@contextmanager
+def record_profile(
+    additional_info: dict, enabled: bool = True, trace_allocations: bool = False
+):
+    """Context manager that profiles the code in the context with a new
+    profiler, appending its spans to the "profile" key of `additional_info`.
+
+    Parameters
+    ----------
+    additional_info : dict
+        The additional information of an experiment.
+    enabled : bool, optional
+        If False, nothing is profiled, by default True
+    trace_allocations : bool, optional
+        Trace the memory allocated by Python, by default False
+    """
+    if not enabled:
+        yield
+        return
+    profiler = Profiler(trace_allocations=trace_allocations)
+    try:
+        with profiler.activate():
+            yield
+    finally:
+        additional_info["profile"] = append_spans(
+            additional_info.get("profile", []), profiler.spans
+        )
+
+
+def append_spans(spans: List[dict], new_spans: List[dict]) -> List[dict]:
+    """Append the spans of other profiler to a list of spans, renumbering
+    their ids (and the ids of their parents) to keep them unique.
+
+    Parameters
+    ----------
+    spans : List[dict]
+        The spans.
+    new_spans : List[dict]
+        The spans to append.
+
+    Returns
+    -------
+    List[dict]
+        A new list with all spans.
+    """
+    offset = len(spans)
+    renumbered = []
+    for s in new_spans:
+        s = dict(s)
+        s["id"] += offset
+        if s["parent"] is not None:
+            s["parent"] += offset
+        renumbered.append(s)
+    return list(spans) + renumbered
+
+
+class ProfiledEstimator:
+    """Estimator wrapper that records a span for each call of `fit` and
+    `predict`. The other methods and attributes are delegated to the wrapped
+    estimator.
+
+    Parameters
+    ----------
+    estimator : Any
+        The estimator (scikit-learn compatible).
+    """
+
+    def __init__(self, estimator: Any):
+        self.estimator = estimator
+
+    def fit(self, X, y=None, **kwargs):
+        with span("fit", samples=len(X)):
+            self.estimator.fit(X, y, **kwargs)
+        return self
+
+    def predict(self, X):
+        with span("predict", samples=len(X)):
+            return self.estimator.predict(X)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found in the wrapper
+        if name == "estimator":
+            raise AttributeError(name)
+        return getattr(self.estimator, name)
+
+
+def profiled_estimator(estimator_cls: Any, **kwargs) -> ProfiledEstimator:
+    """Instantiate an estimator, with the `kwargs`, wrapped in a
+    `ProfiledEstimator`. Use with `functools.partial` in workflows that
+    instantiate the estimators."""
+    return ProfiledEstimator(estimator_cls(**kwargs))
+
+
+class ProfiledWorkflow:
+    """Workflow wrapper that records a span for each call (e.g., each run of
+    a `MultiRunWorkflow`).
+
+    Parameters
+    ----------
+    workflow : Any
+        The workflow.
+    name : str, optional
+        Name of the spans, by default "run"
+    """
+
+    def __init__(self, workflow: Any, name: str = "run"):
+        self.workflow = workflow
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        with span(self.name):
+            return self.workflow(*args, **kwargs)
+
+
+def chrome_trace(spans: List[dict], process_name: str = "experiment") -> dict:
+    """Convert spans (see `Profiler.spans`) to the Chrome trace event format.
+
+    Parameters
+    ----------
+    spans : List[dict]
+        The spans.
+    process_name : str, optional
+        Name of the process shown in the trace, by default "experiment"
+
+    Returns
+    -------
+    dict
+        The trace, to be saved as JSON.
+    """
+    events = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": 0,
+            "tid": 0,
+            "args": {"name": process_name},
+        }
+    ]
+    for s in spans:
+        args = {
+            k: v
+            for k, v in s.items()
+            if k not in ["id", "parent", "name", "start", "duration"]
+        }
+        events.append(
+            {
+                "name": s["name"],
+                "ph": "X",
+                "ts": s["start"] * 1e6,
+                "dur": (s["duration"] or 0.0) * 1e6,
+                "pid": 0,
+                "tid": 0,
+                "args": args,
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def save_chrome_trace(
+    path: PathLike, spans: List[dict], process_name: str = "experiment"
+):
+    """Save spans (see `Profiler.spans`) as a Chrome trace JSON file."""
+    with open(path, "w") as f:
+        json.dump(chrome_trace(spans, process_name), f)
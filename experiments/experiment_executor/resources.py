@@ -0,0 +1,292 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Resource requirements of the experiments, used to schedule Ray tasks.
+
+The number of CPUs of an experiment is derived from its configuration (the
+`n_jobs` of the reducer and of the estimators, and the number of worker
+processes of the executor). The memory is estimated from the size of the
+datasets it uses, measured when they were previously loaded (see
+`DatasetSizes`) or, if they were never loaded, from the size of their CSV
+files. Inside the tasks, the thread pools (BLAS/OpenMP, numba and joblib) are
+limited to the CPUs reserved for the task (see `limit_threads`).
+"""
+
+# Python imports
+import logging
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+import ray
+import yaml
+from dict_hash import sha256
+from threadpoolctl import threadpool_limits
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+
+from config import ExecutionConfig, ExecutorOptions
+
+# Memory used by a task before loading any data (interpreter and libraries)
+base_memory: int = 512 * 1024**2
+# Approximated ratio between the size of the loaded data and the size of the
+# CSV file, used when the dataset was never loaded
+csv_size_ratio: float = 0.5
+# Reducers whose `n_jobs` defaults to all CPUs (when `n_jobs` is not informed)
+parallel_by_default = ["umap"]
+
+
+@dataclass
+class TaskResources:
+    num_cpus: int = 1
+    memory: int = base_memory  # bytes
+
+
+class DatasetSizes:
+    """Sizes of the dataset splits loaded by the experiments. Each entry is a
+    small YAML file (with the number of bytes and rows of the loaded split),
+    named after the hash of the `dataset_view_key` of the split.
+
+    Parameters
+    ----------
+    root_dir : PathLike
+        Directory where the entries are stored.
+    """
+
+    def __init__(self, root_dir: PathLike):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, view_key: str) -> Path:
+        return self.root_dir / f"{sha256({'view': view_key})}.yaml"
+
+    def get(self, view_key: str) -> Optional[dict]:
+        path = self._path(view_key)
+        if not path.exists():
+            return None
+        try:
+            with path.open("r") as f:
+                return yaml.load(f, Loader=yaml.CLoader)
+        except Exception:
+            logging.exception(f"Invalid dataset size entry {path}. Ignoring it")
+            return None
+
+    def put(self, view_key: str, nbytes: int, rows: int):
+        entry = {"view": view_key, "nbytes": int(nbytes), "rows": int(rows)}
+        if self.get(view_key) == entry:
+            return
+        path = self._path(view_key)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}")
+        with tmp_path.open("w") as f:
+            yaml.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+def resolve_n_jobs(n_jobs: Optional[int], max_cpus: int) -> int:
+    """Number of CPUs used by a `n_jobs` parameter (joblib convention: None
+    is 1, -1 is all CPUs, -2 is all CPUs but one, ...), capped to `max_cpus`."""
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(max_cpus + 1 + n_jobs, 1)
+    return min(n_jobs, max_cpus)
+
+
+def reducer_cpus(config: ExecutionConfig, max_cpus: int) -> int:
+    """Number of CPUs used to fit the reducer of an experiment."""
+    if config.reducer is None:
+        return 1
+    kwargs = config.reducer.kwargs or {}
+    if "n_jobs" in kwargs:
+        return resolve_n_jobs(kwargs["n_jobs"], max_cpus)
+    # UMAP runs single-threaded when a random state is set
+    if config.reducer.algorithm in parallel_by_default and "random_state" not in kwargs:
+        return max_cpus
+    return 1
+
+
+def estimator_cpus(config: ExecutionConfig, max_cpus: int) -> int:
+    """Number of CPUs used by the most parallel estimator of an experiment."""
+    return max(
+        [
+            resolve_n_jobs((estimator.kwargs or {}).get("n_jobs"), max_cpus)
+            for estimator in config.estimators
+        ]
+        + [1]
+    )
+
+
+def view_nbytes(
+    dataset_locations: Dict[str, PathLike],
+    dataset: str,
+    view_key: str,
+    measured: Dict[str, int] = None,
+    dataset_sizes: DatasetSizes = None,
+) -> int:
+    """Size, in bytes, of a loaded dataset split ("dataset_name.dataset_view[split]").
+    The size measured on a load of this execution (`measured`, indexed by
+    `view_key`) or of a previous one (`dataset_sizes`) is used, if any.
+    Otherwise, it is estimated from the size of the CSV file (or 0 if it can
+    not be read)."""
+    if measured is not None and view_key in measured:
+        return measured[view_key]
+    if dataset_sizes is not None:
+        entry = dataset_sizes.get(view_key)
+        if entry is not None:
+            return entry["nbytes"]
+    name = dataset.split("[")[0]
+    split = dataset.split("[")[1].split("]")[0]
+    try:
+        csv_size = (Path(dataset_locations[name]) / f"{split}.csv").stat().st_size
+    except (KeyError, OSError):
+        return 0
+    return int(csv_size * csv_size_ratio)
+
+
+def estimate_resources(
+    config: ExecutionConfig,
+    dataset_nbytes: Dict[str, int],
+    options: ExecutorOptions,
+    max_cpus: int,
+    max_memory: Optional[int] = None,
+    stage: Optional[str] = None,
+) -> TaskResources:
+    """Estimate the resources required to run an experiment (or one of its
+    stages, in planned execution).
+
+    The memory is the base memory plus the size of the datasets times the
+    number of copies alive at the same time: the loaded splits and their
+    concatenation, and the output of each transform (with the reducer and
+    scaler outputs, usually smaller, accounted as one copy). The copies after
+    the loaded splits are scaled by the size of `extra.dtype` (the sizes of
+    the splits are of float64 samples). With a smaller data type, one float64
+    copy is added for the output of a transform before it is cast (e.g., of a
+    float64 FFT). In streaming mode, the datasets are memory-mapped and only
+    one copy is accounted.
+
+    Parameters
+    ----------
+    config : ExecutionConfig
+        The configuration of the experiment.
+    dataset_nbytes : Dict[str, int]
+        The size, in bytes, of each dataset split (see `view_nbytes`), indexed
+        by the dataset string ("dataset_name.dataset_view[split]").
+    options : ExecutorOptions
+        The executor options (the number of workers of the experiment and the
+        streaming mode are considered).
+    max_cpus : int
+        Maximum number of CPUs of a task (e.g., the CPUs of the largest node).
+    max_memory : Optional[int], optional
+        Maximum memory of a task, in bytes, by default None (no limit)
+    stage : Optional[str], optional
+        The stage of a planned execution ("load", "transform", "reduce",
+        "scale" or "estimate"), by default None (the whole experiment)
+
+    Returns
+    -------
+    TaskResources
+        The CPUs and memory required.
+    """
+    datasets = (
+        config.train_dataset + config.test_dataset + (config.reducer_dataset or [])
+    )
+    data_bytes = sum(dataset_nbytes.get(dset, 0) for dset in datasets)
+    if options.chunk_size is not None:
+        copies = 1
+    else:
+        itemsize = np.dtype(config.extra.dtype or "float64").itemsize
+        copies = 1 + (1 + len(config.transforms or []) + 1) * itemsize / 8
+        # The transforms may upcast, each output is cast after the transform
+        if config.transforms and itemsize < 8:
+            copies += 1
+    memory = base_memory + copies * data_bytes
+    if max_memory is not None:
+        memory = min(memory, max_memory)
+
+    reduce_cpus = min(
+        reducer_cpus(config, max_cpus) * options.reducer_workers, max_cpus
+    )
+    estimate_cpus = min(
+        estimator_cpus(config, max_cpus) * options.estimator_workers, max_cpus
+    )
+    if stage is None:
+        num_cpus = max(reduce_cpus, estimate_cpus)
+    elif stage == "reduce":
+        num_cpus = reduce_cpus
+    elif stage == "estimate":
+        num_cpus = estimate_cpus
+    else:
+        num_cpus = 1
+    return TaskResources(num_cpus=num_cpus, memory=int(memory))
+
+
+@contextmanager
+def limit_threads(num_cpus: int):
+    """Context manager that limits the threads used by the libraries to
+    `num_cpus`: BLAS/OpenMP thread pools (threadpoolctl), numba (used by UMAP)
+    and joblib (the CPUs considered by `n_jobs=-1`).
+
+    Parameters
+    ----------
+    num_cpus : int
+        Maximum number of threads.
+    """
+    num_cpus = max(int(num_cpus), 1)
+    previous_loky = os.environ.get("LOKY_MAX_CPU_COUNT")
+    os.environ["LOKY_MAX_CPU_COUNT"] = str(num_cpus)
+    previous_numba = None
+    try:
+        import numba
+
+        previous_numba = numba.get_num_threads()
+        numba.set_num_threads(min(num_cpus, numba.config.NUMBA_NUM_THREADS))
+    except ImportError:
+        pass
+    try:
+        with threadpool_limits(limits=num_cpus):
+            yield
+    finally:
+        if previous_loky is None:
+            os.environ.pop("LOKY_MAX_CPU_COUNT", None)
+        else:
+            os.environ["LOKY_MAX_CPU_COUNT"] = previous_loky
+        if previous_numba is not None:
+            numba.set_num_threads(previous_numba)
+
+
+def ray_node_limits() -> Tuple[int, Optional[int]]:
+    """The number of CPUs and the memory (in bytes) of the largest alive node
+    of the Ray cluster. Tasks requiring more than them would never be
+    scheduled."""
+    nodes = [node["Resources"] for node in ray.nodes() if node.get("Alive", True)]
+    max_cpus = int(max([node.get("CPU", 1) for node in nodes] + [1]))
+    memories = [node["memory"] for node in nodes if "memory" in node]
+    max_memory = int(max(memories)) if memories else None
+    return max_cpus, max_memory
+
+
+def ray_assigned_cpus() -> int:
+    """Number of CPUs assigned to the current Ray task."""
+    resources = ray.get_runtime_context().get_assigned_resources()
+    return max(int(resources.get("CPU", 1)), 1)
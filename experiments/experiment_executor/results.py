@@ -0,0 +1,281 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Backends where the results of the experiments are stored.
+
+- `YAMLResults`: one YAML file per experiment (`<output_dir>/<experiment_id>.yaml`).
+- `SQLiteResults`: a single SQLite database (`<output_dir>/results.sqlite`), with
+    one row per experiment (the configuration, report and additional
+    information, as JSON) and one row per scalar metric of each run of each
+    estimator (`metrics` table), that can be aggregated with SQL. Executed
+    experiments are indexed by their identifier, so checking which experiments
+    were already executed does not read the results.
+
+The results of a SQLite database may be exported to YAML files (the same
+format of `YAMLResults`) with:
+
+    python results.py <output_dir>/results.sqlite <yaml_output_dir>
+"""
+
+# Python imports
+import argparse
+import json
+import numbers
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterator, Optional, Set, Tuple
+
+# Third-party imports
+import numpy as np
+import yaml
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+
+
+class ResultsBackend:
+    """Interface of the results backends."""
+
+    def save(self, experiment_id: str, values: dict):
+        """Save the results of an experiment (replacing previous results).
+
+        Parameters
+        ----------
+        experiment_id : str
+            The experiment identifier (name of the configuration file).
+        values : dict
+            The results, with the "experiment" (configuration), "report"
+            (results of each estimator) and "additional" keys.
+        """
+        raise NotImplementedError
+
+    def executed_ids(self) -> Set[str]:
+        """Identifiers of the experiments with saved results."""
+        raise NotImplementedError
+
+    def load(self, experiment_id: str) -> Optional[dict]:
+        """The results of an experiment (in the format given to `save`), or
+        None if there are no results."""
+        raise NotImplementedError
+
+
+class YAMLResults(ResultsBackend):
+    """Results saved as YAML files, one per experiment.
+
+    Parameters
+    ----------
+    output_dir : PathLike
+        Directory where the files are saved.
+    """
+
+    def __init__(self, output_dir: PathLike):
+        self.output_dir = Path(output_dir)
+
+    def save(self, experiment_id: str, values: dict):
+        with (self.output_dir / f"{experiment_id}.yaml").open("w") as f:
+            yaml.dump(values, f, indent=4, sort_keys=True)
+
+    def executed_ids(self) -> Set[str]:
+        return set(o.stem for o in self.output_dir.glob("*.yaml"))
+
+    def load(self, experiment_id: str) -> Optional[dict]:
+        path = self.output_dir / f"{experiment_id}.yaml"
+        if not path.exists():
+            return None
+        with path.open("r") as f:
+            return yaml.load(f, Loader=yaml.CLoader)
+
+
+def _to_json(value: Any) -> Any:
+    """Convert numpy values (not serializable by `json`) to python values."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class SQLiteResults(ResultsBackend):
+    """Results saved in a SQLite database. Several processes of the same node
+    may write to the same database (each write locks it). The database must
+    not be in a network filesystem (e.g., the output of a cluster), where the
+    locks of SQLite are not reliable and the database may be corrupted.
+
+    Parameters
+    ----------
+    path : PathLike
+        Path of the database file. It is created if it does not exist.
+    timeout : float, optional
+        Time (in seconds) to wait for the lock of the database, by default 60
+    """
+
+    schema = [
+        """CREATE TABLE IF NOT EXISTS experiments (
+            experiment_id TEXT PRIMARY KEY,
+            start_time REAL,
+            end_time REAL,
+            total_time REAL,
+            experiment TEXT,
+            report TEXT,
+            additional TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS metrics (
+            experiment_id TEXT,
+            estimator_index INTEGER,
+            estimator TEXT,
+            run_id INTEGER,
+            metric TEXT,
+            value REAL
+        )""",
+        """CREATE INDEX IF NOT EXISTS metrics_experiment_id
+            ON metrics (experiment_id)""",
+    ]
+
+    def __init__(self, path: PathLike, timeout: float = 60.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        with self._connect() as connection:
+            for statement in self.schema:
+                connection.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    @staticmethod
+    def _metric_rows(experiment_id: str, report: list) -> Iterator[Tuple]:
+        """Rows of the `metrics` table: the scalar values of the result of
+        each run of each estimator, and the time taken by the run."""
+        for i, estimator_results in enumerate(report):
+            name = estimator_results.get("estimator", {}).get("name")
+            runs = estimator_results.get("results", {}).get("runs", [])
+            for run in runs:
+                values = dict(run.get("result") or {})
+                values["time taken"] = run.get("time taken")
+                for metric, value in values.items():
+                    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+                        yield (
+                            experiment_id,
+                            i,
+                            name,
+                            run.get("run id"),
+                            metric,
+                            float(value),
+                        )
+
+    def save(self, experiment_id: str, values: dict):
+        additional = values.get("additional", {})
+        report = values.get("report", [])
+        connection = self._connect()
+        try:
+            # A single transaction, so readers never see partial results
+            with connection:
+                connection.execute(
+                    "DELETE FROM metrics WHERE experiment_id = ?", (experiment_id,)
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO experiments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        experiment_id,
+                        additional.get("start_time"),
+                        additional.get("end_time"),
+                        additional.get("total_time"),
+                        json.dumps(values.get("experiment"), default=_to_json),
+                        json.dumps(report, default=_to_json),
+                        json.dumps(additional, default=_to_json),
+                    ),
+                )
+                connection.executemany(
+                    "INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?)",
+                    self._metric_rows(experiment_id, report),
+                )
+        finally:
+            connection.close()
+
+    def executed_ids(self) -> Set[str]:
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT experiment_id FROM experiments")
+            return set(row[0] for row in rows)
+        finally:
+            connection.close()
+
+    def load(self, experiment_id: str) -> Optional[dict]:
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT experiment, report, additional FROM experiments "
+                "WHERE experiment_id = ?",
+                (experiment_id,),
+            ).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        return {
+            "experiment": json.loads(row[0]),
+            "report": json.loads(row[1]),
+            "additional": json.loads(row[2]),
+        }
+
+    def export_yaml(self, output_dir: PathLike):
+        """Export the results of all experiments to YAML files (see `YAMLResults`)."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        yaml_results = YAMLResults(output_dir)
+        for experiment_id in sorted(self.executed_ids()):
+            yaml_results.save(experiment_id, self.load(experiment_id))
+
+
+# Valid results backends (`--results-backend` option of execute.py)
+results_backends = ["yaml", "sqlite"]
+
+
+def get_results_backend(backend: str, output_dir: PathLike) -> ResultsBackend:
+    """Instantiate a results backend for an output directory.
+
+    Parameters
+    ----------
+    backend : str
+        The backend name ("yaml" or "sqlite").
+    output_dir : PathLike
+        The directory where the results are stored.
+
+    Returns
+    -------
+    ResultsBackend
+        The results backend.
+    """
+    if backend == "yaml":
+        return YAMLResults(output_dir)
+    elif backend == "sqlite":
+        return SQLiteResults(Path(output_dir) / "results.sqlite")
+    else:
+        raise ValueError(f"Invalid results backend: {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="Export results",
+        description="Export the results of a SQLite database to YAML files",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("database", help="The SQLite database file", type=str)
+    parser.add_argument("output_dir", help="Directory of the YAML files", type=str)
+    args = parser.parse_args()
+    SQLiteResults(args.database).export_yaml(args.output_dir)
@@ -0,0 +1,408 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Cost model of the experiments and the order in which they are executed.
+
+The experiments are submitted in the order of their configuration files by
+default. Thus, a long experiment (e.g., UMAP on each axis) submitted last may
+run alone, with the other workers idle, at the end of the execution. The
+`CostModel` learns, from the results of previous executions, the time of each
+stage per byte of the datasets it processes, for each kind of stage (e.g.,
+the reduce stage with UMAP on each axis, or the runs of a RandomForest), and
+predicts the time and peak memory of new experiments. The experiments can
+then be submitted longest first (see `longest_first`), and their execution
+simulated on the nodes (see `simulate_schedule`) to predict the makespan.
+"""
+
+# Python imports
+import heapq
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Third-party imports
+from dacite import from_dict
+
+from config import ExecutionConfig, ExecutorOptions
+from planner import stage_keys, stage_names
+from resources import estimate_resources
+from results import ResultsBackend
+from search import expand_search
+
+# Key of the time of each stage in the additional information of the results
+stage_time_keys = {
+    "load": "load_time",
+    "transform": "transform_time",
+    "reduce": "reduce_time",
+    "scale": "scaling_time",
+}
+
+
+@dataclass
+class CostEstimate:
+    # Predicted time, in seconds, of each stage ("estimate" is the estimators)
+    stage_times: Dict[str, float] = field(default_factory=dict)
+    # Predicted peak memory, in bytes
+    memory: int = 0
+    # CPUs reserved for the experiment (see `resources.estimate_resources`)
+    num_cpus: int = 1
+    # Whether every stage was predicted from results of the same kind of stage
+    # (otherwise, the mean rate of the stage, of any kind, is used)
+    known: bool = True
+
+    @property
+    def time(self) -> float:
+        return sum(self.stage_times.values())
+
+
+def stage_signatures(config: ExecutionConfig) -> Dict[str, Optional[str]]:
+    """The kind of each preprocessing stage of an experiment: the algorithms
+    (and how they are applied) it runs. Stages with the same signature take
+    about the same time per byte. Stages that do nothing have no signature
+    (None).
+
+    Parameters
+    ----------
+    config : ExecutionConfig
+        The experiment configuration.
+
+    Returns
+    -------
+    Dict[str, Optional[str]]
+        A dictionary with the stage name as key and its signature as value.
+    """
+    transforms = [
+        f"{t.transform}/{t.windowed.transform_on if t.windowed else 'window'}"
+        for t in (config.transforms or [])
+    ]
+    reducer = None
+    if config.reducer is not None and config.reducer_dataset:
+        reducer = f"{config.reducer.algorithm}/{config.extra.reduce_on}"
+    scaler = None
+    if config.scaler is not None:
+        scaler = f"{config.scaler.algorithm}/{config.extra.scale_on}"
+    return {
+        "load": "load",
+        "transform": ",".join(transforms) or None,
+        "reduce": reducer,
+        "scale": scaler,
+    }
+
+
+def stage_nbytes(
+    config: ExecutionConfig, dataset_nbytes: Dict[str, int]
+) -> Dict[str, int]:
+    """Number of bytes processed by each stage of an experiment: all datasets
+    by the load, transform and reduce stages, and the train and test datasets
+    by the scale stage and the estimators."""
+    all_datasets = (
+        config.train_dataset + config.test_dataset + (config.reducer_dataset or [])
+    )
+    all_bytes = sum(dataset_nbytes.get(dset, 0) for dset in all_datasets)
+    train_test_bytes = sum(
+        dataset_nbytes.get(dset, 0)
+        for dset in config.train_dataset + config.test_dataset
+    )
+    return {
+        "load": all_bytes,
+        "transform": all_bytes,
+        "reduce": all_bytes,
+        "scale": train_test_bytes,
+        "estimate": train_test_bytes,
+    }
+
+
+class CostModel:
+    """Model of the time and peak memory of experiments, learned from results.
+
+    The time of a stage is modeled as proportional to the number of bytes it
+    processes (see `stage_nbytes`), with a rate (seconds per byte) for each
+    kind of stage (see `stage_signatures`) and each estimator algorithm (per
+    run). Kinds never seen use the mean rate of the stage. The peak memory
+    is the estimate of `resources.estimate_resources`, corrected by the
+    largest ratio between the measured peak memory (recorded with profiling)
+    and that estimate.
+
+    Parameters
+    ----------
+    options : ExecutorOptions
+        The executor options (used to estimate the memory and CPUs).
+    max_cpus : int, optional
+        Maximum number of CPUs of an experiment, by default 1
+    """
+
+    def __init__(self, options: ExecutorOptions, max_cpus: int = 1):
+        self.options = options
+        self.max_cpus = max_cpus
+        # (stage, signature) -> [total time, total bytes, count]. The mean of
+        # the stage (of any signature) has signature None
+        self._rates: Dict[Tuple[str, Optional[str]], List[float]] = dict()
+        self._memory_ratios: List[float] = []
+
+    @property
+    def num_observations(self) -> int:
+        return int(sum(v[2] for (_, s), v in self._rates.items() if s is None))
+
+    def _observe(self, stage: str, signature: str, time: float, nbytes: int):
+        for key in [(stage, signature), (stage, None)]:
+            totals = self._rates.setdefault(key, [0.0, 0.0, 0])
+            totals[0] += time
+            totals[1] += nbytes
+            totals[2] += 1
+
+    def _predict_time(
+        self, stage: str, signature: str, nbytes: int
+    ) -> Tuple[float, bool]:
+        """Predicted time of a stage and whether its signature is known."""
+        known = (stage, signature) in self._rates
+        totals = self._rates.get((stage, signature), self._rates.get((stage, None)))
+        if totals is None:
+            return 0.0, False
+        time, total_bytes, count = totals
+        if total_bytes > 0:
+            return time / total_bytes * nbytes, known
+        return time / count, known
+
+    def add_result(
+        self, config: ExecutionConfig, dataset_nbytes: Dict[str, int], values: dict
+    ):
+        """Learn from the results of an experiment (in the format of
+        `ResultsBackend.load`).
+
+        Parameters
+        ----------
+        config : ExecutionConfig
+            The configuration of the experiment.
+        dataset_nbytes : Dict[str, int]
+            The size, in bytes, of each dataset split of the experiment.
+        values : dict
+            The results of the experiment.
+        """
+        additional = values.get("additional", {})
+        nbytes = stage_nbytes(config, dataset_nbytes)
+        for stage, signature in stage_signatures(config).items():
+            if signature is None or stage_time_keys[stage] not in additional:
+                continue
+            # Reused stages (of a search) did not take their time again
+            if stage in additional.get("search", {}).get("reused_stages", []):
+                continue
+            self._observe(
+                stage,
+                signature,
+                float(additional[stage_time_keys[stage]]),
+                nbytes[stage],
+            )
+        for estimator in values.get("report", []):
+            if "classification_time" not in estimator:
+                continue
+            num_runs = estimator["estimator"].get("num_runs") or 1
+            self._observe(
+                "estimate",
+                estimator["estimator"]["algorithm"],
+                float(estimator["classification_time"]),
+                nbytes["estimate"] * num_runs,
+            )
+        peaks = [
+            s["peak_rss"] for s in additional.get("profile", []) if "peak_rss" in s
+        ]
+        if peaks:
+            estimated = estimate_resources(
+                config, dataset_nbytes, self.options, self.max_cpus
+            ).memory
+            self._memory_ratios.append(max(peaks) / estimated)
+
+    def fit(
+        self,
+        backends: Iterable[ResultsBackend],
+        dataset_nbytes: Callable[[ExecutionConfig], Dict[str, int]],
+    ) -> "CostModel":
+        """Learn from all the results stored in the backends.
+
+        Parameters
+        ----------
+        backends : Iterable[ResultsBackend]
+            The results backends (e.g., of previous executions).
+        dataset_nbytes : Callable[[ExecutionConfig], Dict[str, int]]
+            Function that returns the size of each dataset split of an
+            experiment (see `execute.experiment_nbytes`).
+
+        Returns
+        -------
+        CostModel
+            The model itself.
+        """
+        for backend in backends:
+            for experiment_id in sorted(backend.executed_ids()):
+                try:
+                    values = backend.load(experiment_id)
+                    config = from_dict(
+                        data_class=ExecutionConfig, data=values["experiment"]
+                    )
+                    self.add_result(config, dataset_nbytes(config), values)
+                except Exception:
+                    logging.warning(f"Ignoring the results of {experiment_id}")
+        return self
+
+    def predict(
+        self, config: ExecutionConfig, dataset_nbytes: Dict[str, int]
+    ) -> CostEstimate:
+        """Predict the time and the peak memory of an experiment. The points
+        of a search run in the same worker and the stages they share run only
+        once (see `execute.run_search`).
+
+        Parameters
+        ----------
+        config : ExecutionConfig
+            The configuration of the experiment.
+        dataset_nbytes : Dict[str, int]
+            The size, in bytes, of each dataset split of the experiment.
+
+        Returns
+        -------
+        CostEstimate
+            The predicted costs.
+        """
+        points = [config]
+        if config.search is not None:
+            points = [point for _, point in expand_search(config)]
+
+        estimate = CostEstimate(
+            stage_times={s: 0.0 for s in stage_names + ["estimate"]}
+        )
+        executed_stages = set()
+        for point in points:
+            nbytes = stage_nbytes(point, dataset_nbytes)
+            keys = stage_keys(point)
+            for stage, signature in stage_signatures(point).items():
+                if signature is None or keys[stage] in executed_stages:
+                    continue
+                executed_stages.add(keys[stage])
+                time, known = self._predict_time(stage, signature, nbytes[stage])
+                estimate.stage_times[stage] += time
+                estimate.known = estimate.known and known
+            for estimator in point.estimators:
+                time, known = self._predict_time(
+                    "estimate",
+                    estimator.algorithm,
+                    nbytes["estimate"] * (estimator.num_runs or 1),
+                )
+                estimate.stage_times["estimate"] += time
+                estimate.known = estimate.known and known
+
+            resources = estimate_resources(
+                point, dataset_nbytes, self.options, self.max_cpus
+            )
+            memory = resources.memory
+            if self._memory_ratios:
+                memory = memory * max(self._memory_ratios)
+            estimate.memory = max(estimate.memory, int(memory))
+            estimate.num_cpus = max(estimate.num_cpus, resources.num_cpus)
+        return estimate
+
+
+def longest_first(estimates: List[CostEstimate]) -> List[int]:
+    """Indexes of the experiments, sorted by decreasing predicted time (and
+    memory, to break ties). Submitting the longest experiments first avoids
+    long experiments running alone at the end of the execution."""
+    return sorted(
+        range(len(estimates)),
+        key=lambda i: (estimates[i].time, estimates[i].memory),
+        reverse=True,
+    )
+
+
+@dataclass
+class ScheduledTask:
+    index: int  # Index of the experiment
+    node: int  # Index of the node
+    start: float
+    end: float
+
+
+def simulate_schedule(
+    estimates: List[CostEstimate],
+    order: List[int],
+    nodes: List[Tuple[int, Optional[int]]],
+) -> List[ScheduledTask]:
+    """Simulate the execution of experiments, submitted in an order, on the
+    nodes of a cluster. Whenever a task finishes, the pending experiments are
+    started, in order, on the first node with enough free CPUs and memory
+    (first-fit bin packing, as Ray does with the reserved resources).
+    Experiments that require more than the largest node are limited to it.
+
+    Parameters
+    ----------
+    estimates : List[CostEstimate]
+        The predicted costs of the experiments.
+    order : List[int]
+        The order in which the experiments are submitted (their indexes).
+    nodes : List[Tuple[int, Optional[int]]]
+        The CPUs and the memory (in bytes, or None for no limit) of each node.
+
+    Returns
+    -------
+    List[ScheduledTask]
+        The start and end times (and the node) of each experiment.
+    """
+    max_cpus = max(cpus for cpus, _ in nodes)
+    memories = [memory for _, memory in nodes if memory is not None]
+    max_memory = max(memories) if memories else None
+    free = [[cpus, memory] for cpus, memory in nodes]
+
+    def _demand(i: int) -> Tuple[int, int]:
+        memory = estimates[i].memory
+        if max_memory is not None:
+            memory = min(memory, max_memory)
+        return min(estimates[i].num_cpus, max_cpus), memory
+
+    def _fits(node: List, cpus: int, memory: int) -> bool:
+        return node[0] >= cpus and (node[1] is None or node[1] >= memory)
+
+    pending = list(order)
+    running = []
+    scheduled = []
+    now = 0.0
+    while pending or running:
+        for i in list(pending):
+            cpus, memory = _demand(i)
+            node = next((n for n, f in enumerate(free) if _fits(f, cpus, memory)), None)
+            if node is None and not running:
+                # Does not fit any (idle) node: runs alone in the first node
+                node = 0
+            if node is None:
+                continue
+            free[node][0] -= cpus
+            if free[node][1] is not None:
+                free[node][1] -= memory
+            task = ScheduledTask(i, node, now, now + estimates[i].time)
+            heapq.heappush(running, (task.end, i, task))
+            scheduled.append(task)
+            pending.remove(i)
+        # Wait for the next task to finish
+        now, i, task = heapq.heappop(running)
+        cpus, memory = _demand(i)
+        free[task.node][0] += cpus
+        if free[task.node][1] is not None:
+            free[task.node][1] += memory
+    return scheduled
+
+
+def makespan(schedule: List[ScheduledTask]) -> float:
+    """Time to run all the experiments of a schedule."""
+    return max([task.end for task in schedule] + [0.0])
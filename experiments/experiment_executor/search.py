@@ -0,0 +1,190 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Hyperparameter search over the kwargs of the reducer, the scaler and the
+estimators of an experiment.
+
+The `search` section of an experiment configuration (`SearchConfig`) defines
+the values of each parameter. A parameter is identified by its section and
+kwarg: "reducer.<kwarg>", "scaler.<kwarg>" or "estimators.<index>.<kwarg>"
+(the index of the estimator in the `estimators` list). The search is expanded
+to a list of points, each one an experiment configuration (without search)
+with the kwargs of the point. Points are identified by the experiment
+identifier and their index (see `point_id`), and each point has its own
+results.
+
+With the "grid" method, all combinations of the values are points. With the
+"random" method, `num_samples` distinct combinations are sampled (with the
+`seed`), without generating the whole grid.
+"""
+
+# Python imports
+import copy
+import itertools
+import math
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Third-party imports
+from dacite import from_dict
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+
+from config import ExecutionConfig, SearchConfig
+from utils import load_yaml
+
+search_methods = ["grid", "random"]
+
+
+def point_id(experiment_id: str, index: int) -> str:
+    """Identifier of the `index`-th point of the search of an experiment."""
+    return f"{experiment_id}.{index}"
+
+
+def apply_params(config: ExecutionConfig, params: Dict[str, Any]) -> ExecutionConfig:
+    """Return a copy of an experiment configuration (without search), with
+    the kwargs set to the values of the parameters.
+
+    Parameters
+    ----------
+    config : ExecutionConfig
+        The experiment configuration.
+    params : Dict[str, Any]
+        The value of each parameter (see `SearchConfig.space`).
+
+    Returns
+    -------
+    ExecutionConfig
+        The configuration of the point.
+
+    Raises
+    ------
+    ValueError
+        If a parameter is invalid or its section is not configured.
+    """
+    config = copy.deepcopy(config)
+    config.search = None
+    for param, value in params.items():
+        section, *path = param.split(".")
+        if section == "estimators" and len(path) == 2 and path[0].isdigit():
+            index = int(path[0])
+            if index >= len(config.estimators):
+                raise ValueError(f"Invalid estimator index in parameter: {param}")
+            target = config.estimators[index]
+        elif section in ["reducer", "scaler"] and len(path) == 1:
+            target = getattr(config, section)
+            if target is None:
+                raise ValueError(f"Parameter of a missing {section}: {param}")
+        else:
+            raise ValueError(
+                f"Invalid search parameter: {param}. Must be one of: "
+                + "'reducer.<kwarg>', 'scaler.<kwarg>', 'estimators.<index>.<kwarg>'"
+            )
+        target.kwargs = dict(target.kwargs or {})
+        target.kwargs[path[-1]] = value
+    return config
+
+
+def search_params(search: SearchConfig) -> List[Dict[str, Any]]:
+    """The parameters of each point of a search, in order.
+
+    Parameters
+    ----------
+    search : SearchConfig
+        The search configuration.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        The value of each parameter, for each point.
+    """
+    names = list(search.space)
+    values = [list(search.space[name]) for name in names]
+    if search.method == "grid":
+        return [dict(zip(names, point)) for point in itertools.product(*values)]
+    if search.method != "random":
+        raise ValueError(
+            f"Invalid search method: {search.method}. Must be one of: {search_methods}"
+        )
+    if search.num_samples is None:
+        raise ValueError("The random search requires num_samples")
+
+    # Sample the indexes of the points in the grid (mixed radix numbers)
+    num_points = math.prod(len(v) for v in values)
+    indexes = random.Random(search.seed).sample(
+        range(num_points), min(search.num_samples, num_points)
+    )
+    points = []
+    for index in indexes:
+        point = dict()
+        for name, options in zip(reversed(names), reversed(values)):
+            index, i = divmod(index, len(options))
+            point[name] = options[i]
+        points.append({name: point[name] for name in names})
+    return points
+
+
+def expand_search(
+    config: ExecutionConfig,
+) -> List[Tuple[Dict[str, Any], ExecutionConfig]]:
+    """Expand the search of an experiment configuration into its points.
+
+    Parameters
+    ----------
+    config : ExecutionConfig
+        The experiment configuration (with search).
+
+    Returns
+    -------
+    List[Tuple[Dict[str, Any], ExecutionConfig]]
+        The parameters and the configuration of each point, in order.
+    """
+    return [
+        (params, apply_params(config, params))
+        for params in search_params(config.search)
+    ]
+
+
+def experiment_ids(config_file: PathLike, config: ExecutionConfig = None) -> List[str]:
+    """Identifiers of the results of an experiment configuration file: the
+    identifier of each point of its search, or the file name (without
+    extension) if there is no search.
+
+    Parameters
+    ----------
+    config_file : PathLike
+        The configuration file.
+    config : ExecutionConfig, optional
+        The configuration loaded from the file (loaded if not informed).
+
+    Returns
+    -------
+    List[str]
+        The identifiers of the results.
+    """
+    experiment_id = Path(config_file).stem
+    if config is None:
+        config = from_dict(data_class=ExecutionConfig, data=load_yaml(config_file))
+    if config.search is None:
+        return [experiment_id]
+    return [
+        point_id(experiment_id, i) for i in range(len(search_params(config.search)))
+    ]
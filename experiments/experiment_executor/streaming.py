@@ -0,0 +1,319 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy 
+# of this software and associated documentation files (the “Software”), to 
+# deal in the Software without restriction, including without limitation the 
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or 
+# sell copies of the Software, and to permit persons to whom the Software is 
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in 
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR 
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, 
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER 
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+# DEALINGS IN THE SOFTWARE. 
+
+"""Streaming (chunked) execution of the pipeline stages, for datasets that do
+not fit in memory.
+
+The datasets are processed in fixed-size chunks of rows: each chunk is read
+(e.g., from a memory-mapped dataset of the dataset cache), processed and
+written to a memory-mapped output array (a spill file). Thus, the memory used
+by each stage is bounded by the chunk size, instead of by the dataset size.
+Transforms fitted on the data (scalers and reducers) are fitted before, with
+`partial_fit` over the chunks, if available, or on a random subsample of rows.
+"""
+
+# Python imports
+import os
+import tempfile
+from typing import Any, Callable, Iterator, List, Optional
+
+# Third-party imports
+import numpy as np
+
+# Librep imports
+from librep.config.type_definitions import PathLike
+from librep.datasets.multimodal import ArrayMultiModalDataset, MultiModalDataset
+
+
+def iter_chunks(num_rows: int, chunk_size: int) -> Iterator[slice]:
+    """Iterate over the row slices of the chunks of an array with `num_rows`
+    rows. The last chunk may be smaller than `chunk_size`."""
+    for start in range(0, num_rows, chunk_size):
+        yield slice(start, min(start + chunk_size, num_rows))
+
+
+def spill_array(shape: tuple, dtype: Any, spill_dir: PathLike = None) -> np.ndarray:
+    """Create a writable array backed by a temporary file (a memory-mapped
+    `.npy` file). The file is removed right after being mapped, so the disk
+    space is released when the array is garbage collected.
+
+    Parameters
+    ----------
+    shape : tuple
+        The shape of the array.
+    dtype : Any
+        The data type of the array.
+    spill_dir : PathLike, optional
+        Directory where the temporary file is created, by default None (the
+        system temporary directory)
+
+    Returns
+    -------
+    np.ndarray
+        The memory-mapped array.
+    """
+    if spill_dir is not None:
+        os.makedirs(spill_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".npy", dir=spill_dir)
+    os.close(fd)
+    array = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    try:
+        os.remove(path)
+    except OSError:
+        # The file can not be removed while it is mapped (e.g., on Windows).
+        # It is left in the spill directory.
+        pass
+    return array
+
+
+def dataset_chunk(dataset: MultiModalDataset, rows: slice) -> ArrayMultiModalDataset:
+    """Read a chunk of rows of a dataset (into memory)."""
+    X, y = dataset[rows]
+    return ArrayMultiModalDataset(
+        X=np.asarray(X),
+        y=np.asarray(y),
+        window_slices=dataset.window_slices,
+        window_names=dataset.window_names,
+    )
+
+
+def chunked_map(
+    dataset: MultiModalDataset,
+    func: Callable[[ArrayMultiModalDataset], MultiModalDataset],
+    chunk_size: int,
+    spill_dir: PathLike = None,
+) -> ArrayMultiModalDataset:
+    """Apply a function to each chunk of rows of a dataset, writing the
+    results to a memory-mapped array. The function must transform each row
+    independently (e.g., a non-parametric or an already fitted transform) and
+    return the same windows for every chunk.
+
+    Parameters
+    ----------
+    dataset : MultiModalDataset
+        The dataset to transform.
+    func : Callable[[ArrayMultiModalDataset], MultiModalDataset]
+        The function applied to each chunk.
+    chunk_size : int
+        Number of rows of each chunk.
+    spill_dir : PathLike, optional
+        Directory of the output spill file, by default None
+
+    Returns
+    -------
+    ArrayMultiModalDataset
+        The transformed dataset, backed by the spill file.
+    """
+    num_rows = len(dataset)
+    X = None
+    for rows in iter_chunks(num_rows, chunk_size):
+        transformed = func(dataset_chunk(dataset, rows))
+        X_chunk = np.asarray(transformed[:][0])
+        # Allocate the output when the shape of the transformed rows is known
+        if X is None:
+            X = spill_array((num_rows, X_chunk.shape[1]), X_chunk.dtype, spill_dir)
+            window_slices = transformed.window_slices
+            window_names = transformed.window_names
+        X[rows] = X_chunk
+
+    if X is None:
+        # Empty dataset
+        transformed = func(dataset_chunk(dataset, slice(0, 0)))
+        X = np.asarray(transformed[:][0])
+        window_slices = transformed.window_slices
+        window_names = transformed.window_names
+
+    return ArrayMultiModalDataset(
+        X=X,
+        y=np.asarray(dataset[:][1]),
+        window_slices=window_slices,
+        window_names=window_names,
+    )
+
+
+def chunked_concatenate(
+    datasets: List[MultiModalDataset],
+    chunk_size: int,
+    spill_dir: PathLike = None,
+    dtype: Any = None,
+) -> ArrayMultiModalDataset:
+    """Concatenate the rows of datasets with the same windows, copying them,
+    chunk by chunk, to a memory-mapped array.
+
+    Parameters
+    ----------
+    datasets : List[MultiModalDataset]
+        The datasets to concatenate, in order.
+    chunk_size : int
+        Number of rows copied at once.
+    spill_dir : PathLike, optional
+        Directory of the output spill file, by default None
+    dtype : Any, optional
+        Data type of the output samples, by default None (the type of the
+        first dataset)
+
+    Returns
+    -------
+    ArrayMultiModalDataset
+        The concatenated dataset, backed by the spill file.
+    """
+    X_first, y_first = datasets[0][0:1]
+    dtype = np.dtype(dtype or np.asarray(X_first).dtype)
+    if len(datasets) == 1 and np.asarray(X_first).dtype == dtype:
+        return datasets[0]
+
+    num_rows = sum(len(dset) for dset in datasets)
+    X = spill_array((num_rows, np.asarray(X_first).shape[1]), dtype, spill_dir)
+    y = np.empty(num_rows, dtype=np.asarray(y_first).dtype)
+    offset = 0
+    for dset in datasets:
+        for rows in iter_chunks(len(dset), chunk_size):
+            X_chunk, y_chunk = dset[rows]
+            out_rows = slice(offset + rows.start, offset + rows.stop)
+            X[out_rows] = X_chunk
+            y[out_rows] = y_chunk
+        offset += len(dset)
+
+    return ArrayMultiModalDataset(
+        X=X,
+        y=y,
+        window_slices=datasets[0].window_slices,
+        window_names=datasets[0].window_names,
+    )
+
+
+def subsample(
+    dataset: MultiModalDataset, max_samples: Optional[int], seed: int = 0
+) -> MultiModalDataset:
+    """Random subsample (without replacement) of the rows of a dataset, read
+    into memory. The rows keep their original order (reading sorted rows is
+    faster from memory-mapped arrays).
+
+    Parameters
+    ----------
+    dataset : MultiModalDataset
+        The dataset.
+    max_samples : Optional[int]
+        Maximum number of rows. If None, or if the dataset is not larger,
+        the dataset is returned as is.
+    seed : int, optional
+        Seed of the random generator, by default 0
+
+    Returns
+    -------
+    MultiModalDataset
+        The subsampled dataset.
+    """
+    if max_samples is None or len(dataset) <= max_samples:
+        return dataset
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(dataset), size=max_samples, replace=False))
+    X, y = dataset[:]
+    return ArrayMultiModalDataset(
+        X=np.asarray(X[rows]),
+        y=np.asarray(y[rows]),
+        window_slices=dataset.window_slices,
+        window_names=dataset.window_names,
+    )
+
+
+def chunked_fit(
+    transform: Any,
+    dataset: MultiModalDataset,
+    chunk_size: int,
+    max_samples: Optional[int] = None,
+) -> Any:
+    """Fit a transform (e.g., a scaler) on a dataset without reading it all
+    into memory. If the transform implements `partial_fit`, it is called for
+    each chunk of rows. Otherwise, it is fit on a random subsample of at most
+    `max_samples` rows (see `subsample`).
+
+    Parameters
+    ----------
+    transform : Any
+        The transform to fit.
+    dataset : MultiModalDataset
+        The dataset used to fit the transform.
+    chunk_size : int
+        Number of rows of each chunk.
+    max_samples : Optional[int], optional
+        Maximum number of rows used to fit transforms without `partial_fit`,
+        by default None (all rows)
+
+    Returns
+    -------
+    Any
+        The fitted transform.
+    """
+    if hasattr(transform, "partial_fit"):
+        for rows in iter_chunks(len(dataset), chunk_size):
+            transform.partial_fit(np.asarray(dataset[rows][0]))
+    else:
+        transform.fit(np.asarray(subsample(dataset, max_samples)[:][0]))
+    return transform
+
+
+class ChunkedPredictor:
+    """Estimator wrapper that predicts in chunks of rows, so the prediction of
+    a memory-mapped dataset does not read it all at once. The other methods
+    and attributes are delegated to the wrapped estimator.
+
+    Parameters
+    ----------
+    estimator : Any
+        The estimator (scikit-learn compatible).
+    chunk_size : int
+        Number of rows predicted at once.
+    """
+
+    def __init__(self, estimator: Any, chunk_size: int):
+        self.estimator = estimator
+        self.chunk_size = chunk_size
+
+    def fit(self, X, y=None, **kwargs):
+        self.estimator.fit(X, y, **kwargs)
+        return self
+
+    def _chunked(self, method: str, X) -> np.ndarray:
+        outputs = [
+            np.asarray(getattr(self.estimator, method)(np.asarray(X[rows])))
+            for rows in iter_chunks(len(X), self.chunk_size)
+        ]
+        return np.concatenate(outputs)
+
+    def predict(self, X) -> np.ndarray:
+        return self._chunked("predict", X)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self._chunked("predict_proba", X)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found in the wrapper
+        if name == "estimator":
+            raise AttributeError(name)
+        return getattr(self.estimator, name)
+
+
+def chunked_estimator(
+    estimator_cls: type, chunk_size: int, **kwargs
+) -> ChunkedPredictor:
+    """Instantiate an estimator, with the `kwargs`, wrapped in a
+    `ChunkedPredictor`. Use with `functools.partial` to create estimators that
+    predict in chunks, in workflows that instantiate the estimators."""
+    return ChunkedPredictor(estimator_cls(**kwargs), chunk_size)
@@ -18,19 +18,30 @@
 # DEALINGS IN THE SOFTWARE. 
 
 import logging
+import multiprocessing
 import os
 import platform
 import re
 import socket
+import tempfile
 import time
-from typing import List
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from pathlib import Path
 
+import numpy as np
 import psutil
 import yaml
 from librep.config.type_definitions import PathLike
+from librep.datasets.multimodal import ArrayMultiModalDataset
 from librep.datasets.multimodal.multimodal import MultiModalDataset
+from ray import cloudpickle
+
+from cache import save_multimodal
+from profiler import Profiler, active_profiler
 
 
 class catchtime:
@@ -74,7 +85,24 @@ def load_yaml(path: PathLike) -> dict:
         return yaml.load(f, Loader=yaml.CLoader)
 
 
+# Information about the system, collected by `get_sys_info`
+_sys_info = None
+
+
 def get_sys_info():
+    """Information about the system (platform, host, processor and memory).
+    It is collected once per process (it does a DNS lookup) and copied. If
+    it fails, it is collected again in the next call."""
+    global _sys_info
+    if _sys_info is None:
+        info = _get_sys_info()
+        if not info:
+            return dict()
+        _sys_info = info
+    return dict(_sys_info)
+
+
+def _get_sys_info():
     try:
         info = {}
         info["platform"] = platform.system()
@@ -95,7 +123,177 @@ def get_sys_info():
 
 
 def multimodal_multi_merge(datasets: List[MultiModalDataset]) -> MultiModalDataset:
-    merged = datasets[0]
-    for dataset in datasets[1:]:
-        merged = merged.merge(dataset)
-    return merged
+    """Merge the windows (columns) of datasets with the same rows. Array
+    datasets are copied once, to a preallocated array, instead of merging
+    them one by one (which copies the growing array at each merge).
+    """
+    if len(datasets) == 1:
+        return datasets[0]
+    if not all(isinstance(dataset, ArrayMultiModalDataset) for dataset in datasets):
+        merged = datasets[0]
+        for dataset in datasets[1:]:
+            merged = merged.merge(dataset)
+        return merged
+
+    arrays = [np.asarray(dataset.X) for dataset in datasets]
+    X = np.empty(
+        (len(arrays[0]), sum(X.shape[1] for X in arrays)),
+        dtype=np.result_type(*arrays),
+    )
+    window_slices, window_names = [], []
+    offset = 0
+    for dataset, array in zip(datasets, arrays):
+        X[:, offset : offset + array.shape[1]] = array
+        window_slices += [
+            (start + offset, end + offset) for start, end in dataset.window_slices
+        ]
+        window_names += list(dataset.window_names)
+        offset += array.shape[1]
+    return ArrayMultiModalDataset(
+        X=X,
+        y=datasets[0].y,
+        window_slices=window_slices,
+        window_names=window_names,
+    )
+
+
+def multimodal_concatenate(
+    datasets: List[ArrayMultiModalDataset], dtype: Any = None
+) -> ArrayMultiModalDataset:
+    """Concatenate the rows of datasets with the same windows. The rows are
+    copied once, to a preallocated array (of `dtype`, if informed), instead
+    of concatenating the datasets one by one (which copies the growing array
+    at each step).
+    """
+    if len(datasets) == 1:
+        return datasets[0]
+    arrays = [np.asarray(dataset.X) for dataset in datasets]
+    labels = [np.asarray(dataset.y) for dataset in datasets]
+    X = np.empty(
+        (sum(len(X) for X in arrays), arrays[0].shape[1]),
+        dtype=dtype or np.result_type(*arrays),
+    )
+    y = np.empty(len(X), dtype=np.result_type(*labels))
+    offset = 0
+    for array, label in zip(arrays, labels):
+        X[offset : offset + len(array)] = array
+        y[offset : offset + len(array)] = label
+        offset += len(array)
+    return ArrayMultiModalDataset(
+        X=X,
+        y=y,
+        window_slices=datasets[0].window_slices,
+        window_names=datasets[0].window_names,
+    )
+
+
+# Pool of `process_map`, kept between calls, as starting its processes is slow
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _process_map_call(task: Tuple[bytes, bytes, Optional[bool]]) -> tuple:
+    func, item, trace_allocations = task
+    func, item = cloudpickle.loads(func), cloudpickle.loads(item)
+    if trace_allocations is None:
+        return func(item), None
+    # Profile the call, as the caller is profiled
+    profiler = Profiler(trace_allocations=trace_allocations)
+    with profiler.activate():
+        result = func(item)
+    return result, profiler.spans
+
+
+def process_map(func: Callable, items: Iterable, num_workers: int) -> list:
+    """Apply a function to each item, in parallel, using a pool of new
+    (spawned) processes. This process is not forked, as it usually runs
+    threads (e.g., of numba, OpenMP, Ray, tqdm or the profiler) that may hold
+    locks a forked process would never release. The function (which may be a
+    closure) and the items are pickled with cloudpickle, so large data, such
+    as datasets, should be passed as files (see `dataset_files`). Each new
+    process imports the main module, which takes a while, so the pool is
+    kept for the next calls (with the same number of workers). If there is
+    an active profiler, the calls in the processes are profiled and their
+    spans are added to it (see `profiler.py`).
+
+    Parameters
+    ----------
+    func : Callable
+        The function to apply to each item.
+    items : Iterable
+        The items.
+    num_workers : int
+        Maximum number of processes. If 1 (or there is only one item), the
+        function is applied sequentially, in the current process.
+
+    Returns
+    -------
+    list
+        The results of the function for each item, in the same order.
+    """
+    global _process_pool
+    items = list(items)
+    if num_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    if _process_pool is None or _process_pool._max_workers != num_workers:
+        if _process_pool is not None:
+            _process_pool.shutdown()
+        _process_pool = ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    profiler = active_profiler()
+    trace_allocations = None if profiler is None else profiler.trace_allocations
+    func = cloudpickle.dumps(func)
+    tasks = [(func, cloudpickle.dumps(item), trace_allocations) for item in items]
+    try:
+        outputs = list(_process_pool.map(_process_map_call, tasks))
+    except BrokenProcessPool:
+        # A process died (e.g., killed by the system), start a new pool next time
+        _process_pool = None
+        raise
+    if profiler is not None:
+        for _, spans in outputs:
+            profiler.add_spans(spans)
+    return [result for result, _ in outputs]
+
+
+def shutdown_process_pool():
+    """Stop the processes of `process_map`. Must be called before a process
+    started by `multiprocessing` ends, as it waits for its child processes
+    (it is done at exit in the main process)."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown()
+        _process_pool = None
+
+
+@contextmanager
+def dataset_files(
+    datasets: List[MultiModalDataset], directory: PathLike = None
+) -> Iterator[List[Path]]:
+    """Context manager that saves datasets in a temporary directory (see
+    `cache.save_multimodal`), so other processes memory-map them (see
+    `cache.load_multimodal`) instead of receiving a copy. The files are
+    removed at the end of the context.
+
+    Parameters
+    ----------
+    datasets : List[MultiModalDataset]
+        The datasets (with `X`, `y`, `window_slices` and `window_names`).
+    directory : PathLike, optional
+        Directory where the temporary directory is created, by default None
+        (the default temporary directory)
+
+    Yields
+    ------
+    List[Path]
+        The directory of each dataset.
+    """
+    if directory is not None:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        paths = []
+        for i, dataset in enumerate(datasets):
+            paths.append(Path(tmp_dir) / str(i))
+            save_multimodal(paths[-1], dataset)
+        yield paths
@@ -0,0 +1,121 @@
+# Copyright © 2023 H.IAAC, UNICAMP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the “Software”), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""Workflows that complement the ones from `librep.utils.workflow`."""
+
+# Python imports
+import random
+from typing import Any, List, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Librep imports
+from librep.datasets.multimodal import MultiModalDataset
+from librep.utils.workflow import MultiRunWorkflow
+
+from cache import load_multimodal
+from utils import dataset_files, process_map
+
+
+class ParallelMultiRunWorkflow:
+    """Run a workflow multiple times, like `MultiRunWorkflow`, but executing
+    the runs in parallel, in a pool of processes (see `utils.process_map`).
+    The datasets are saved to temporary files, memory-mapped by the processes
+    instead of being copied to each one. The results have the same structure
+    of the `MultiRunWorkflow` results, with the runs in order.
+
+    The global random generators (`random` and `numpy.random`) are seeded at
+    each run, with a different seed for each run (spawned from `seed`), and
+    restored after it. The seed of each run is stored in its results (`seed`
+    key). The runs are executed sequentially, in this process, if
+    `num_workers` is 1, with the same seeds (and results).
+
+    Parameters
+    ----------
+    workflow : Any
+        The workflow to run (e.g., a `SimpleTrainEvalWorkflow`).
+    num_runs : int, optional
+        Number of runs, by default 1
+    num_workers : int, optional
+        Number of processes running in parallel, by default 1
+    seed : int, optional
+        Seed used to generate the seed of each run, by default None (random,
+        the runs are not reproducible)
+    """
+
+    def __init__(
+        self,
+        workflow: Any,
+        num_runs: int = 1,
+        num_workers: int = 1,
+        seed: int = None,
+    ):
+        self.workflow = workflow
+        self.num_runs = num_runs
+        self.num_workers = num_workers
+        self.seed = seed
+
+    def run_seeds(self) -> List[int]:
+        sequences = np.random.SeedSequence(self.seed).spawn(self.num_runs)
+        return [int(s.generate_state(1)[0]) for s in sequences]
+
+    def __call__(
+        self, train_dataset: MultiModalDataset, test_dataset: MultiModalDataset
+    ) -> dict:
+        workflow = self.workflow
+
+        # The datasets are files (memory-mapped) in the worker processes
+        def _single_run(run: Tuple[int, Any, Any]) -> dict:
+            seed, train_dataset, test_dataset = run
+            if not isinstance(train_dataset, MultiModalDataset):
+                train_dataset = load_multimodal(train_dataset)
+                test_dataset = load_multimodal(test_dataset)
+            # Runs in this process must not change the state of the
+            # global generators used by other code
+            np_state, state = np.random.get_state(), random.getstate()
+            np.random.seed(seed)
+            random.seed(seed)
+            try:
+                return MultiRunWorkflow(workflow=workflow, num_runs=1)(
+                    train_dataset, test_dataset
+                )
+            finally:
+                np.random.set_state(np_state)
+                random.setstate(state)
+
+        seeds = self.run_seeds()
+        if self.num_workers > 1 and self.num_runs > 1:
+            with dataset_files([train_dataset, test_dataset]) as (train, test):
+                runs = [(seed, train, test) for seed in seeds]
+                results = process_map(_single_run, runs, self.num_workers)
+        else:
+            runs = [(seed, train_dataset, test_dataset) for seed in seeds]
+            results = process_map(_single_run, runs, 1)
+
+        # Merge the runs (each result has a single run), renumbering them
+        runs = []
+        for i, (seed, result) in enumerate(zip(seeds, results)):
+            for run in result["runs"]:
+                run["run id"] = i
+                run["seed"] = seed
+                runs.append(run)
+        merged = results[0]
+        merged["runs"] = runs
+        return merged